@@ -3,8 +3,11 @@
 Mkulima AI Flask Application Package
 """
 
-from flask import Flask
+import os
+from datetime import datetime
+from flask import Flask, Response
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from .config import Config
 from app.services.database import init_db
 
@@ -15,6 +18,17 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
     
+    # Service modules log to app.* loggers, which propagate to app.logger (named
+    # after this package) and its handler
+    if not app.debug:
+        app.logger.setLevel(app.config.get('LOG_LEVEL', 'INFO'))
+    
+    # Client address and scheme from the proxy's X-Forwarded-* headers (rate limit
+    # IP buckets are keyed on request.remote_addr)
+    proxy_hops = app.config.get('PROXY_FIX_HOPS', 0)
+    if proxy_hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops)
+    
     # Enable CORS
     CORS(app)
     
@@ -39,15 +53,62 @@ def create_app(config_class=Config):
             'version': '1.0.0'
         }
     
+    from .routes.prediction import ai_predictor, job_queue, detection_writer
+    
+    # Async prediction jobs are stored in the database unless JOB_QUEUE_BACKEND=memory
+    job_queue.init_app(app)
+    detection_writer.init_app(app)
+    
+    # Warm the model up in each serving process without blocking startup.
+    # Under gunicorn the post_fork hook starts it as soon as a worker is forked;
+    # this covers the development server and non-preloaded deployments.
+    warmup_mode = app.config.get('MODEL_WARMUP', 'background')
+    if warmup_mode != 'off':
+        @app.before_request
+        def start_model_warmup():
+            ai_predictor.warm_up(background=warmup_mode == 'background')
+    
     @app.route('/api/v1/health')
     def api_health():
+        """Process liveness; model readiness is reported separately"""
         return {
             'status': 'healthy',
-            'environment': app.config.get('ENV', 'production')
+            'model_ready': ai_predictor.is_ready,
+            'model_state': ai_predictor.state,
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'environment': os.getenv('FLASK_ENV', 'development')
         }
     
+    @app.route('/api/v1/health/ready')
+    def api_ready():
+        """Readiness: 503 until the model has loaded (or fallen back to mock predictions)"""
+        ready = ai_predictor.state in ('ready', 'unavailable')
+        return {
+            'ready': ready,
+            'model_state': ai_predictor.state,
+            'model_version': ai_predictor.model_version
+        }, 200 if ready else 503
+    
+    # Prometheus scrape endpoint; METRICS_ENABLED=false stops recording.
+    # Each process has its own registry: with METRICS_MULTIPROC_DIR (set by
+    # gunicorn.conf.py) any worker answers with the sum over all workers, without
+    # it only the answering process's values are reported.
+    from .utils.metrics import registry
+    registry.enabled = app.config.get('METRICS_ENABLED', True)
+    registry.multiprocess_dir = app.config.get('METRICS_MULTIPROC_DIR')
+    registry.snapshot_interval = app.config.get('METRICS_SNAPSHOT_INTERVAL', 5.0)
+    
+    @app.route('/metrics')
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+    
+    # Admin-only sampling profiler and per-request tracing (opt-in)
+    if app.config.get('PROFILING_ENABLED'):
+        from .utils.profiling import init_profiling
+        init_profiling(app)
+    
     return app
 
 # Import models and routes to make them available
-from .models import user_model, disease_model
+from .models import user_model, disease_model, job_model, analytics_model
 from .routes import prediction, users, analytics
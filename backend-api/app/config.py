@@ -10,10 +10,18 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///mkulima_ai.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Reverse proxies in front of the app (Railway's edge is one). request.remote_addr
+    # and scheme are taken from the X-Forwarded-For / -Proto entries those hops add;
+    # set 0 when clients connect directly, or any client could spoof its address
+    PROXY_FIX_HOPS = int(os.environ.get('PROXY_FIX_HOPS', 1))
+    
     # File Upload
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+    MAX_IMAGE_BYTES = 10 * 1024 * 1024  # 10MB per image
+    MAX_IMAGE_PIXELS = int(os.environ.get('MAX_IMAGE_PIXELS') or 64_000_000)  # decompression-bomb guard
+    MIN_IMAGE_DIMENSION = 100
     
     # CORS
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*').split(',')
@@ -22,11 +30,128 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
     
-    # AI Model Path
-    MODEL_PATH = os.environ.get('MODEL_PATH') or 'models/plant_disease_model.h5'
+    # AI Model Path: a model bundle from ml_models/training/export_model.py,
+    # or a single .tflite / Keras model file
+    MODEL_PATH = os.environ.get('MODEL_PATH') or 'models/plant_disease_bundle'
+    # Bundle artifact to serve: auto (manifest default), saved_model, tflite_float16 or tflite_int8
+    MODEL_BUNDLE_ARTIFACT = os.environ.get('MODEL_BUNDLE_ARTIFACT') or 'auto'
+    LABELS_PATH = os.environ.get('LABELS_PATH') or 'knowledge_base/disease_labels.txt'
+    
+    # Inference backend: auto (from MODEL_PATH extension), keras or tflite
+    MODEL_BACKEND = os.environ.get('MODEL_BACKEND') or 'auto'
+    TFLITE_NUM_THREADS = int(os.environ['TFLITE_NUM_THREADS']) if os.environ.get('TFLITE_NUM_THREADS') else None
+    # Keep TFLite weights in the shared, memory-mapped model file (disables XNNPACK weight repacking)
+    TFLITE_SHARE_WEIGHTS = os.environ.get('TFLITE_SHARE_WEIGHTS', 'false').lower() == 'true'
+    
+    # Model warm-up after startup: background, sync (in the first request) or off
+    MODEL_WARMUP = os.environ.get('MODEL_WARMUP') or 'background'
+    
+    # Inference micro-batching (mode: adaptive, always or off)
+    INFERENCE_BATCHING_MODE = os.environ.get('INFERENCE_BATCHING_MODE') or 'adaptive'
+    INFERENCE_MAX_BATCH_SIZE = int(os.environ.get('INFERENCE_MAX_BATCH_SIZE') or 32)
+    INFERENCE_MAX_BATCH_WAIT_MS = float(os.environ.get('INFERENCE_MAX_BATCH_WAIT_MS') or 10)
+    
+    # Inference scheduling: queued work runs premium first, then interactive scans,
+    # then background (batch uploads, async jobs). Work still queued at its class
+    # deadline is dropped; beyond INFERENCE_MAX_QUEUED_IMAGES the lowest class is shed
+    INFERENCE_DEADLINE_PREMIUM_MS = float(os.environ.get('INFERENCE_DEADLINE_PREMIUM_MS') or 30000)
+    INFERENCE_DEADLINE_INTERACTIVE_MS = float(os.environ.get('INFERENCE_DEADLINE_INTERACTIVE_MS') or 20000)
+    INFERENCE_DEADLINE_BACKGROUND_MS = float(os.environ.get('INFERENCE_DEADLINE_BACKGROUND_MS') or 45000)
+    INFERENCE_MAX_QUEUED_IMAGES = int(os.environ.get('INFERENCE_MAX_QUEUED_IMAGES') or 512)
+    
+    # Bulk upload of offline scans (/predict/batch): images per request, rows per model call
+    BATCH_PREDICT_MAX_ITEMS = int(os.environ.get('BATCH_PREDICT_MAX_ITEMS') or 200)
+    BATCH_PREDICT_CHUNK_SIZE = int(os.environ.get('BATCH_PREDICT_CHUNK_SIZE') or 32)
+    
+    # Asynchronous prediction jobs (/predict?async=true): store is database or memory
+    PREDICTION_ASYNC_DEFAULT = os.environ.get('PREDICTION_ASYNC_DEFAULT', 'false').lower() == 'true'
+    JOB_QUEUE_BACKEND = os.environ.get('JOB_QUEUE_BACKEND') or 'database'
+    JOB_QUEUE_WORKERS = int(os.environ.get('JOB_QUEUE_WORKERS') or 2)
+    JOB_QUEUE_MAX_DEPTH = int(os.environ.get('JOB_QUEUE_MAX_DEPTH') or 100)  # backpressure: 503 beyond this
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS') or 3)
+    JOB_VISIBILITY_TIMEOUT = int(os.environ.get('JOB_VISIBILITY_TIMEOUT') or 300)  # re-run jobs of dead workers
+    JOB_CALLBACK_TIMEOUT = float(os.environ.get('JOB_CALLBACK_TIMEOUT') or 5)
+    # Callback URLs must resolve to public addresses; if set, only these hosts (comma-separated)
+    CALLBACK_ALLOWED_HOSTS = [
+        host.strip().lower() for host in os.environ.get('CALLBACK_ALLOWED_HOSTS', '').split(',') if host.strip()
+    ]
+    
+    # Write-behind buffer for detections: bulk insert every N rows or M ms, with an
+    # fsync'ed journal so acknowledged rows survive a worker crash or restart
+    WRITE_BUFFER_ENABLED = os.environ.get('WRITE_BUFFER_ENABLED', 'true').lower() == 'true'
+    WRITE_BUFFER_MAX_ROWS = int(os.environ.get('WRITE_BUFFER_MAX_ROWS') or 100)
+    WRITE_BUFFER_MAX_DELAY_MS = float(os.environ.get('WRITE_BUFFER_MAX_DELAY_MS') or 200)
+    WRITE_BUFFER_FSYNC = os.environ.get('WRITE_BUFFER_FSYNC', 'true').lower() == 'true'
+    WRITE_BUFFER_JOURNAL_DIR = os.environ.get('WRITE_BUFFER_JOURNAL_DIR') or os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), 'journal'
+    )
     
     # Redis for caching (if needed)
     REDIS_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379/0'
+    
+    # Prediction cache keyed by image content hash + plant type + model version
+    PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE') or 1024)
+    PREDICTION_CACHE_TTL = int(os.environ.get('PREDICTION_CACHE_TTL') or 3600)
+    PREDICTION_CACHE_SHARED = os.environ.get('PREDICTION_CACHE_SHARED', 'false').lower() == 'true'
+    
+    # Per-user detection stats memo, dropped on the user's next detection write;
+    # the TTL bounds staleness across workers (0 disables the memo)
+    DETECTION_STATS_CACHE_SIZE = int(os.environ.get('DETECTION_STATS_CACHE_SIZE') or 4096)
+    DETECTION_STATS_CACHE_TTL = int(os.environ.get('DETECTION_STATS_CACHE_TTL') or 300)
+    
+    # Serialized GET responses with strong ETags (0 disables): catalog entries live
+    # until a model reload, analytics for a short TTL since every write changes them,
+    # and detections (immutable once stored) for a longer one
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE') or 512)
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL') or 3600)
+    RESPONSE_CACHE_ANALYTICS_TTL = int(os.environ.get('RESPONSE_CACHE_ANALYTICS_TTL') or 30)
+    RESPONSE_CACHE_DETECTION_TTL = int(os.environ.get('RESPONSE_CACHE_DETECTION_TTL') or 300)
+    
+    # token_required: verified JWT claims (never past the token's exp) and user rows
+    # (dropped on user updates; the TTL bounds staleness across workers); 0 disables
+    AUTH_CACHE_SIZE = int(os.environ.get('AUTH_CACHE_SIZE') or 10000)
+    AUTH_TOKEN_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_TTL') or 300)
+    AUTH_USER_CACHE_TTL = int(os.environ.get('AUTH_USER_CACHE_TTL') or 30)
+    
+    # Token-bucket admission control per user, client IP and region (tokens per
+    # minute and burst); an inference (each image of a batch) costs
+    # RATE_LIMIT_INFERENCE_COST tokens, a read RATE_LIMIT_READ_COST; costs may not
+    # exceed a burst. Buckets are per process unless RATE_LIMIT_BACKEND=redis
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND') or 'memory'  # memory, redis
+    RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS') or 100000)
+    RATE_LIMIT_USER_PER_MINUTE = float(os.environ.get('RATE_LIMIT_USER_PER_MINUTE') or 30)
+    RATE_LIMIT_USER_BURST = float(os.environ.get('RATE_LIMIT_USER_BURST') or 20)
+    RATE_LIMIT_IP_PER_MINUTE = float(os.environ.get('RATE_LIMIT_IP_PER_MINUTE') or 120)
+    RATE_LIMIT_IP_BURST = float(os.environ.get('RATE_LIMIT_IP_BURST') or 60)
+    RATE_LIMIT_REGION_PER_MINUTE = float(os.environ.get('RATE_LIMIT_REGION_PER_MINUTE') or 1200)
+    RATE_LIMIT_REGION_BURST = float(os.environ.get('RATE_LIMIT_REGION_BURST') or 300)
+    RATE_LIMIT_PREMIUM_MULTIPLIER = float(os.environ.get('RATE_LIMIT_PREMIUM_MULTIPLIER') or 4)
+    RATE_LIMIT_INFERENCE_COST = float(os.environ.get('RATE_LIMIT_INFERENCE_COST') or 1)
+    RATE_LIMIT_READ_COST = float(os.environ.get('RATE_LIMIT_READ_COST') or 0.1)
+    
+    # Level of the app's loggers (app.*), written through Flask's default handler
+    LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
+    
+    # Prometheus metrics (stage timings, prediction / error counters, queue and
+    # memory gauges) served at /metrics; recording stops when disabled
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    # Directory where each gunicorn worker writes its metrics every
+    # METRICS_SNAPSHOT_INTERVAL seconds so /metrics can sum them (set by gunicorn.conf.py)
+    METRICS_MULTIPROC_DIR = os.environ.get('METRICS_MULTIPROC_DIR') or None
+    METRICS_SNAPSHOT_INTERVAL = float(os.environ.get('METRICS_SNAPSHOT_INTERVAL') or 5)
+    
+    # Admin-only profiling (off unless enabled): /api/v1/admin/profile samples all
+    # threads' stacks for up to PROFILING_MAX_SECONDS; a request sent with the
+    # X-Mkulima-Trace header gets a Server-Timing span breakdown, kept for lookup
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_MAX_SECONDS = float(os.environ.get('PROFILING_MAX_SECONDS') or 60)
+    PROFILING_TRACE_HISTORY = int(os.environ.get('PROFILING_TRACE_HISTORY') or 200)
+    
+    # Near-duplicate (burst photo) detection via perceptual hash, per user
+    NEAR_DUPLICATE_ENABLED = os.environ.get('NEAR_DUPLICATE_ENABLED', 'true').lower() == 'true'
+    NEAR_DUPLICATE_WINDOW_SECONDS = int(os.environ.get('NEAR_DUPLICATE_WINDOW_SECONDS') or 120)
+    NEAR_DUPLICATE_MAX_DISTANCE = int(os.environ.get('NEAR_DUPLICATE_MAX_DISTANCE') or 10)
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -39,6 +164,8 @@ class ProductionConfig(Config):
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    JOB_QUEUE_BACKEND = 'memory'
+    WRITE_BUFFER_ENABLED = False
 
 config = {
     'development': DevelopmentConfig,
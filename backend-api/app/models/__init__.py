@@ -5,5 +5,7 @@ Database Models Package
 
 from .user_model import User
 from .disease_model import DiseaseDetection, Plant
+from .job_model import PredictionJob
+from .analytics_model import DetectionDailyRollup
 
-__all__ = ['User', 'DiseaseDetection', 'Plant']
+__all__ = ['User', 'DiseaseDetection', 'Plant', 'PredictionJob', 'DetectionDailyRollup']
@@ -0,0 +1,36 @@
+# backend-api/app/models/analytics_model.py
+from app.services.database import db
+from datetime import datetime
+
+class DetectionDailyRollup(db.Model):
+    """
+    Detection counts per UTC day x region x plant type x disease x severity.
+    Kept current by DatabaseService.insert_detections / add_detection in the same
+    transaction as the detections; rebuilt for past days by `flask analytics backfill-rollups`.
+    """
+    __tablename__ = 'detection_daily_rollups'
+    
+    # The primary key leads with day, so date-range reads are index range scans
+    day = db.Column(db.Date, primary_key=True)
+    region = db.Column(db.String(50), primary_key=True)  # The detecting user's region
+    plant_type = db.Column(db.String(50), primary_key=True)
+    disease_name = db.Column(db.String(100), primary_key=True)
+    severity = db.Column(db.String(20), primary_key=True)
+    detection_count = db.Column(db.Integer, nullable=False, default=0)
+    confidence_sum = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convert rollup row to dictionary"""
+        return {
+            'day': self.day.isoformat(),
+            'region': self.region,
+            'plant_type': self.plant_type,
+            'disease_name': self.disease_name,
+            'severity': self.severity,
+            'detection_count': self.detection_count,
+            'average_confidence': self.confidence_sum / max(self.detection_count, 1)
+        }
+    
+    def __repr__(self):
+        return f'<DetectionDailyRollup {self.day} {self.region} {self.disease_name} ({self.detection_count})>'
@@ -6,6 +6,17 @@ import uuid
 class DiseaseDetection(db.Model):
     """Disease detection model for storing scan results"""
     __tablename__ = 'disease_detections'
+    __table_args__ = (
+        # Per-user history, newest first, with keyset pagination on (detected_at, id)
+        db.Index('ix_disease_detections_user_detected_at_id', 'user_id', 'detected_at', 'id'),
+        # Covers the per-user stats (counts by severity / disease, average confidence)
+        db.Index('ix_disease_detections_user_severity_disease', 'user_id', 'severity', 'disease_name', 'confidence'),
+        # Platform analytics: detections in a time range, most common diseases
+        db.Index('ix_disease_detections_detected_at', 'detected_at'),
+        db.Index('ix_disease_detections_disease_name', 'disease_name'),
+        # Outbreak radius and heatmap queries: geohash prefix ranges, filtered on time and disease in the index
+        db.Index('ix_disease_detections_geohash_detected_at', 'geohash', 'detected_at', 'disease_name'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
@@ -15,6 +26,9 @@ class DiseaseDetection(db.Model):
     severity = db.Column(db.String(20), nullable=False)  # Low, Medium, High
     image_path = db.Column(db.String(255))  # Path to stored image
     location = db.Column(db.String(100))  # GPS coordinates or region
+    latitude = db.Column(db.Float)  # Parsed from location when it holds coordinates
+    longitude = db.Column(db.Float)
+    geohash = db.Column(db.String(12))  # Of (latitude, longitude); prefixes are grid cells
     treatments = db.Column(db.JSON, default=list)  # List of treatment recommendations
     preventions = db.Column(db.JSON, default=list)  # List of prevention tips
     detected_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -32,6 +46,8 @@ class DiseaseDetection(db.Model):
             'severity': self.severity,
             'image_path': self.image_path,
             'location': self.location,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
             'treatments': self.treatments,
             'preventions': self.preventions,
             'detected_at': self.detected_at.isoformat(),
@@ -0,0 +1,51 @@
+# backend-api/app/models/job_model.py
+from app.services.database import db
+from datetime import datetime
+import uuid
+
+class PredictionJob(db.Model):
+    """Queued asynchronous prediction; its id doubles as the detection id"""
+    __tablename__ = 'prediction_jobs'
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, succeeded, failed
+    user_id = db.Column(db.String(36))  # Not a foreign key: anonymous uploads are allowed
+    plant_type = db.Column(db.String(50), nullable=False)
+    location = db.Column(db.String(100))
+    image_data = db.Column(db.LargeBinary)  # Upload bytes, cleared once the job has finished
+    callback_url = db.Column(db.String(500))
+    callback_status = db.Column(db.String(50))  # HTTP status of the webhook delivery, or error
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=3)
+    error = db.Column(db.Text)
+    result = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self, include_image=False):
+        """Convert job to a dictionary (the queue's job record)"""
+        job = {
+            'id': self.id,
+            'status': self.status,
+            'user_id': self.user_id,
+            'plant_type': self.plant_type,
+            'location': self.location,
+            'callback_url': self.callback_url,
+            'callback_status': self.callback_status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'error': self.error,
+            'result': self.result,
+            'created_at': self.created_at,
+            'next_attempt_at': self.next_attempt_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+        if include_image:
+            job['image_data'] = self.image_data
+        return job
+    
+    def __repr__(self):
+        return f'<PredictionJob {self.id} ({self.status})>'
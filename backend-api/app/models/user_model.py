@@ -12,7 +12,7 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     phone = db.Column(db.String(20))
     preferred_language = db.Column(db.String(10), default='sw')  # sw, en, kik, luo
-    region = db.Column(db.String(50), nullable=False)
+    region = db.Column(db.String(50), nullable=False, index=True)
     farm_size = db.Column(db.Float, default=0.0)  # in acres
     main_crops = db.Column(db.JSON, default=list)  # List of crops like ['maize', 'coffee']
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -20,6 +20,7 @@ class User(db.Model):
     total_scans = db.Column(db.Integer, default=0)
     successful_detections = db.Column(db.Integer, default=0)
     is_premium = db.Column(db.Boolean, default=False)
+    is_admin = db.Column(db.Boolean, default=False, nullable=False)  # profiling and other admin endpoints
     
     # Relationship with detections
     detections = db.relationship('DiseaseDetection', backref='user', lazy=True)
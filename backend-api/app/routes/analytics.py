@@ -1,36 +1,38 @@
 # backend-api/app/routes/analytics.py
 from flask import Blueprint, request, jsonify
 from datetime import datetime, timedelta
+import click
+from app.services.database import db, DatabaseService
+from app.services.analytics_rollup import backfill_rollups, disease_trends, regional_insights
+from app.services.detection_export import EXPORT_FORMATS, write_detection_export
+from app.services.response_cache import response_cache
+from app.services.rate_limiter import rate_limiter
+from app.services.spatial_queries import MAX_HEATMAP_PRECISION, detection_heatmap, nearby_detections
+from app.config import Config
 
 analytics_bp = Blueprint('analytics', __name__)
 
-# Mock data for analytics (replace with database queries)
+MAX_TREND_DAYS = 366
+MAX_RADIUS_KM = 200
+MAX_NEARBY_RESULTS = 500
+
+# Aggregates move with every detection written, so they are cached for a short
+# TTL rather than invalidated per write (which would make the cache useless)
+cached_analytics = response_cache.cached(
+    ttl=Config.RESPONSE_CACHE_ANALYTICS_TTL,
+    cache_control=f'public, max-age={Config.RESPONSE_CACHE_ANALYTICS_TTL}'
+)
+
+# Served from the detection_daily_rollups table, which is kept current as
+# detections are written; see `flask analytics backfill-rollups` for history
 @analytics_bp.route('/analytics/overview', methods=['GET'])
+@rate_limiter.limit('read')
+@cached_analytics
 def get_analytics_overview():
     """
     Get overview analytics for the platform
     """
-    # This would typically query the database
-    # For now, return mock data
-    
-    overview = {
-        'total_users': 1250,
-        'total_detections': 8920,
-        'active_today': 187,
-        'success_rate': 0.78,
-        'common_diseases': [
-            {'disease': 'Maize Lethal Necrosis', 'count': 2340},
-            {'disease': 'Coffee Leaf Rust', 'count': 1876},
-            {'disease': 'Tomato Late Blight', 'count': 1567},
-            {'disease': 'Banana Sigatoka', 'count': 1234}
-        ],
-        'regional_distribution': {
-            'Central': 450,
-            'Rift Valley': 320,
-            'Eastern': 280,
-            'Western': 200
-        }
-    }
+    overview = DatabaseService.get_platform_analytics()
     
     return jsonify({
         'success': True,
@@ -38,33 +40,34 @@ def get_analytics_overview():
     })
 
 @analytics_bp.route('/analytics/disease-trends', methods=['GET'])
+@rate_limiter.limit('read')
+@cached_analytics
 def get_disease_trends():
     """
-    Get disease trends over time
+    Get disease trends over time: daily diseased detections per plant type with
+    their 7-day average and outbreak z-score, plus week-over-week change per plant type
     """
     # Get time range from query parameters
-    days = int(request.args.get('days', 30))
+    try:
+        days = int(request.args.get('days', 30))
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'days must be an integer'
+        }), 400
     
-    # Generate mock trend data
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=days)
+    if not 1 <= days <= MAX_TREND_DAYS:
+        return jsonify({
+            'success': False,
+            'error': f'days must be between 1 and {MAX_TREND_DAYS}'
+        }), 400
     
-    trends = []
-    current_date = start_date
-    
-    while current_date <= end_date:
-        trends.append({
-            'date': current_date.strftime('%Y-%m-%d'),
-            'maize_diseases': 50 + (current_date.day % 20),
-            'coffee_diseases': 30 + (current_date.day % 15),
-            'tomato_diseases': 25 + (current_date.day % 10),
-            'banana_diseases': 20 + (current_date.day % 8)
-        })
-        current_date += timedelta(days=1)
+    trends, summary, start_date, end_date = disease_trends(db.session, days)
     
     return jsonify({
         'success': True,
         'trends': trends,
+        'summary': summary,
         'period': {
             'start': start_date.strftime('%Y-%m-%d'),
             'end': end_date.strftime('%Y-%m-%d'),
@@ -73,41 +76,208 @@ def get_disease_trends():
     })
 
 @analytics_bp.route('/analytics/regional-insights', methods=['GET'])
+@rate_limiter.limit('read')
+@cached_analytics
 def get_regional_insights():
     """
     Get disease insights by region
     """
-    regional_insights = {
-        'Central': {
-            'total_detections': 1250,
-            'top_diseases': [
-                {'disease': 'Maize Lethal Necrosis', 'count': 450},
-                {'disease': 'Coffee Berry Disease', 'count': 320},
-                {'disease': 'Tomato Early Blight', 'count': 280}
-            ],
-            'success_rate': 0.82
-        },
-        'Rift Valley': {
-            'total_detections': 980,
-            'top_diseases': [
-                {'disease': 'Maize Common Rust', 'count': 380},
-                {'disease': 'Wheat Rust', 'count': 290},
-                {'disease': 'Maize Gray Leaf Spot', 'count': 210}
-            ],
-            'success_rate': 0.75
-        },
-        'Eastern': {
-            'total_detections': 760,
-            'top_diseases': [
-                {'disease': 'Coffee Leaf Rust', 'count': 320},
-                {'disease': 'Maize Northern Leaf Blight', 'count': 240},
-                {'disease': 'Tomato Late Blight', 'count': 150}
-            ],
-            'success_rate': 0.79
-        }
-    }
+    return jsonify({
+        'success': True,
+        'regional_insights': regional_insights(db.session)
+    })
+
+def _float_arg(name, default=None, minimum=None, maximum=None):
+    """Float query parameter within [minimum, maximum]; raises ValueError with a client-facing message"""
+    raw = request.args.get(name)
+    if raw is None or raw == '':
+        if default is None:
+            raise ValueError(f'Missing required parameter: {name}')
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        raise ValueError(f'{name} must be a number')
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        raise ValueError(f'{name} must be between {minimum} and {maximum}')
+    return value
+
+def _time_window():
+    """Start of the ?days= window (default 14 days)"""
+    days = int(_float_arg('days', 14, 1, MAX_TREND_DAYS))
+    return datetime.utcnow() - timedelta(days=days), days
+
+@analytics_bp.route('/analytics/nearby', methods=['GET'])
+@rate_limiter.limit('read')
+def get_nearby_detections():
+    """
+    Detections within radius_km of lat/lon in the last `days` days, e.g. MLN cases
+    within 20 km of a farm: ?lat=-0.30&lon=36.07&radius_km=20&days=14&disease=Maize Lethal Necrosis
+    Only detections whose location held coordinates are included.
+    """
+    try:
+        latitude = _float_arg('lat', minimum=-90, maximum=90)
+        longitude = _float_arg('lon', minimum=-180, maximum=180)
+        radius_km = _float_arg('radius_km', 20, 0.01, MAX_RADIUS_KM)
+        limit = int(_float_arg('limit', 100, 1, MAX_NEARBY_RESULTS))
+        since, days = _time_window()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    nearby = nearby_detections(
+        db.session, latitude, longitude, radius_km, since,
+        disease_name=request.args.get('disease'), limit=limit
+    )
     
     return jsonify({
         'success': True,
-        'regional_insights': regional_insights
+        'center': {'latitude': latitude, 'longitude': longitude},
+        'radius_km': radius_km,
+        'days': days,
+        **nearby
     })
+
+@analytics_bp.route('/analytics/heatmap', methods=['GET'])
+@rate_limiter.limit('read')
+@cached_analytics
+def get_detection_heatmap():
+    """
+    Detection density per geohash cell inside a bounding box over the last `days`
+    days: ?bbox=min_lat,min_lon,max_lat,max_lon&days=14[&precision=5][&disease=...]
+    """
+    try:
+        bbox = [float(value) for value in request.args.get('bbox', '').split(',')]
+        if len(bbox) != 4:
+            raise ValueError
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'bbox must be min_lat,min_lon,max_lat,max_lon'
+        }), 400
+    
+    min_lat, min_lon, max_lat, max_lon = bbox
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= max_lon <= 180):
+        return jsonify({
+            'success': False,
+            'error': 'bbox is out of range or inverted'
+        }), 400
+    
+    try:
+        precision = request.args.get('precision')
+        precision = int(_float_arg('precision', minimum=1, maximum=MAX_HEATMAP_PRECISION)) if precision else None
+        since, days = _time_window()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    heatmap = detection_heatmap(
+        db.session, min_lat, min_lon, max_lat, max_lon, since,
+        precision=precision, disease_name=request.args.get('disease')
+    )
+    
+    return jsonify({
+        'success': True,
+        'bbox': bbox,
+        'days': days,
+        **heatmap
+    })
+
+@analytics_bp.cli.command('backfill-rollups')
+@click.option('--since', required=True, help='First day to rebuild (YYYY-MM-DD, UTC)')
+@click.option('--until', default=None, help='Last day to rebuild (YYYY-MM-DD, UTC); defaults to today')
+@click.option('--chunk-days', default=31, show_default=True, help='Days rebuilt per transaction')
+def backfill_rollups_command(since, until, chunk_days):
+    """
+    Rebuild the daily analytics rollups from disease_detections, e.g. once after
+    the migration for existing history, or after fixing detections by hand
+    """
+    try:
+        start_day = datetime.strptime(since, '%Y-%m-%d').date()
+        end_day = datetime.strptime(until, '%Y-%m-%d').date() if until else datetime.utcnow().date()
+    except ValueError:
+        raise click.BadParameter('dates must be YYYY-MM-DD')
+    
+    if end_day < start_day:
+        raise click.BadParameter('--until is before --since')
+    
+    written = backfill_rollups(db.session, start_day, end_day, chunk_days=max(1, chunk_days))
+    days = (end_day - start_day + timedelta(days=1)).days
+    click.echo(f'Rebuilt {days} days of detection rollups ({written} rows)')
+
+@analytics_bp.cli.command('export-detections')
+@click.option('--output', required=True, help='File to write')
+@click.option('--format', 'file_format', type=click.Choice(EXPORT_FORMATS), default='parquet', show_default=True)
+@click.option('--since', default=None, help='First day to export (YYYY-MM-DD, UTC)')
+@click.option('--until', default=None, help='Last day to export (YYYY-MM-DD, UTC)')
+@click.option('--chunk-rows', default=100000, show_default=True, help='Rows per row group / record batch')
+def export_detections_command(output, file_format, since, until, chunk_rows):
+    """
+    Export disease detections to a columnar Parquet or Arrow file for surveillance
+    reports, streaming rows from the database in chunks (needs pyarrow)
+    """
+    try:
+        start = datetime.strptime(since, '%Y-%m-%d') if since else None
+        end = datetime.strptime(until, '%Y-%m-%d') + timedelta(days=1) if until else None
+    except ValueError:
+        raise click.BadParameter('dates must be YYYY-MM-DD')
+    
+    try:
+        with db.engine.connect() as connection:
+            rows = write_detection_export(
+                connection, output, file_format=file_format,
+                since=start, until=end, chunk_rows=max(1, chunk_rows)
+            )
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    
+    click.echo(f'Exported {rows} detections to {output}')
+
+@analytics_bp.cli.command('backfill-coordinates')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows updated per transaction')
+def backfill_coordinates_command(batch_size):
+    """
+    Fill latitude / longitude / geohash for existing detections whose location
+    holds coordinates (new detections get them on write)
+    """
+    from app.models.disease_model import DiseaseDetection
+    
+    table = DiseaseDetection.__table__
+    updated, last_id = 0, ''
+    while True:
+        rows = db.session.execute(
+            db.select(table.c.id, table.c.location).where(
+                table.c.id > last_id, table.c.location.isnot(None), table.c.geohash.is_(None)
+            ).order_by(table.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        
+        values = []
+        for row in rows:
+            coordinates = DatabaseService.detection_coordinates({'location': row.location})
+            if coordinates['geohash'] is not None:
+                values.append({
+                    'b_id': row.id,
+                    'b_latitude': coordinates['latitude'],
+                    'b_longitude': coordinates['longitude'],
+                    'b_geohash': coordinates['geohash']
+                })
+        if values:
+            db.session.execute(
+                table.update().where(table.c.id == db.bindparam('b_id')).values(
+                    latitude=db.bindparam('b_latitude'),
+                    longitude=db.bindparam('b_longitude'),
+                    geohash=db.bindparam('b_geohash')
+                ),
+                values
+            )
+        db.session.commit()
+        updated += len(values)
+    
+    click.echo(f'Parsed coordinates for {updated} detections')
@@ -1,20 +1,265 @@
 # backend-api/app/routes/prediction.py
-from flask import Blueprint, request, jsonify
-from app.services.ai_predictor import AIPredictor
-from app.services.image_processor import ImageProcessor
-from app.utils.helpers import allowed_file, validate_image
+from flask import Blueprint, Response, request, jsonify, url_for
+from werkzeug.datastructures import FileStorage
+from app.services.ai_predictor import AIPredictor, InferenceShedError
+from app.services.image_processor import ImageProcessor, ImageValidationError
+from app.services.prediction_cache import create_prediction_cache
+from app.services.near_duplicate import NearDuplicateIndex
+from app.services.batch_prediction import (
+    BatchPredictionRunner, iter_multipart_items, iter_zip_items, zip_image_members,
+    spool_stream, parse_client_timestamp
+)
+from app.services.job_queue import JobQueue, QueueFullError, PermanentJobError, CallbackURLError
+from app.services.write_buffer import DetectionWriteBuffer
+from app.services.response_cache import response_cache, json_with_fragments
+from app.services.rate_limiter import rate_limiter
+from app.services.auth_cache import user_cache
+from app.utils.metrics import registry, observe_stage, observe_timings, process_rss_bytes
+from app.utils.auth import _authenticate
+from app.services.database import db, DatabaseService
+from app.models.user_model import User
+from app.models.disease_model import DiseaseDetection
+from app.config import Config
+import io
+import logging
 import os
+import time
 import uuid
+import zipfile
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 prediction_bp = Blueprint('prediction', __name__)
 ai_predictor = AIPredictor()
 image_processor = ImageProcessor()
+prediction_cache = create_prediction_cache(Config)
+near_duplicates = NearDuplicateIndex(
+    window_seconds=Config.NEAR_DUPLICATE_WINDOW_SECONDS,
+    max_distance=Config.NEAR_DUPLICATE_MAX_DISTANCE
+)
+
+detection_writer = DetectionWriteBuffer(
+    max_rows=Config.WRITE_BUFFER_MAX_ROWS,
+    max_delay_ms=Config.WRITE_BUFFER_MAX_DELAY_MS,
+    fsync=Config.WRITE_BUFFER_FSYNC
+)
+
+# plant_type is client input: unknown values are counted as 'other' to bound label cardinality
+METRIC_PLANT_TYPES = ('maize', 'coffee', 'tomato', 'banana')
+PREDICTIONS = registry.counter(
+    'mkulima_predictions', 'Predictions served by plant type, predicted disease and source',
+    ['plant_type', 'disease', 'source']
+)
+PREDICTION_ERRORS = registry.counter(
+    'mkulima_prediction_errors', 'Failed prediction requests by error class', ['error']
+)
+
+def _record_prediction(plant_type, prediction, cached, near_duplicate, timings):
+    observe_timings(timings)
+    PREDICTIONS.labels(
+        plant_type if plant_type in METRIC_PLANT_TYPES else 'other',
+        prediction['disease_name'],
+        'cache' if cached else 'near_duplicate' if near_duplicate else 'model'
+    ).inc()
+
+# Gauges are per worker; multiprocess_mode says how /metrics combines the workers' values
+QUEUED_IMAGES = registry.gauge(
+    'mkulima_inference_queued_images', 'Images waiting for the model by priority class', ['priority'],
+    multiprocess_mode='sum'
+)
+INFERENCE_INFLIGHT = registry.gauge(
+    'mkulima_inference_inflight', 'Inference requests submitted and not yet answered', multiprocess_mode='sum'
+)
+# Every worker counts the same shared (database) queue
+JOBS_PENDING = registry.gauge(
+    'mkulima_jobs_pending', 'Async prediction jobs waiting for a worker', multiprocess_mode='max'
+)
+WRITES_BUFFERED = registry.gauge(
+    'mkulima_writes_buffered', 'Detections buffered but not yet in the database', multiprocess_mode='sum'
+)
+MODEL_LOADED = registry.gauge('mkulima_model_loaded', '1 when a model is loaded (0: mock predictions)')
+MODEL_SIZE = registry.gauge(
+    'mkulima_model_size_bytes', 'On-disk size of the loaded model', multiprocess_mode='max'
+)
+PROCESS_RSS = registry.gauge('mkulima_process_resident_memory_bytes', 'Resident memory of this worker')
+
+def _collect_gauges(metrics):
+    """Refresh gauges from the services that own the state, at scrape time"""
+    queued, inflight = ai_predictor.batcher.queue_depths()
+    for priority, images in queued.items():
+        QUEUED_IMAGES.labels(priority).set(images)
+    INFERENCE_INFLIGHT.set(inflight)
+    JOBS_PENDING.set(job_queue.store.count_pending())
+    WRITES_BUFFERED.set(detection_writer.stats()['buffered'])
+    MODEL_LOADED.set(1 if ai_predictor.backend is not None else 0)
+    MODEL_SIZE.set(ai_predictor.model_size_bytes())
+    rss = process_rss_bytes()
+    if rss is not None:
+        PROCESS_RSS.set(rss)
+
+def _on_model_reload(predictor):
+    prediction_cache.invalidate()
+    near_duplicates.clear()
+    response_cache.invalidate('model')
+
+ai_predictor.add_reload_listener(_on_model_reload)
+
+def _near_duplicate_key():
+    """
+    Near-duplicate matches hand back an earlier prediction, so the index is keyed on
+    the user of a verified bearer token; anonymous callers (and a user_id form field,
+    which anyone can send) get None and skip the lookup
+    """
+    if 'Authorization' not in request.headers:
+        return None
+    user, error = _authenticate()
+    return user.id if error is None else None
+
+def _run_prediction(upload, plant_type, user_key, priority='interactive'):
+    """
+    Cache lookup, preprocessing, near-duplicate lookup and inference for one upload
+    Returns (prediction, cached, near_duplicate); stage timings go to upload.timings
+    user_key: authenticated user for near-duplicate lookups, None to skip them
+    """
+    # Retried / re-submitted photos are answered from the cache without inference
+    ai_predictor.load()
+    cache_key = prediction_cache.make_key(upload.data, plant_type, ai_predictor.model_version)
+    prediction = prediction_cache.get(cache_key)
+    if prediction is not None:
+        return prediction, True, False
+    
+    # Process image (also computes its perceptual hash), reusing the already-opened image
+    processed_image = image_processor.preprocess(upload)
+    
+    # Burst photos of the same leaf reuse the user's recent prediction
+    check_near_duplicates = Config.NEAR_DUPLICATE_ENABLED and user_key is not None
+    near_duplicate = False
+    if check_near_duplicates:
+        prediction, _ = near_duplicates.find(
+            user_key, upload.phash, plant_type, ai_predictor.model_version
+        )
+        near_duplicate = prediction is not None
+    
+    if not near_duplicate:
+        inference_start = time.perf_counter()
+        prediction = ai_predictor.predict(processed_image, plant_type, priority=priority)
+        upload.timings['inference'] = (time.perf_counter() - inference_start) * 1000
+        if check_near_duplicates:
+            near_duplicates.add(
+                user_key, upload.phash, plant_type, ai_predictor.model_version, prediction
+            )
+        # Only the model's own answer for these bytes goes under their content hash; a
+        # near-duplicate match is another photo's prediction, for this user only
+        prediction_cache.set(cache_key, prediction)
+    return prediction, False, near_duplicate
+
+def _prediction_response(detection_id, prediction, plant_type, location, cached, near_duplicate, timings):
+    response_data = {
+        'success': True,
+        'detection_id': detection_id,
+        'disease': prediction['disease_name'],
+        'confidence': float(prediction['confidence']),
+        'severity': prediction['severity'],
+        'treatment': prediction['treatments'],
+        'prevention': prediction['preventions'],
+        'plant_type': plant_type,
+        'timestamp': prediction['timestamp'],
+        'cached': cached,
+        'near_duplicate': near_duplicate,
+        'timings_ms': {stage: round(ms, 2) for stage, ms in timings.items()}
+    }
+    
+    # Add location if provided
+    if location:
+        response_data['location'] = location
+    
+    return response_data
+
+def _prediction_json(response_data, fragments):
+    """
+    JSON response with the pre-encoded knowledge-base lists (see
+    AIPredictor.knowledge_fragments_for) spliced in instead of re-encoded
+    """
+    with observe_stage('serialize'):
+        if fragments is None:
+            return jsonify(response_data)
+        payload = {key: value for key, value in response_data.items() if key not in fragments}
+        return Response(json_with_fragments(payload, fragments), mimetype='application/json')
+
+def _store_detection(detection_id, user_id, prediction, plant_type, location):
+    """
+    Persist a detection through the write-behind buffer; durable once this returns
+    """
+    with observe_stage('db_write'):
+        _buffer_detection(detection_id, user_id, prediction, plant_type, location)
+
+def _buffer_detection(detection_id, user_id, prediction, plant_type, location):
+    detection_writer.add({
+        'id': detection_id,
+        'user_id': user_id,
+        'plant_type': plant_type,
+        'disease_name': prediction['disease_name'],
+        'confidence': float(prediction['confidence']),
+        'severity': prediction['severity'],
+        'location': location,
+        'treatments': prediction['treatments'],
+        'preventions': prediction['preventions'],
+        'detected_at': datetime.utcnow(),
+        'is_synced': True,
+        'is_local_detection': False
+    })
+
+def _process_job(job):
+    """
+    Job queue handler: runs the same pipeline as a synchronous /predict
+    """
+    try:
+        upload = image_processor.load_upload(FileStorage(stream=io.BytesIO(job['image_data'])))
+    except ImageValidationError as e:
+        raise PermanentJobError(str(e))
+    
+    # Async jobs are background work; a shed job is retried by the queue with backoff.
+    # job['user_id'] is unauthenticated form input, so jobs skip near-duplicate lookups
+    try:
+        prediction, cached, near_duplicate = _run_prediction(
+            upload, job['plant_type'], None, priority='background'
+        )
+    except ImageValidationError as e:
+        raise PermanentJobError(str(e))
+    _record_prediction(job['plant_type'], prediction, cached, near_duplicate, upload.timings)
+    if job['user_id']:
+        _store_detection(job['id'], job['user_id'], prediction, job['plant_type'], job['location'])
+    return _prediction_response(
+        job['id'], prediction, job['plant_type'], job['location'], cached, near_duplicate, upload.timings
+    )
+
+job_queue = JobQueue(
+    _process_job,
+    workers=Config.JOB_QUEUE_WORKERS,
+    max_depth=Config.JOB_QUEUE_MAX_DEPTH,
+    max_attempts=Config.JOB_MAX_ATTEMPTS,
+    visibility_timeout=Config.JOB_VISIBILITY_TIMEOUT,
+    callback_timeout=Config.JOB_CALLBACK_TIMEOUT,
+    callback_allowed_hosts=Config.CALLBACK_ALLOWED_HOSTS
+)
+registry.add_collector(_collect_gauges)
+
+def _wants_async():
+    if 'respond-async' in request.headers.get('Prefer', ''):
+        return True
+    value = request.values.get('async')
+    if value is None:
+        return Config.PREDICTION_ASYNC_DEFAULT
+    return value.lower() in ('1', 'true', 'yes')
 
 @prediction_bp.route('/predict', methods=['POST'])
+@rate_limiter.limit('inference')
 def predict_disease():
     """
     Predict plant disease from uploaded image
+    With async=true (or "Prefer: respond-async") the upload is validated, queued and
+    answered with 202 and a job id; poll /detections/<id> or pass a callback_url.
     """
     try:
         # Check if image file is present
@@ -33,59 +278,221 @@ def predict_disease():
                 'error': 'No file selected'
             }), 400
         
-        # Validate file type
-        if not allowed_file(image_file.filename):
-            return jsonify({
-                'success': False,
-                'error': 'Invalid file type. Only PNG, JPG, JPEG allowed'
-            }), 400
-        
         # Get plant type from form data
         plant_type = request.form.get('plant_type', 'maize').lower()
         location = request.form.get('location')
         user_id = request.form.get('user_id')
         
-        # Validate image
-        validation_error = validate_image(image_file)
-        if validation_error:
+        # The detection is stored for user_id after the response, so an unknown user
+        # is refused now instead of being handed a detection_id that is never written
+        user = user_cache.get(db.session, user_id) if user_id else None
+        if user_id and user is None:
             return jsonify({
                 'success': False,
-                'error': validation_error
+                'error': 'User not found'
+            }), 404
+        
+        # Read and validate the upload in a single pass (type from magic bytes,
+        # size, dimensions) without decoding pixel data
+        try:
+            upload = image_processor.load_upload(image_file)
+        except ImageValidationError as e:
+            PREDICTION_ERRORS.labels(type(e).__name__).inc()
+            return jsonify({
+                'success': False,
+                'error': str(e)
             }), 400
         
-        # Process image and make prediction
-        processed_image = image_processor.preprocess(image_file)
-        prediction = ai_predictor.predict(processed_image, plant_type)
+        if _wants_async():
+            return _submit_job(upload, plant_type, location, user_id)
+        
+        try:
+            prediction, cached, near_duplicate = _run_prediction(
+                upload, plant_type, _near_duplicate_key(),
+                priority='premium' if user is not None and user.is_premium else 'interactive'
+            )
+        except ImageValidationError as e:
+            PREDICTION_ERRORS.labels(type(e).__name__).inc()
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        except InferenceShedError as e:
+            PREDICTION_ERRORS.labels(type(e).__name__).inc()
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 503, {'Retry-After': str(e.retry_after)}
+        _record_prediction(plant_type, prediction, cached, near_duplicate, upload.timings)
         
         # Generate unique ID for this detection
         detection_id = str(uuid.uuid4())
+        if user_id:
+            _store_detection(detection_id, user_id, prediction, plant_type, location)
         
-        # Prepare response
-        response_data = {
-            'success': True,
-            'detection_id': detection_id,
-            'disease': prediction['disease_name'],
-            'confidence': float(prediction['confidence']),
-            'severity': prediction['severity'],
-            'treatment': prediction['treatments'],
-            'prevention': prediction['preventions'],
-            'plant_type': plant_type,
-            'timestamp': prediction['timestamp']
+        return _prediction_json(_prediction_response(
+            detection_id, prediction, plant_type, location, cached, near_duplicate, upload.timings
+        ), ai_predictor.knowledge_fragments_for(prediction))
+    
+    except Exception as e:
+        PREDICTION_ERRORS.labels(type(e).__name__).inc()
+        logger.exception('Prediction failed')
+        return jsonify({
+            'success': False,
+            'error': f'Prediction failed: {str(e)}'
+        }), 500
+
+def _submit_job(upload, plant_type, location, user_id):
+    """
+    Queue an already validated upload; 202 with the job id, or 503 when the queue is full
+    """
+    callback_url = request.form.get('callback_url')
+    
+    try:
+        job = job_queue.submit(
+            upload.data, plant_type, location=location, user_id=user_id, callback_url=callback_url
+        )
+    except CallbackURLError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except QueueFullError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Prediction queue is full, please retry later',
+            'retry_after': e.retry_after
+        }), 503, {'Retry-After': str(e.retry_after)}
+    
+    status_url = url_for('prediction.get_detection', detection_id=job['id'])
+    return jsonify({
+        'success': True,
+        'job_id': job['id'],
+        'detection_id': job['id'],
+        'status': job['status'],
+        'status_url': status_url
+    }), 202, {'Location': status_url}
+
+@prediction_bp.route('/predict/batch', methods=['POST'])
+@rate_limiter.limit('inference')
+def predict_batch():
+    """
+    Predict many images in one request, e.g. scans taken offline and synced later
+    Accepts multipart (repeated `images` fields plus an optional `metadata` JSON
+    list with plant_type, location and timestamp per image), a zip file in the
+    `archive` field or a raw application/zip body (optional manifest.json inside).
+    Results are stored in one bulk insert when user_id is given.
+    Every image costs one inference in the rate limiter: admission pays for the
+    first, and images past the caller's budget fail with a retryable error.
+    """
+    archive = None
+    try:
+        defaults = {
+            'plant_type': request.values.get('plant_type'),
+            'location': request.values.get('location')
         }
+        user_id = request.values.get('user_id')
+        
+        if user_id and db.session.get(User, user_id) is None:
+            return jsonify({
+                'success': False,
+                'error': 'User not found'
+            }), 404
         
-        # Add location if provided
-        if location:
-            response_data['location'] = location
+        archive_file = None
+        if request.mimetype in ('application/zip', 'application/x-zip-compressed'):
+            archive_file = spool_stream(request.stream)
+        elif 'archive' in request.files:
+            archive_file = request.files['archive'].stream
         
-        return jsonify(response_data)
+        try:
+            if archive_file is not None:
+                archive = zipfile.ZipFile(archive_file)
+                members = zip_image_members(archive)
+                count = len(members)
+                items = iter_zip_items(archive, members, defaults, max_bytes=image_processor.max_bytes)
+            else:
+                files = [f for f in request.files.getlist('images') if f.filename != '']
+                count = len(files)
+                items = iter_multipart_items(files, request.form.get('metadata'), defaults)
+        except zipfile.BadZipFile:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid zip archive'
+            }), 400
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid metadata: {str(e)}'
+            }), 400
         
+        if count == 0:
+            return jsonify({
+                'success': False,
+                'error': 'No images provided'
+            }), 400
+        if count > Config.BATCH_PREDICT_MAX_ITEMS:
+            return jsonify({
+                'success': False,
+                'error': f'Too many images. Maximum is {Config.BATCH_PREDICT_MAX_ITEMS} per request.'
+            }), 400
+        
+        runner = BatchPredictionRunner(
+            image_processor, ai_predictor,
+            chunk_size=Config.BATCH_PREDICT_CHUNK_SIZE,
+            cache=prediction_cache,
+            admit=rate_limiter.admission('inference', prepaid=1)
+        )
+        results, timings = runner.run(items)
+        succeeded = [result for result in results if result['success']]
+        
+        if user_id and succeeded:
+            detection_ids = DatabaseService.add_detections_bulk(user_id, [{
+                'plant_type': result['plant_type'],
+                'disease_name': result['disease'],
+                'confidence': result['confidence'],
+                'severity': result['severity'],
+                'location': result['location'],
+                'treatments': result['treatment'],
+                'preventions': result['prevention'],
+                'detected_at': parse_client_timestamp(result['client_timestamp']),
+                'is_synced': True,
+                'is_local_detection': False
+            } for result in succeeded])
+            for result, detection_id in zip(succeeded, detection_ids):
+                result['detection_id'] = detection_id
+        
+        return jsonify({
+            'success': True,
+            'results': results,
+            'summary': {
+                'total': len(results),
+                'succeeded': len(succeeded),
+                'failed': len(results) - len(succeeded),
+                'persisted': bool(user_id) and len(succeeded) > 0,
+                'model_batches': timings['batches']
+            },
+            'timings_ms': {
+                'preprocess': round(timings['preprocess'], 2),
+                'inference': round(timings['inference'], 2)
+            }
+        }), 200, {'Retry-After': str(runner.retry_after)} if runner.retry_after else {}
+    
     except Exception as e:
+        db.session.rollback()
+        PREDICTION_ERRORS.labels(type(e).__name__).inc()
+        logger.exception('Batch prediction failed')
         return jsonify({
             'success': False,
-            'error': f'Prediction failed: {str(e)}'
+            'error': f'Batch prediction failed: {str(e)}'
         }), 500
+    finally:
+        if archive is not None:
+            archive.close()
 
 @prediction_bp.route('/plants', methods=['GET'])
+@rate_limiter.limit('read')
+@response_cache.cached(tags=('model',), cache_control='public, max-age=3600')
 def get_supported_plants():
     """
     Get list of supported plants and their diseases
@@ -139,20 +546,98 @@ def get_supported_plants():
     })
 
 @prediction_bp.route('/detections/<detection_id>', methods=['GET'])
+@rate_limiter.limit('read')
+@response_cache.cached(ttl=Config.RESPONSE_CACHE_DETECTION_TTL,
+                       cache_control=f'private, max-age={Config.RESPONSE_CACHE_DETECTION_TTL}')
 def get_detection(detection_id):
     """
     Get specific detection by ID
+    Also the status endpoint of async prediction jobs: detection is null while
+    the job is queued or running
     """
-    # This would typically fetch from database
-    # For now, return mock data
+    job = job_queue.get(detection_id)
+    if job is not None:
+        response_data = {
+            'success': True,
+            'detection_id': detection_id,
+            'status': job['status'],
+            'attempts': job['attempts'],
+            'detection': job['result'] if job['status'] == 'succeeded' else None
+        }
+        if job['status'] == 'failed':
+            response_data['error'] = job['error']
+        if job['status'] in ('queued', 'running'):
+            return jsonify(response_data), 200, {'Retry-After': '1', 'Cache-Control': 'no-store'}
+        return jsonify(response_data)
+    
+    # Acknowledged detections may still be waiting in the write-behind buffer;
+    # those are not cached, the stored row's to_dict() is the canonical form
+    detection = detection_writer.get(detection_id)
+    headers = {'Cache-Control': 'no-store'} if detection is not None else {}
+    if detection is None:
+        detection = db.session.get(DiseaseDetection, detection_id)
+        if detection is None:
+            return jsonify({
+                'success': False,
+                'error': 'Detection not found'
+            }), 404
+        detection = detection.to_dict()
+    
     return jsonify({
         'success': True,
-        'detection': {
-            'id': detection_id,
-            'disease': 'Maize Lethal Necrosis',
-            'confidence': 0.85,
-            'severity': 'High',
-            'plant_type': 'maize',
-            'timestamp': datetime.utcnow().isoformat()
-        }
+        'detection_id': detection_id,
+        'status': 'succeeded',
+        'detection': detection
+    }), 200, headers
+
+@prediction_bp.route('/model/cache', methods=['GET'])
+def get_cache_stats():
+    """
+    Get prediction cache hit/miss/eviction counters
+    """
+    return jsonify({
+        'success': True,
+        'cache': prediction_cache.stats(),
+        'near_duplicates': near_duplicates.stats(),
+        'responses': response_cache.stats()
+    })
+
+@prediction_bp.route('/model/batching', methods=['GET'])
+def get_batching_stats():
+    """
+    Get inference micro-batching metrics (queue depth, batch sizes, wait times)
+    """
+    return jsonify({
+        'success': True,
+        'batching': ai_predictor.batching_stats()
+    })
+
+@prediction_bp.route('/model/jobs', methods=['GET'])
+def get_job_queue_stats():
+    """
+    Get async prediction queue metrics (depth, retries, queue latency)
+    """
+    return jsonify({
+        'success': True,
+        'jobs': job_queue.stats()
+    })
+
+@prediction_bp.route('/model/writes', methods=['GET'])
+def get_write_buffer_stats():
+    """
+    Get write-behind buffer counters (buffered rows, flushes, replayed rows)
+    """
+    return jsonify({
+        'success': True,
+        'writes': detection_writer.stats()
+    })
+
+@prediction_bp.route('/model/limits', methods=['GET'])
+def get_rate_limit_stats():
+    """
+    Get rate limiter settings and admission decisions (allowed / limited per request kind)
+    """
+    return jsonify({
+        'success': True,
+        'limits': rate_limiter.stats()
     })
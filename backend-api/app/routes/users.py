@@ -1,14 +1,14 @@
 # backend-api/app/routes/users.py
 from flask import Blueprint, request, jsonify
-import uuid
-from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+import click
+from app.services.database import db, DatabaseService
+from app.services.auth_cache import user_cache
+from app.services.rate_limiter import rate_limiter
+from app.routes.prediction import detection_writer
 
 users_bp = Blueprint('users', __name__)
 
-# In-memory storage for demo (replace with database in production)
-users_db = {}
-detections_db = {}
-
 @users_bp.route('/users', methods=['POST'])
 def create_user():
     """
@@ -31,42 +31,34 @@ def create_user():
                     'error': f'Missing required field: {field}'
                 }), 400
         
-        user_id = str(uuid.uuid4())
-        
-        user_data = {
-            'id': user_id,
-            'name': data['name'],
-            'email': data['email'],
-            'phone': data.get('phone', ''),
-            'region': data['region'],
-            'preferred_language': data.get('preferred_language', 'sw'),
-            'farm_size': data.get('farm_size', 0),
-            'main_crops': data.get('main_crops', ['maize']),
-            'created_at': datetime.utcnow().isoformat(),
-            'total_scans': 0,
-            'successful_detections': 0
-        }
-        
-        users_db[user_id] = user_data
-        detections_db[user_id] = []
+        try:
+            user = DatabaseService.create_user(data)
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'error': 'A user with this email already exists'
+            }), 409
         
         return jsonify({
             'success': True,
-            'user': user_data
+            'user': user.to_dict()
         }), 201
-        
+    
     except Exception as e:
+        db.session.rollback()
         return jsonify({
             'success': False,
             'error': f'Failed to create user: {str(e)}'
         }), 500
 
 @users_bp.route('/users/<user_id>', methods=['GET'])
+@rate_limiter.limit('read')
 def get_user(user_id):
     """
     Get user by ID
     """
-    user = users_db.get(user_id)
+    user = DatabaseService.get_user(user_id)
     
     if not user:
         return jsonify({
@@ -76,45 +68,52 @@ def get_user(user_id):
     
     return jsonify({
         'success': True,
-        'user': user
+        'user': user.to_dict()
     })
 
 @users_bp.route('/users/<user_id>/detections', methods=['GET'])
+@rate_limiter.limit('read')
 def get_user_detections(user_id):
     """
-    Get detection history for a user
+    Get detection history for a user, newest first
+    Pass the returned next_cursor as ?cursor= to fetch the following page
     """
-    if user_id not in detections_db:
+    if DatabaseService.get_user(user_id) is None:
         return jsonify({
             'success': False,
             'error': 'User not found'
         }), 404
     
-    detections = detections_db[user_id]
+    # Include detections this worker has acknowledged but not yet written
+    detection_writer.flush_user(user_id)
     
     # Add pagination parameters
-    limit = min(int(request.args.get('limit', 50)), 100)
-    offset = int(request.args.get('offset', 0))
-    
-    paginated_detections = detections[offset:offset + limit]
+    try:
+        limit = max(1, min(int(request.args.get('limit', 50)), 100))
+        page = DatabaseService.get_user_detections(user_id, limit=limit, cursor=request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     
     return jsonify({
         'success': True,
-        'detections': paginated_detections,
+        'detections': page['detections'],
         'pagination': {
-            'total': len(detections),
-            'limit': limit,
-            'offset': offset,
-            'has_more': offset + limit < len(detections)
+            'limit': page['limit'],
+            'next_cursor': page['next_cursor'],
+            'has_more': page['has_more']
         }
     })
 
 @users_bp.route('/users/<user_id>/stats', methods=['GET'])
+@rate_limiter.limit('read')
 def get_user_stats(user_id):
     """
     Get user statistics
     """
-    user = users_db.get(user_id)
+    user = DatabaseService.get_user(user_id)
     
     if not user:
         return jsonify({
@@ -122,33 +121,45 @@ def get_user_stats(user_id):
             'error': 'User not found'
         }), 404
     
-    user_detections = detections_db.get(user_id, [])
-    
-    # Calculate statistics
-    total_detections = len(user_detections)
-    high_severity = len([d for d in user_detections if d.get('severity') == 'High'])
-    medium_severity = len([d for d in user_detections if d.get('severity') == 'Medium'])
-    low_severity = len([d for d in user_detections if d.get('severity') == 'Low'])
+    # Include detections this worker has acknowledged but not yet written; the
+    # flush commits in its own session, so reload the user's scan counters
+    if detection_writer.flush_user(user_id):
+        db.session.refresh(user)
+    detection_stats = DatabaseService.get_detection_stats(user_id)
+    severity_counts = detection_stats['severity_breakdown']
+    disease_counts = detection_stats['disease_breakdown']
+    last_detection = detection_stats['last_detection']
     
     # Most common disease
-    disease_counts = {}
-    for detection in user_detections:
-        disease = detection.get('disease', 'Unknown')
-        disease_counts[disease] = disease_counts.get(disease, 0) + 1
-    
     most_common_disease = max(disease_counts, key=disease_counts.get) if disease_counts else 'None'
     
     stats = {
-        'total_detections': total_detections,
-        'high_severity_count': high_severity,
-        'medium_severity_count': medium_severity,
-        'low_severity_count': low_severity,
+        'total_detections': detection_stats['total_detections'],
+        'high_severity_count': severity_counts.get('High', 0),
+        'medium_severity_count': severity_counts.get('Medium', 0),
+        'low_severity_count': severity_counts.get('Low', 0),
         'most_common_disease': most_common_disease,
-        'success_rate': user.get('successful_detections', 0) / max(user.get('total_scans', 1), 1),
-        'last_detection': user_detections[0].get('timestamp') if user_detections else None
+        'success_rate': user.successful_detections / max(user.total_scans, 1),
+        'last_detection': last_detection.isoformat() if last_detection else None
     }
     
     return jsonify({
         'success': True,
         'stats': stats
     })
+
+@users_bp.cli.command('set-admin')
+@click.argument('user_id')
+@click.option('--revoke', is_flag=True, help='Remove admin privileges instead')
+def set_admin_command(user_id, revoke):
+    """
+    Grant (or revoke) admin privileges, needed for the profiling endpoints
+    """
+    user = DatabaseService.get_user(user_id)
+    if not user:
+        raise click.ClickException(f'User {user_id} not found')
+    
+    user.is_admin = not revoke
+    db.session.commit()
+    user_cache.invalidate([user_id])
+    click.echo(f"{'Revoked' if revoke else 'Granted'} admin privileges for {user.name} ({user_id})")
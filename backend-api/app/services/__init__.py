@@ -3,7 +3,15 @@
 Business Logic Services Package
 """
 
-from .ai_predictor import AIPredictor
-from .image_processor import ImageProcessor
-
 __all__ = ['AIPredictor', 'ImageProcessor']
+
+def __getattr__(name):
+    # Imported on first use so that importing app.services.database (and with it
+    # app.routes, /health, users and analytics) does not pull in the model stack
+    if name == 'AIPredictor':
+        from .ai_predictor import AIPredictor
+        return AIPredictor
+    if name == 'ImageProcessor':
+        from .image_processor import ImageProcessor
+        return ImageProcessor
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
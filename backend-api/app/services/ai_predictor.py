@@ -1,29 +1,899 @@
 # backend-api/app/services/ai_predictor.py
-import tensorflow as tf
 import numpy as np
+import collections
 import json
+import logging
+import math
 import os
+import threading
+import time
+import weakref
+from concurrent.futures import Future
 from datetime import datetime
+from app.config import Config
+from app.utils.metrics import registry, observe_stage
 
-class AIPredictor:
+logger = logging.getLogger(__name__)
+
+MODEL_LOADS = registry.counter('mkulima_model_loads', 'Model load attempts by result', ['result'])
+MODEL_LOAD_SECONDS = registry.histogram(
+    'mkulima_model_load_seconds', 'Time to load the model and its labels',
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+)
+
+class InferenceShedError(Exception):
+    """
+    Raised for work the scheduler dropped without running it: its deadline passed
+    while it was queued ('expired') or lower-priority work made room ('overload')
+    """
+    def __init__(self, reason, retry_after):
+        super().__init__(
+            'Inference deadline exceeded' if reason == 'expired' else 'Inference capacity exceeded'
+        )
+        self.reason = reason
+        self.retry_after = retry_after
+
+class BatchingMetrics:
+    """
+    Counters for tuning the micro-batching engine, overall and per priority class
+    """
     def __init__(self):
-        self.model = None
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.inline_requests = 0
+            self.batches = 0
+            self.batched_images = 0
+            self.batch_size_histogram = {}
+            self.queue_depth = 0
+            self.max_queue_depth = 0
+            self.total_queue_wait = 0.0
+            self.total_inference_time = 0.0
+            self.classes = {}
+    
+    def _class(self, priority):
+        counters = self.classes.get(priority)
+        if counters is None:
+            counters = self.classes[priority] = {
+                'requests': 0, 'completed': 0, 'shed_expired': 0, 'shed_overload': 0,
+                'queue_wait': 0.0, 'service_time': 0.0
+            }
+        return counters
+    
+    def record_enqueue(self, depth, priority):
+        with self._lock:
+            self.requests += 1
+            self._class(priority)['requests'] += 1
+            self.queue_depth = depth
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+    
+    def record_inline(self, inference_time, priority):
+        with self._lock:
+            self.requests += 1
+            self.inline_requests += 1
+            self.total_inference_time += inference_time
+            counters = self._class(priority)
+            counters['requests'] += 1
+            counters['completed'] += 1
+            counters['service_time'] += inference_time
+    
+    def record_batch(self, size, queue_wait, inference_time, depth):
+        with self._lock:
+            self.batches += 1
+            self.batched_images += size
+            self.batch_size_histogram[size] = self.batch_size_histogram.get(size, 0) + 1
+            self.total_queue_wait += queue_wait
+            self.total_inference_time += inference_time
+            self.queue_depth = depth
+    
+    def record_served(self, priority, queue_wait, service_time):
+        with self._lock:
+            counters = self._class(priority)
+            counters['completed'] += 1
+            counters['queue_wait'] += queue_wait
+            counters['service_time'] += service_time
+    
+    def record_shed(self, priority, reason, queue_wait=0.0):
+        with self._lock:
+            counters = self._class(priority)
+            counters[f'shed_{reason}'] += 1
+            counters['queue_wait'] += queue_wait
+    
+    def avg_batch_time(self):
+        with self._lock:
+            return self.total_inference_time / max(self.batches + self.inline_requests, 1)
+    
+    def snapshot(self):
+        """Return a JSON-serializable view of the counters"""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'inline_requests': self.inline_requests,
+                'batches': self.batches,
+                'avg_batch_size': self.batched_images / max(self.batches, 1),
+                'batch_size_histogram': dict(sorted(self.batch_size_histogram.items())),
+                'queue_depth': self.queue_depth,
+                'max_queue_depth': self.max_queue_depth,
+                'avg_queue_wait_ms': 1000 * self.total_queue_wait / max(self.batched_images, 1),
+                'avg_inference_ms': 1000 * self.total_inference_time / max(self.batches + self.inline_requests, 1),
+                'classes': {
+                    priority: {
+                        'requests': counters['requests'],
+                        'completed': counters['completed'],
+                        'shed_expired': counters['shed_expired'],
+                        'shed_overload': counters['shed_overload'],
+                        'avg_queue_wait_ms': 1000 * counters['queue_wait'] / max(
+                            counters['requests'] - counters['shed_overload'], 1
+                        ),
+                        'avg_service_ms': 1000 * counters['service_time'] / max(counters['completed'], 1)
+                    }
+                    for priority, counters in self.classes.items()
+                }
+            }
+
+class _Work:
+    """Images submitted together, with their priority class and deadline"""
+    __slots__ = ('images', 'future', 'priority', 'single', 'enqueued_at', 'deadline')
+    
+    def __init__(self, images, future, priority, single, enqueued_at, deadline):
+        self.images = images
+        self.future = future
+        self.priority = priority
+        self.single = single
+        self.enqueued_at = enqueued_at
+        self.deadline = deadline
+    
+    @property
+    def size(self):
+        return self.images.shape[0]
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching engine and priority scheduler for the model.
+    
+    Concurrent callers submit single images (or whole chunks, for bulk uploads)
+    and get a Future back. A background thread fuses queued work into one batch
+    of up to ``max_batch_size`` images, waiting at most ``max_wait_ms`` for the
+    batch to fill, runs a single model call and scatters the rows of the output
+    back to each caller's future.
+    
+    Queued work is taken in priority order (PRIORITIES, highest first) and
+    carries its class's deadline: work still queued at its deadline is failed
+    with InferenceShedError instead of being run for a caller that has given
+    up. When ``max_queued_images`` are queued, new work sheds the newest queued
+    work of lower classes, or is shed itself if there is none.
+    
+    Modes:
+        'always'   - every request goes through the queue
+        'adaptive' - requests run inline as a batch of one while nothing else is
+                     in flight, and switch to the queue as soon as load builds up
+        'off'      - every request runs inline
+    """
+    MODES = ('always', 'adaptive', 'off')
+    PRIORITIES = ('premium', 'interactive', 'background')
+    
+    def __init__(self, infer_fn, max_batch_size=32, max_wait_ms=10, mode='adaptive',
+                 deadlines_ms=None, max_queued_images=0):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown batching mode: {mode}")
+        
+        self.infer_fn = infer_fn
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000.0
+        self.mode = mode
+        self.deadlines = {
+            priority: (deadlines_ms or {}).get(priority, 0) / 1000.0 or None
+            for priority in self.PRIORITIES
+        }
+        self.max_queued_images = max(int(max_queued_images or 0), 0)
+        self.metrics = BatchingMetrics()
+        self._reset_state()
+    
+    def _reset_state(self):
+        self._queues = {priority: collections.deque() for priority in self.PRIORITIES}
+        self._queued_images = {priority: 0 for priority in self.PRIORITIES}
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._inflight = 0
+        self._stopping = False
+        self._worker = None
+    
+    def after_fork(self):
+        """
+        Reset queue, locks and worker in a forked child.
+        The parent's worker thread does not exist after fork and its locks may be held.
+        """
+        self._reset_state()
+        self.metrics = BatchingMetrics()
+    
+    def queue_depths(self):
+        """(images queued per priority class, requests submitted and not yet answered)"""
+        with self._lock:
+            return dict(self._queued_images), self._inflight
+    
+    def submit(self, image, priority='interactive'):
+        """
+        Queue one preprocessed image of shape (1, H, W, C) or (H, W, C).
+        Returns a Future resolving to the model output row for that image.
+        """
+        if image.ndim == 3:
+            image = image[np.newaxis, ...]
+        return self._submit(image, priority, single=True)
+    
+    def submit_batch(self, images, priority='background'):
+        """
+        Queue an (N, H, W, C) chunk to run in one model call.
+        Returns a Future resolving to the (N, num_classes) output rows.
+        """
+        return self._submit(images, priority, single=False)
+    
+    def _submit(self, images, priority, single):
+        if priority not in self.PRIORITIES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        
+        future = Future()
+        with self._lock:
+            run_inline = self.mode == 'off' or (self.mode == 'adaptive' and self._inflight == 0)
+            self._inflight += 1
+        
+        if run_inline:
+            try:
+                start = time.perf_counter()
+                output = self.infer_fn(images)
+                self.metrics.record_inline(time.perf_counter() - start, priority)
+                future.set_result(output[0] if single else output)
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._release(1)
+            return future
+        
+        now = time.perf_counter()
+        deadline = self.deadlines[priority]
+        work = _Work(images, future, priority, single, now, now + deadline if deadline else None)
+        self._ensure_worker()
+        self._enqueue(work)
+        return future
+    
+    def predict(self, image, timeout=None, priority='interactive'):
+        """Blocking convenience wrapper around submit()"""
+        return self.submit(image, priority).result(timeout=timeout)
+    
+    def predict_batch(self, images, timeout=None, priority='background'):
+        """Blocking convenience wrapper around submit_batch()"""
+        return self.submit_batch(images, priority).result(timeout=timeout)
+    
+    def stop(self, timeout=None):
+        """Stop the worker thread after draining queued requests"""
+        worker = self._worker
+        if worker is not None and worker.is_alive():
+            with self._not_empty:
+                self._stopping = True
+                self._not_empty.notify_all()
+            worker.join(timeout)
+        self._worker = None
+    
+    def _release(self, count):
+        with self._lock:
+            self._inflight -= count
+    
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._stopping = False
+                self._worker = threading.Thread(
+                    target=self._run, name='ai-predictor-batcher', daemon=True
+                )
+                self._worker.start()
+    
+    def _drain_estimate(self, queued_images):
+        """Seconds until the queue would have been worked off, at the recent batch time"""
+        batches = queued_images / self.max_batch_size + 1
+        return max(1, math.ceil(batches * self.metrics.avg_batch_time()))
+    
+    def _enqueue(self, work):
+        shed, admitted = [], True
+        with self._not_empty:
+            queued = sum(self._queued_images.values())
+            if self.max_queued_images and queued + work.size > self.max_queued_images:
+                rank = self.PRIORITIES.index(work.priority)
+                lower = self.PRIORITIES[rank + 1:]
+                if queued - sum(self._queued_images[p] for p in lower) + work.size > self.max_queued_images:
+                    shed.append(work)
+                    admitted = False
+                else:
+                    # Newest work of the lowest classes goes first: it has waited least
+                    for priority in reversed(lower):
+                        pending = self._queues[priority]
+                        while pending and queued + work.size > self.max_queued_images:
+                            victim = pending.pop()
+                            self._queued_images[priority] -= victim.size
+                            queued -= victim.size
+                            shed.append(victim)
+            if admitted:
+                self._queues[work.priority].append(work)
+                self._queued_images[work.priority] += work.size
+                queued += work.size
+                self._not_empty.notify()
+            self._inflight -= len(shed)
+        
+        self.metrics.record_enqueue(queued, work.priority)
+        retry_after = self._drain_estimate(queued)
+        now = time.perf_counter()
+        for victim in shed:
+            self.metrics.record_shed(victim.priority, 'overload', now - victim.enqueued_at)
+            victim.future.set_exception(InferenceShedError('overload', retry_after))
+    
+    def _pop(self, now, expired, max_size=None):
+        """
+        Highest-priority queued work (fitting in max_size images), moving work past
+        its deadline to `expired`. Called with the lock held.
+        """
+        for priority in self.PRIORITIES:
+            pending = self._queues[priority]
+            while pending and pending[0].deadline is not None and pending[0].deadline <= now:
+                work = pending.popleft()
+                self._queued_images[priority] -= work.size
+                expired.append(work)
+            if pending and (max_size is None or pending[0].size <= max_size):
+                work = pending.popleft()
+                self._queued_images[priority] -= work.size
+                return work
+        return None
+    
+    def _shed_expired(self, expired):
+        if not expired:
+            return
+        self._release(len(expired))
+        now = time.perf_counter()
+        for work in expired:
+            self.metrics.record_shed(work.priority, 'expired', now - work.enqueued_at)
+            work.future.set_exception(InferenceShedError('expired', 1))
+    
+    def _collect_batch(self):
+        """The next batch to run, [] if everything queued had expired, None once stopped"""
+        expired = []
+        with self._not_empty:
+            while not any(self._queues.values()) and not self._stopping:
+                self._not_empty.wait()
+            if not any(self._queues.values()):
+                return None
+            first = self._pop(time.perf_counter(), expired)
+        
+        batch = [first] if first is not None else []
+        size = first.size if first is not None else 0
+        deadline = time.perf_counter() + self.max_wait
+        while batch and size < self.max_batch_size:
+            with self._not_empty:
+                work = self._pop(time.perf_counter(), expired, max_size=self.max_batch_size - size)
+                if work is None:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0 or self._stopping:
+                        break
+                    self._not_empty.wait(remaining)
+                    continue
+            batch.append(work)
+            size += work.size
+        
+        self._shed_expired(expired)
+        return batch
+    
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                return
+            if batch:
+                self._execute(batch)
+    
+    def _execute(self, batch):
+        started = time.perf_counter()
+        queue_wait = sum((started - work.enqueued_at) * work.size for work in batch)
+        
+        try:
+            outputs = self.infer_fn(np.concatenate([work.images for work in batch], axis=0))
+            finished = time.perf_counter()
+            offset = 0
+            for work in batch:
+                rows = outputs[offset:offset + work.size]
+                offset += work.size
+                work.future.set_result(rows[0] if work.single else rows)
+                self.metrics.record_served(work.priority, started - work.enqueued_at, finished - started)
+        except Exception as e:
+            for work in batch:
+                if not work.future.done():
+                    work.future.set_exception(e)
+        finally:
+            self._release(len(batch))
+            with self._lock:
+                depth = sum(self._queued_images.values())
+            self.metrics.record_batch(
+                sum(work.size for work in batch), queue_wait, time.perf_counter() - started, depth
+            )
+
+class ModelBackend:
+    """
+    Base class for inference backends
+    Backends take a float32 (N, H, W, C) batch scaled to [0, 1] and return (N, num_classes) scores
+    """
+    name = None
+    # Whether a model loaded in the gunicorn master can be used by forked workers
+    fork_safe = False
+    
+    def __init__(self, model_path):
+        self.model_path = model_path
+    
+    @property
+    def precision(self):
+        return 'float32'
+    
+    def predict(self, batch):
+        raise NotImplementedError
+    
+    def after_fork(self):
+        """Called in a forked child before the backend is used there"""
+
+class KerasBackend(ModelBackend):
+    """
+    Full tf.keras model (.h5, .keras or SavedModel directory)
+    The TensorFlow runtime is not fork-safe, so this backend is always loaded in the worker
+    """
+    name = 'keras'
+    
+    def __init__(self, model_path):
+        super().__init__(model_path)
+        import tensorflow as tf
+        self.model = tf.keras.models.load_model(model_path, compile=False)
+    
+    def predict(self, batch):
+        return np.asarray(self.model(batch, training=False))
+
+class TFLiteBackend(ModelBackend):
+    """
+    TFLite flatbuffer model, float16 or int8-quantized
+    Uses the standalone tflite_runtime interpreter when installed, else tf.lite
+    
+    The interpreter is built from model_path, which TFLite memory-maps rather than
+    reading into the heap, so every worker forked from a preloading master maps the
+    same page-cache pages. Only the per-process tensor arena is private. With
+    share_weights the default XNNPACK delegate is disabled, since it repacks weights
+    into private memory in every process.
+    
+    Resizing an interpreter's input reallocates its tensors, which costs more than
+    batching saves, and the micro-batcher's batch sizes vary from call to call.
+    Batches are therefore zero-padded to the next power of two (capped at
+    max_batch_size; larger ones are split) and each padded size gets its own
+    interpreter, built on first use, so tensors are only allocated once per size.
+    """
+    name = 'tflite'
+    fork_safe = True
+    
+    def __init__(self, model_path, num_threads=None, share_weights=False, max_batch_size=32):
+        super().__init__(model_path)
+        self.num_threads = num_threads
+        self.share_weights = share_weights
+        self.max_batch_size = max(1, int(max_batch_size))
+        self._build_interpreter()
+    
+    def _new_interpreter(self, batch_size=None):
+        """(interpreter, input details, output details), resized to batch_size rows if given"""
+        interpreter_class, op_resolver_type = _tflite_interpreter_class()
+        options = {'model_path': self.model_path, 'num_threads': self.num_threads}
+        if self.share_weights and op_resolver_type is not None:
+            options['experimental_op_resolver_type'] = op_resolver_type.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+        
+        interpreter = interpreter_class(**options)
+        if batch_size is not None:
+            shape = interpreter.get_input_details()[0]['shape']
+            interpreter.resize_tensor_input(interpreter.get_input_details()[0]['index'], [batch_size, *shape[1:]])
+        interpreter.allocate_tensors()
+        return interpreter, interpreter.get_input_details()[0], interpreter.get_output_details()[0]
+    
+    def _build_interpreter(self):
+        self.interpreter, self._input, self._output = self._new_interpreter()
+        # Padded batch size -> (interpreter, input, output, lock); an interpreter holds
+        # mutable tensor buffers, so its invocations are serialized
+        self._interpreters = {
+            int(self._input['shape'][0]): (self.interpreter, self._input, self._output, threading.Lock())
+        }
+        self._build_lock = threading.Lock()
+    
+    def after_fork(self):
+        # Interpreter thread pools do not survive fork; rebuilding re-maps the same file
+        self._build_interpreter()
+    
+    @property
+    def precision(self):
+        if np.issubdtype(self._input['dtype'], np.integer):
+            return 'int8'
+        tensor_types = {t['dtype'] for t in self.interpreter.get_tensor_details()}
+        if np.float16 in tensor_types:
+            return 'float16'
+        if any(np.issubdtype(dtype, np.integer) for dtype in tensor_types):
+            return 'int8'
+        return 'float32'
+    
+    def padded_size(self, rows):
+        """Batch size a batch of `rows` images is padded to (rows <= max_batch_size)"""
+        size = 1
+        while size < rows:
+            size *= 2
+        return min(size, self.max_batch_size)
+    
+    def _interpreter_for(self, size):
+        entry = self._interpreters.get(size)
+        if entry is None:
+            with self._build_lock:
+                entry = self._interpreters.get(size)
+                if entry is None:
+                    entry = self._interpreters[size] = (*self._new_interpreter(size), threading.Lock())
+        return entry
+    
+    def predict(self, batch):
+        rows = batch.shape[0]
+        if rows > self.max_batch_size:
+            return np.concatenate([
+                self.predict(batch[start:start + self.max_batch_size])
+                for start in range(0, rows, self.max_batch_size)
+            ])
+        
+        size = self.padded_size(rows)
+        interpreter, input_details, output_details, lock = self._interpreter_for(size)
+        if size != rows:
+            padded = np.zeros((size, *batch.shape[1:]), dtype=batch.dtype)
+            padded[:rows] = batch
+            batch = padded
+        
+        with lock:
+            interpreter.set_tensor(input_details['index'], self._quantize(batch))
+            interpreter.invoke()
+            output = interpreter.get_tensor(output_details['index'])
+        return self._dequantize(output[:rows])
+    
+    def _quantize(self, batch):
+        dtype = self._input['dtype']
+        if not np.issubdtype(dtype, np.integer):
+            return batch.astype(dtype, copy=False)
+        
+        scale, zero_point = self._input['quantization']
+        info = np.iinfo(dtype)
+        return np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(dtype)
+    
+    def _dequantize(self, output):
+        if not np.issubdtype(self._output['dtype'], np.integer):
+            return output.astype(np.float32, copy=False)
+        
+        scale, zero_point = self._output['quantization']
+        return (output.astype(np.float32) - zero_point) * scale
+
+def _tflite_interpreter_class():
+    """Return (Interpreter class, OpResolverType enum or None)"""
+    try:
+        from tflite_runtime import interpreter as tflite
+    except ImportError:
+        import tensorflow as tf
+        return tf.lite.Interpreter, getattr(tf.lite.experimental, 'OpResolverType', None)
+    return tflite.Interpreter, getattr(tflite, 'OpResolverType', None)
+
+BACKENDS = {
+    'keras': KerasBackend,
+    'tflite': TFLiteBackend
+}
+
+def resolve_backend_name(model_path, backend=None):
+    """
+    Pick an inference backend from an explicit name or the model file extension
+    """
+    if backend and backend != 'auto':
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown model backend: {backend}")
+        return backend
+    
+    if model_path.lower().endswith('.tflite'):
+        return 'tflite'
+    return 'keras'
+
+def load_backend(model_path, backend=None, **options):
+    """
+    Load a model with the backend selected by resolve_backend_name
+    """
+    name = resolve_backend_name(model_path, backend)
+    if name == 'tflite':
+        return TFLiteBackend(
+            model_path,
+            num_threads=options.get('num_threads'),
+            share_weights=options.get('share_weights', False),
+            max_batch_size=options.get('max_batch_size', 32)
+        )
+    return BACKENDS[name](model_path)
+
+def load_bundle_manifest(path):
+    """
+    Read the manifest of a model bundle written by ml_models/training/export_model.py
+    Accepts a bundle version directory or a bundle root containing a LATEST pointer.
+    Returns (bundle_dir, manifest) or None if path is not a bundle.
+    """
+    if not os.path.isdir(path):
+        return None
+    
+    latest_file = os.path.join(path, 'LATEST')
+    if os.path.exists(latest_file):
+        with open(latest_file) as f:
+            path = os.path.join(path, f.read().strip())
+    
+    manifest_file = os.path.join(path, 'manifest.json')
+    if not os.path.exists(manifest_file):
+        return None
+    
+    with open(manifest_file) as f:
+        return path, json.load(f)
+
+def select_bundle_artifact(bundle_dir, manifest, artifact=None):
+    """
+    Pick a model artifact from a bundle manifest
+    Returns (model_path, backend_name, artifact_name)
+    """
+    if not artifact or artifact == 'auto':
+        artifact = manifest.get('default_artifact', 'tflite_int8')
+    
+    artifacts = manifest.get('artifacts', {})
+    if artifact not in artifacts:
+        raise ValueError(f"Bundle {manifest.get('version')} has no '{artifact}' artifact")
+    
+    info = artifacts[artifact]
+    return os.path.join(bundle_dir, info['path']), info['backend'], artifact
+
+# Live predictors, reset in forked children (see AIPredictor.after_fork)
+_predictors = weakref.WeakSet()
+
+def _after_fork_in_child():
+    for predictor in list(_predictors):
+        predictor.after_fork()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+class AIPredictor:
+    def __init__(self, model_path=None, labels_path=None, backend=None, batching_mode=None,
+                 max_batch_size=None, max_batch_wait_ms=None, bundle_artifact=None):
+        self.backend = None
         self.labels = {}
+        self.manifest = None
+        self.model_version = None
+        self.model_path = model_path or Config.MODEL_PATH
+        self.labels_path = labels_path or Config.LABELS_PATH
+        self.backend_name = backend or Config.MODEL_BACKEND
+        self.bundle_artifact = bundle_artifact or Config.MODEL_BUNDLE_ARTIFACT
         self.knowledge_base = self._load_knowledge_base()
-        self._load_model()
+        self.knowledge_fragments = self._serialize_knowledge_base()
+        self.state = 'not_loaded'  # not_loaded, loading, ready, unavailable (mock predictions)
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self._warmup_thread = None
+        self._reload_listeners = []
+        
+        self.batcher = MicroBatcher(
+            self._infer,
+            max_batch_size=max_batch_size or Config.INFERENCE_MAX_BATCH_SIZE,
+            max_wait_ms=max_batch_wait_ms if max_batch_wait_ms is not None else Config.INFERENCE_MAX_BATCH_WAIT_MS,
+            mode=batching_mode or Config.INFERENCE_BATCHING_MODE,
+            deadlines_ms={
+                'premium': Config.INFERENCE_DEADLINE_PREMIUM_MS,
+                'interactive': Config.INFERENCE_DEADLINE_INTERACTIVE_MS,
+                'background': Config.INFERENCE_DEADLINE_BACKGROUND_MS
+            },
+            max_queued_images=Config.INFERENCE_MAX_QUEUED_IMAGES
+        )
+        _predictors.add(self)
+    
+    def load(self):
+        """
+        Load the model once per process (on first prediction unless preloaded)
+        """
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self.state = 'loading'
+                self._load_model()
+                self._loaded = True
+                self.state = 'ready' if self.backend is not None else 'unavailable'
+    
+    def reload(self):
+        """
+        Reload the model from MODEL_PATH (e.g. after a new bundle is published)
+        and notify listeners such as the prediction cache
+        """
+        with self._load_lock:
+            self.state = 'loading'
+            self._load_model()
+            self._loaded = True
+            self.state = 'ready' if self.backend is not None else 'unavailable'
+        
+        for listener in list(self._reload_listeners):
+            listener(self)
+    
+    def add_reload_listener(self, listener):
+        """Register a callable invoked with this predictor after every reload()"""
+        self._reload_listeners.append(listener)
+    
+    @property
+    def is_ready(self):
+        return self.state == 'ready'
+    
+    @property
+    def input_shape(self):
+        if self.manifest and self.manifest.get('input_size'):
+            return tuple(self.manifest['input_size'])
+        return (224, 224, 3)
+    
+    def warm_up(self, background=True):
+        """
+        Load the model and run a dummy batch through it, so the first real request
+        does not pay for interpreter allocation / graph tracing.
+        Safe to call repeatedly; only the first call per process does any work.
+        """
+        if self._warmup_thread is not None:
+            return self._warmup_thread
+        
+        def run():
+            self.load()
+            if self.backend is None:
+                return
+            try:
+                start = time.perf_counter()
+                self._infer(np.zeros((1,) + self.input_shape, dtype=np.float32))
+                logger.info('AI Model warmed up in %.0f ms', (time.perf_counter() - start) * 1000)
+            except Exception:
+                logger.exception('Model warm-up failed')
+        
+        self._warmup_thread = threading.Thread(target=run, name='ai-predictor-warmup', daemon=True)
+        if background:
+            self._warmup_thread.start()
+        else:
+            self._warmup_thread.run()
+        return self._warmup_thread
+    
+    def preload(self):
+        """
+        Load the model in the gunicorn master so workers share it copy-on-write.
+        Only fork-safe backends (TFLite) are preloaded; others load lazily in each worker.
+        Returns True if the model was loaded.
+        """
+        try:
+            _, backend_name = self._resolve_model()
+        except Exception as e:
+            logger.info('Skipping model preload: %s', e)
+            return False
+        
+        if not BACKENDS[backend_name].fork_safe:
+            logger.info('Skipping model preload: %s backend is not fork-safe, loading per worker', backend_name)
+            return False
+        
+        self.load()
+        return self.backend is not None
+    
+    def after_fork(self):
+        """
+        Make a predictor inherited from the gunicorn master usable in a forked worker
+        """
+        self._load_lock = threading.Lock()
+        self._warmup_thread = None
+        self.batcher.after_fork()
+        if not self._loaded:
+            # A load interrupted by fork must start over in this process
+            self.state = 'not_loaded'
+        if self.backend is not None:
+            if self.backend.fork_safe:
+                self.backend.after_fork()
+            else:
+                # Never reuse a TensorFlow runtime across fork; reload in this process
+                self.backend = None
+                self._loaded = False
+                self.state = 'not_loaded'
+    
+    def _resolve_model(self):
+        """
+        Resolve MODEL_PATH to (model file, backend name) and read labels / version.
+        MODEL_PATH may be a model bundle (preferred), a .tflite file or a Keras model.
+        """
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"Model file not found: {self.model_path}")
+        
+        bundle = load_bundle_manifest(self.model_path)
+        if bundle:
+            bundle_dir, self.manifest = bundle
+            model_file, backend_name, artifact = select_bundle_artifact(
+                bundle_dir, self.manifest, self.bundle_artifact
+            )
+            self.model_version = f"{self.manifest['version']}/{artifact}"
+            self.labels = dict(enumerate(self.manifest['class_names']))
+        else:
+            model_file, backend_name = self.model_path, self.backend_name
+            self.model_version = f"{os.path.basename(self.model_path)}@{int(os.path.getmtime(self.model_path))}"
+            self.labels = self._load_labels()
+        
+        return model_file, resolve_backend_name(model_file, backend_name)
     
     def _load_model(self):
         """
-        Load the trained AI model
-        In production, this would load your actual .h5 or .tflite model
+        Load the trained AI model and its class labels
+        Falls back to mock predictions when no model file is available
         """
+        start = time.perf_counter()
         try:
-            # TODO: Replace with actual model loading
-            # self.model = tf.keras.models.load_model('path/to/your/model.h5')
-            print("AI Model loaded successfully")
+            model_file, backend_name = self._resolve_model()
+            self.backend = load_backend(
+                model_file,
+                backend_name,
+                num_threads=Config.TFLITE_NUM_THREADS,
+                share_weights=Config.TFLITE_SHARE_WEIGHTS,
+                max_batch_size=self.batcher.max_batch_size
+            )
+            MODEL_LOADS.labels('success').inc()
+            logger.info('AI Model loaded successfully (%s, %s, %s)', self.model_version, self.backend.name, self.backend.precision)
         except Exception as e:
-            print(f"Failed to load model: {e}")
+            self.backend = None
+            MODEL_LOADS.labels(type(e).__name__).inc()
+            logger.warning('Failed to load model, serving mock predictions: %s', e)
             # Continue with mock predictions for development
+        finally:
+            MODEL_LOAD_SECONDS.observe(time.perf_counter() - start)
+    
+    def _load_labels(self):
+        """
+        Load class index -> disease name mapping written by train_model.py
+        """
+        if not os.path.exists(self.labels_path):
+            return {}
+        
+        with open(self.labels_path) as f:
+            names = [line.strip() for line in f if line.strip()]
+        return {index: name for index, name in enumerate(names)}
+    
+    def _infer(self, batch):
+        """
+        Run one forward pass over a (N, H, W, C) batch and return (N, num_classes) scores
+        """
+        return self.backend.predict(batch.astype(np.float32, copy=False))
+    
+    def model_size_bytes(self):
+        """On-disk size of the loaded model (the weights it holds or memory-maps), 0 if none"""
+        if self.backend is None:
+            return 0
+        path = self.backend.model_path
+        if not os.path.isdir(path):
+            return os.path.getsize(path)
+        return sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(path) for name in names
+        )
+    
+    def batching_stats(self):
+        """
+        Get micro-batching metrics for tuning batch size and wait time
+        """
+        stats = self.batcher.metrics.snapshot()
+        stats.update({
+            'mode': self.batcher.mode,
+            'max_batch_size': self.batcher.max_batch_size,
+            'max_wait_ms': self.batcher.max_wait * 1000,
+            'max_queued_images': self.batcher.max_queued_images,
+            'deadlines_ms': {
+                priority: deadline * 1000 if deadline else None
+                for priority, deadline in self.batcher.deadlines.items()
+            },
+            'model_loaded': self.backend is not None,
+            'model_state': self.state,
+            'backend': self.backend.name if self.backend else None,
+            'model_version': self.model_version
+        })
+        return stats
     
     def _load_knowledge_base(self):
         """
@@ -93,13 +963,74 @@ class AIPredictor:
         }
         return knowledge_base
     
-    def predict(self, processed_image, plant_type):
+    def _serialize_knowledge_base(self):
+        """
+        Treatment and prevention lists of every disease pre-encoded as JSON, so
+        prediction responses splice in the bytes instead of re-encoding the lists
+        """
+        return {
+            disease_name: {
+                'treatment': json.dumps(info['treatments'], ensure_ascii=False).encode('utf-8'),
+                'prevention': json.dumps(info['preventions'], ensure_ascii=False).encode('utf-8')
+            }
+            for disease_name, info in self.knowledge_base.items()
+        }
+    
+    def knowledge_fragments_for(self, prediction):
+        """
+        Pre-encoded treatment / prevention lists of a prediction, or None when they
+        are not the knowledge base's (e.g. a cached prediction from another release)
+        """
+        disease_name = prediction['disease_name']
+        if disease_name not in self.knowledge_base:
+            disease_name = 'Healthy'
+        info = self.knowledge_base[disease_name]
+        if prediction['treatments'] != info['treatments'] or prediction['preventions'] != info['preventions']:
+            return None
+        return self.knowledge_fragments[disease_name]
+    
+    def predict(self, processed_image, plant_type, priority='interactive'):
         """
         Make disease prediction
+        Concurrent calls are fused into shared model batches by the micro-batcher,
+        in priority order (see MicroBatcher.PRIORITIES); raises InferenceShedError
+        if the scheduler drops the request
         """
-        # TODO: Replace with actual model prediction
-        # For now, return mock predictions based on plant type
+        self.load()
+        if self.backend is None:
+            return self._mock_predict(plant_type)
         
+        scores = self.batcher.predict(processed_image, priority=priority)
+        return self._build_prediction(scores)
+    
+    def predict_batch(self, batch, plant_types, priority='background'):
+        """
+        Predict an already batched (N, H, W, C) array in a single forward pass
+        Used for bulk uploads: the chunk is scheduled as one unit behind
+        higher-priority single scans
+        """
+        self.load()
+        if self.backend is None:
+            return [self._mock_predict(plant_type) for plant_type in plant_types]
+        
+        scores = self.batcher.predict_batch(batch, priority=priority)
+        return [self._build_prediction(row) for row in scores]
+    
+    def _build_prediction(self, scores, top_k=3):
+        """
+        Turn one row of model output into a prediction with treatment information
+        """
+        top_indices = np.argsort(scores)[::-1][:top_k]
+        predictions = [
+            {'disease': self.labels.get(int(i), f'class_{int(i)}'), 'confidence': float(scores[i])}
+            for i in top_indices
+        ]
+        return self._with_disease_info(predictions)
+    
+    def _mock_predict(self, plant_type):
+        """
+        Mock predictions based on plant type, used when no model is loaded
+        """
         mock_predictions = {
             'maize': [
                 {'disease': 'Maize Lethal Necrosis', 'confidence': 0.85},
@@ -125,11 +1056,15 @@ class AIPredictor:
         
         # Get predictions for the plant type, default to maize
         predictions = mock_predictions.get(plant_type, mock_predictions['maize'])
+        return self._with_disease_info(predictions)
+    
+    def _with_disease_info(self, predictions):
         top_prediction = predictions[0]
         
         # Get treatment information
         disease_name = top_prediction['disease']
-        disease_info = self.knowledge_base.get(disease_name, self.knowledge_base['Healthy'])
+        with observe_stage('knowledge_base'):
+            disease_info = self.knowledge_base.get(disease_name, self.knowledge_base['Healthy'])
         
         return {
             'disease_name': disease_name,
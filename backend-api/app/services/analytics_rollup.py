@@ -0,0 +1,283 @@
+# backend-api/app/services/analytics_rollup.py
+import logging
+from datetime import datetime, timedelta
+from app.services.trend_analysis import daily_matrix, outbreak_zscores, rolling_mean, trend_summary
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_REGION = 'Unknown'
+HEALTHY = 'Healthy'
+ROLLUP_KEY = ('day', 'region', 'plant_type', 'disease_name', 'severity')
+
+# Plant types always in the disease trends, with zeros when they have no detections
+TREND_PLANT_TYPES = ('maize', 'coffee', 'tomato', 'banana')
+
+def rollup_deltas(rows, regions):
+    """
+    Fold detection rows into per-key count / confidence-sum increments.
+    `regions` maps user_id -> region; each row needs user_id, plant_type,
+    disease_name, severity, confidence and detected_at.
+    """
+    deltas = {}
+    for row in rows:
+        key = (
+            row['detected_at'].date(),
+            regions.get(row['user_id']) or UNKNOWN_REGION,
+            row['plant_type'],
+            row['disease_name'],
+            row['severity']
+        )
+        count, confidence_sum = deltas.get(key, (0, 0.0))
+        deltas[key] = (count + 1, confidence_sum + float(row['confidence']))
+    return deltas
+
+def apply_detection_rollups(session, rows):
+    """
+    Add freshly inserted detection rows to the daily rollups, in the caller's
+    transaction (no commit). One SELECT for the users' regions plus one
+    executemany upsert, whatever the number of rows.
+    """
+    from app.models.user_model import User
+    
+    if not rows:
+        return
+    user_ids = {row['user_id'] for row in rows}
+    regions = dict(session.execute(
+        User.__table__.select().with_only_columns(User.id, User.region).where(User.id.in_(user_ids))
+    ).all())
+    upsert_rollups(session, rollup_deltas(rows, regions))
+
+def upsert_rollups(session, deltas):
+    """
+    Increment rollup rows by `deltas` ({key tuple: (count, confidence_sum)}).
+    INSERT .. ON CONFLICT DO UPDATE on PostgreSQL and SQLite, UPDATE then INSERT
+    elsewhere. Keys are applied in sorted order so concurrent writers lock rows
+    in the same order and cannot deadlock each other.
+    """
+    from app.models.analytics_model import DetectionDailyRollup
+    
+    if not deltas:
+        return
+    table = DetectionDailyRollup.__table__
+    now = datetime.utcnow()
+    values = [
+        dict(zip(ROLLUP_KEY, key), detection_count=count, confidence_sum=confidence_sum, updated_at=now)
+        for key, (count, confidence_sum) in sorted(deltas.items())
+    ]
+    
+    dialect = session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(table)
+        session.execute(statement.on_conflict_do_update(
+            index_elements=list(ROLLUP_KEY),
+            set_={
+                'detection_count': table.c.detection_count + statement.excluded.detection_count,
+                'confidence_sum': table.c.confidence_sum + statement.excluded.confidence_sum,
+                'updated_at': statement.excluded.updated_at
+            }
+        ), values)
+        return
+    
+    from sqlalchemy import and_
+    for value in values:
+        updated = session.execute(
+            table.update().where(and_(*[table.c[column] == value[column] for column in ROLLUP_KEY])).values(
+                detection_count=table.c.detection_count + value['detection_count'],
+                confidence_sum=table.c.confidence_sum + value['confidence_sum'],
+                updated_at=now
+            )
+        )
+        if not updated.rowcount:
+            session.execute(table.insert(), [value])
+
+def _day_expression(session, column):
+    """Calendar day of a DATETIME column, as the rollup Date column stores it"""
+    from sqlalchemy import Date, cast, func
+    
+    if session.get_bind().dialect.name == 'sqlite':
+        return func.date(column)  # 'YYYY-MM-DD', SQLite's Date storage format
+    return cast(column, Date)
+
+def backfill_rollups(session, start_day, end_day, chunk_days=31):
+    """
+    Rebuild the rollups for start_day..end_day (inclusive) from disease_detections,
+    one transaction per chunk of days: delete the chunk's rollup rows, then one
+    INSERT .. SELECT .. GROUP BY. On PostgreSQL the rollup table is locked against
+    concurrent upserts for the duration of a chunk, so detections committed while it
+    is rebuilt are neither lost nor counted twice. Returns the number of rollup rows written.
+    """
+    from app.models.analytics_model import DetectionDailyRollup
+    from app.models.disease_model import DiseaseDetection
+    from app.models.user_model import User
+    from sqlalchemy import func, literal, select, text
+    
+    table = DetectionDailyRollup.__table__
+    written = 0
+    chunk_start = start_day
+    while chunk_start <= end_day:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_day)
+        since = datetime.combine(chunk_start, datetime.min.time())
+        until = datetime.combine(chunk_end + timedelta(days=1), datetime.min.time())
+        
+        if session.get_bind().dialect.name == 'postgresql':
+            # Blocks incremental upserts (not reads) until this chunk commits
+            session.execute(text(f'LOCK TABLE {table.name} IN SHARE ROW EXCLUSIVE MODE'))
+        session.execute(table.delete().where(table.c.day >= chunk_start, table.c.day <= chunk_end))
+        
+        day = _day_expression(session, DiseaseDetection.detected_at)
+        region = func.coalesce(User.region, literal(UNKNOWN_REGION))
+        grouped = select(
+            day, region,
+            DiseaseDetection.plant_type, DiseaseDetection.disease_name, DiseaseDetection.severity,
+            func.count(DiseaseDetection.id), func.sum(DiseaseDetection.confidence),
+            literal(datetime.utcnow())
+        ).select_from(DiseaseDetection).outerjoin(User, User.id == DiseaseDetection.user_id).where(
+            DiseaseDetection.detected_at >= since,
+            DiseaseDetection.detected_at < until
+        ).group_by(day, region, DiseaseDetection.plant_type, DiseaseDetection.disease_name, DiseaseDetection.severity)
+        
+        result = session.execute(table.insert().from_select(
+            list(ROLLUP_KEY) + ['detection_count', 'confidence_sum', 'updated_at'], grouped
+        ))
+        session.commit()
+        written += max(result.rowcount, 0)
+        logger.info('Rebuilt detection rollups for %s .. %s', chunk_start, chunk_end)
+        chunk_start = chunk_end + timedelta(days=1)
+    return written
+
+def _today():
+    return datetime.utcnow().date()
+
+def _user_totals_by_region(session):
+    """{region: (users, successful scans, total scans)}; one pass in users.region index order"""
+    from app.models.user_model import User
+    from sqlalchemy import func, select
+    
+    return {
+        row.region: (row.users, row.successful or 0, row.scans or 0)
+        for row in session.execute(select(
+            User.region,
+            func.count(User.id).label('users'),
+            func.sum(User.successful_detections).label('successful'),
+            func.sum(User.total_scans).label('scans')
+        ).group_by(User.region)).all()
+    }
+
+def platform_overview(session, top_diseases=10):
+    """
+    Platform totals, most common diseases and detections per region from the
+    rollups (O(days x groups)); user counts and scan success from the users table
+    """
+    from app.models.analytics_model import DetectionDailyRollup as Rollup
+    from sqlalchemy import func, select
+    
+    total_detections = session.scalar(select(func.coalesce(func.sum(Rollup.detection_count), 0)))
+    active_today = session.scalar(
+        select(func.coalesce(func.sum(Rollup.detection_count), 0)).where(Rollup.day == _today())
+    )
+    user_totals = _user_totals_by_region(session).values()
+    successful = sum(totals[1] for totals in user_totals)
+    scans = sum(totals[2] for totals in user_totals)
+    
+    detections = func.sum(Rollup.detection_count)
+    common_diseases = session.execute(
+        select(Rollup.disease_name, detections.label('count')).group_by(Rollup.disease_name)
+        .order_by(detections.desc()).limit(top_diseases)
+    ).all()
+    regional = session.execute(select(Rollup.region, detections.label('count')).group_by(Rollup.region)).all()
+    
+    return {
+        'total_users': sum(totals[0] for totals in user_totals),
+        'total_detections': int(total_detections),
+        'active_today': int(active_today),
+        'success_rate': successful / max(scans, 1),
+        'regional_distribution': {stat.region: int(stat.count) for stat in regional},
+        'common_diseases': [{'disease': stat.disease_name, 'count': int(stat.count)} for stat in common_diseases]
+    }
+
+def _diseased_daily_counts(session, group_column, start_day, end_day):
+    """(group, day, count) of non-Healthy detections per day, from the rollups"""
+    from app.models.analytics_model import DetectionDailyRollup as Rollup
+    from sqlalchemy import func, select
+    
+    return session.execute(
+        select(group_column, Rollup.day, func.sum(Rollup.detection_count))
+        .where(Rollup.day >= start_day, Rollup.day <= end_day, Rollup.disease_name != HEALTHY)
+        .group_by(group_column, Rollup.day)
+    ).all()
+
+def disease_trends(session, days, window=7, baseline_days=28):
+    """
+    Diseased (non-Healthy) detections per day and plant type for the last `days`
+    days including today (days without detections are zeros), with the trailing
+    `window`-day average and the outbreak z-score against the `baseline_days`
+    before each day. TREND_PLANT_TYPES are always included. Returns (trends,
+    per plant type summary, start day, end day).
+    """
+    from app.models.analytics_model import DetectionDailyRollup as Rollup
+    
+    end_day = _today()
+    start_day = end_day - timedelta(days=days - 1)
+    history_start = start_day - timedelta(days=baseline_days)
+    plant_types, counts = daily_matrix(
+        _diseased_daily_counts(session, Rollup.plant_type, history_start, end_day),
+        history_start, days + baseline_days, groups=TREND_PLANT_TYPES
+    )
+    averages = rolling_mean(counts, window)
+    zscores = outbreak_zscores(counts, baseline_days)
+    
+    trends = []
+    for offset in range(days):
+        column = baseline_days + offset
+        point = {'date': (start_day + timedelta(days=offset)).isoformat()}
+        for row, plant in enumerate(plant_types):
+            point[f'{plant}_diseases'] = int(counts[row, column])
+            point[f'{plant}_diseases_avg'] = round(float(averages[row, column]), 2)
+            point[f'{plant}_diseases_z'] = round(float(zscores[row, column]), 2)
+        trends.append(point)
+    
+    summary = dict(zip(plant_types, trend_summary(counts, zscores)))
+    return trends, summary, start_day, end_day
+
+def regional_insights(session, top_diseases=3, baseline_days=28):
+    """
+    Per region: detections, the most common (non-Healthy) diseases, the scan
+    success rate of the region's users, and the week-over-week change and
+    outbreak z-score of today's diseased detections
+    """
+    from app.models.analytics_model import DetectionDailyRollup as Rollup
+    from sqlalchemy import func, select
+    
+    rows = session.execute(
+        select(Rollup.region, Rollup.disease_name, func.sum(Rollup.detection_count).label('count'))
+        .group_by(Rollup.region, Rollup.disease_name)
+    ).all()
+    user_totals = _user_totals_by_region(session)
+    
+    end_day = _today()
+    history_start = end_day - timedelta(days=baseline_days)
+    regions, counts = daily_matrix(
+        _diseased_daily_counts(session, Rollup.region, history_start, end_day),
+        history_start, baseline_days + 1
+    )
+    trends = dict(zip(regions, trend_summary(counts, outbreak_zscores(counts, baseline_days))))
+    
+    insights = {}
+    for row in rows:
+        _, successful, scans = user_totals.get(row.region, (0, 0, 0))
+        region = insights.setdefault(row.region, dict({
+            'total_detections': 0,
+            'top_diseases': [],
+            'success_rate': successful / max(scans, 1)
+        }, **trends.get(row.region, {'week_over_week': None, 'z_score': None, 'outbreak': False})))
+        region['total_detections'] += int(row.count)
+        if row.disease_name != HEALTHY:
+            region['top_diseases'].append({'disease': row.disease_name, 'count': int(row.count)})
+    
+    for region in insights.values():
+        region['top_diseases'] = sorted(region['top_diseases'], key=lambda d: d['count'], reverse=True)[:top_diseases]
+    return insights
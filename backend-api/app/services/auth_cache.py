@@ -0,0 +1,114 @@
+# backend-api/app/services/auth_cache.py
+import threading
+import time
+from app.config import Config
+from app.services.prediction_cache import LRUCacheTier
+
+class TokenClaimsCache:
+    """
+    Verified JWT claims keyed by the token's signature, so a token seen again is
+    not re-decoded and re-verified. An entry only matches the exact header and
+    payload it was verified with, and never outlives the token's exp claim.
+    Failed verifications are not cached.
+    """
+    def __init__(self, max_entries=10000, ttl=300):
+        self.enabled = max_entries > 0 and ttl > 0
+        self.cache = LRUCacheTier(max_entries=max(1, max_entries), ttl=ttl)
+    
+    def claims(self, token, decode):
+        """Claims of a token, from the cache or decode(token) (which raises if invalid)"""
+        if not self.enabled:
+            return decode(token)
+        
+        signing_input, _, signature = token.rpartition('.')
+        entry = self.cache.get(signature)
+        if entry is not None and entry[0] == signing_input and entry[2] > time.time():
+            return entry[1]
+        
+        claims = decode(token)
+        expires_at = claims.get('exp', float('inf'))
+        ttl = min(self.cache.ttl, expires_at - time.time())
+        if ttl > 0:
+            self.cache.set(signature, (signing_input, claims, expires_at), ttl)
+        return claims
+    
+    def stats(self):
+        return dict(
+            self.cache.stats.snapshot(),
+            enabled=self.enabled,
+            entries=len(self.cache),
+            max_entries=self.cache.max_entries,
+            ttl=self.cache.ttl
+        )
+
+class UserCache:
+    """
+    Column values of recently authenticated users, so token_required does not
+    load the user row on every request. Hits are attached to the request's
+    session with merge(load=False), which issues no SQL.
+    
+    Entries are dropped when DatabaseService updates the user (e.g. scan counters);
+    other workers see changes within the TTL. A load that overlaps an update of
+    the same user is returned but not cached, like DetectionStatsCache.
+    """
+    def __init__(self, max_entries=10000, ttl=30):
+        self.enabled = max_entries > 0 and ttl > 0
+        self.cache = LRUCacheTier(max_entries=max(1, max_entries), ttl=ttl)
+        self._loading = {}  # user id -> loads in flight
+        self._stale = set()  # users updated while a load was in flight
+        self._lock = threading.Lock()
+    
+    def get(self, session, user_id):
+        """The user attached to session, or None if there is no such user"""
+        from app.models.user_model import User
+        from sqlalchemy.orm import make_transient_to_detached
+        
+        if not self.enabled:
+            return session.get(User, user_id)
+        
+        values = self.cache.get(user_id)
+        if values is not None:
+            # JSON columns (main_crops) are copied so a view cannot mutate the cached value
+            user = User(**{
+                key: list(value) if isinstance(value, list) else dict(value) if isinstance(value, dict) else value
+                for key, value in values.items()
+            })
+            make_transient_to_detached(user)
+            return session.merge(user, load=False)
+        
+        with self._lock:
+            self._loading[user_id] = self._loading.get(user_id, 0) + 1
+        user = None
+        try:
+            user = session.get(User, user_id)
+        finally:
+            with self._lock:
+                if user is not None and user_id not in self._stale:
+                    self.cache.set(user_id, {
+                        column.key: getattr(user, column.key) for column in User.__mapper__.column_attrs
+                    })
+                self._loading[user_id] -= 1
+                if not self._loading[user_id]:
+                    del self._loading[user_id]
+                    self._stale.discard(user_id)
+        return user
+    
+    def invalidate(self, user_ids):
+        """Forget the cached rows of the given users"""
+        with self._lock:
+            for user_id in set(user_ids):
+                self.cache.delete(user_id)
+                if user_id in self._loading:
+                    self._stale.add(user_id)
+    
+    def stats(self):
+        return dict(
+            self.cache.stats.snapshot(),
+            enabled=self.enabled,
+            entries=len(self.cache),
+            max_entries=self.cache.max_entries,
+            ttl=self.cache.ttl
+        )
+
+token_claims = TokenClaimsCache(max_entries=Config.AUTH_CACHE_SIZE, ttl=Config.AUTH_TOKEN_CACHE_TTL)
+user_cache = UserCache(max_entries=Config.AUTH_CACHE_SIZE, ttl=Config.AUTH_USER_CACHE_TTL)
@@ -0,0 +1,290 @@
+# backend-api/app/services/batch_prediction.py
+import json
+import logging
+import math
+import posixpath
+import shutil
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timezone
+from app.services.image_processor import ImageValidationError
+from app.services.ai_predictor import InferenceShedError
+
+logger = logging.getLogger(__name__)
+
+ZIP_MANIFEST_NAME = 'manifest.json'
+ZIP_IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif')
+
+class BatchItem:
+    """
+    One image of a batch upload plus its own metadata.
+    `stream` is read lazily, one item at a time, so only the current item is in memory.
+    """
+    def __init__(self, index, filename, stream=None, plant_type='maize', location=None,
+                 client_timestamp=None, error=None):
+        self.index = index
+        self.filename = filename
+        self.stream = stream
+        self.plant_type = plant_type
+        self.location = location
+        self.client_timestamp = client_timestamp
+        self.error = error
+    
+    def close(self):
+        if self.stream is not None and hasattr(self.stream, 'close'):
+            self.stream.close()
+        self.stream = None
+
+def parse_client_timestamp(value):
+    """
+    Parse a client capture time (ISO 8601, or Unix epoch in seconds or milliseconds)
+    into a naive UTC datetime, matching DiseaseDetection.detected_at
+    """
+    if value in (None, ''):
+        return None
+    
+    if isinstance(value, (int, float)) or str(value).replace('.', '', 1).isdigit():
+        seconds = float(value)
+        if seconds > 1e11:  # milliseconds
+            seconds /= 1000.0
+        return datetime.fromtimestamp(seconds, tz=timezone.utc).replace(tzinfo=None)
+    
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def _item_metadata(raw, defaults):
+    """Merge one item's metadata over the request-level defaults"""
+    raw = raw or {}
+    return {
+        'plant_type': str(raw.get('plant_type') or defaults.get('plant_type') or 'maize').lower(),
+        'location': raw.get('location') or defaults.get('location'),
+        'client_timestamp': raw.get('timestamp', raw.get('client_timestamp'))
+    }
+
+def _new_item(index, filename, stream, raw, defaults):
+    metadata = _item_metadata(raw, defaults)
+    item = BatchItem(index, filename, stream, metadata['plant_type'], metadata['location'])
+    try:
+        item.client_timestamp = parse_client_timestamp(metadata['client_timestamp'])
+    except (TypeError, ValueError, OverflowError, OSError):
+        item.error = f"Invalid timestamp: {metadata['client_timestamp']}"
+    return item
+
+def _parse_metadata(raw):
+    """
+    Per-item metadata: a JSON list (in upload order, or matched by "filename")
+    or an object keyed by filename
+    """
+    if not raw:
+        return [], {}
+    if isinstance(raw, (str, bytes)):
+        raw = json.loads(raw)
+    if isinstance(raw, dict):
+        return [], raw
+    if not isinstance(raw, list):
+        raise ValueError('metadata must be a JSON list or object')
+    by_name = {entry['filename']: entry for entry in raw if isinstance(entry, dict) and entry.get('filename')}
+    return raw, by_name
+
+def _lookup_metadata(index, filename, by_index, by_name):
+    if filename in by_name:
+        return by_name[filename]
+    if index < len(by_index) and isinstance(by_index[index], dict):
+        return by_index[index]
+    return None
+
+def iter_multipart_items(files, metadata=None, defaults=None):
+    """
+    Return an iterator of BatchItems for a multipart upload (repeated `images` fields).
+    Werkzeug spools each file part larger than 500KB to a temporary file while
+    parsing, so the request body is never held in memory as a whole.
+    """
+    defaults = defaults or {}
+    # Parsed eagerly so malformed metadata fails before any image is processed
+    by_index, by_name = _parse_metadata(metadata)
+    
+    def items():
+        for index, image_file in enumerate(files):
+            filename = image_file.filename or f'image_{index}'
+            raw = _lookup_metadata(index, filename, by_index, by_name)
+            yield _new_item(index, filename, image_file.stream, raw, defaults)
+    return items()
+
+def zip_image_members(archive):
+    """Image entries of a zip archive in archive order (directories, dotfiles and manifest skipped)"""
+    members = []
+    for info in archive.infolist():
+        name = posixpath.basename(info.filename)
+        if info.is_dir() or not name or name.startswith('.') or info.filename.startswith('__MACOSX/'):
+            continue
+        if name == ZIP_MANIFEST_NAME or not name.lower().endswith(ZIP_IMAGE_EXTENSIONS):
+            continue
+        members.append(info)
+    return members
+
+def iter_zip_items(archive, members, defaults=None, max_bytes=None):
+    """
+    Return an iterator of BatchItems for a zip upload. Each member is decompressed
+    lazily when its item is processed; declared sizes over max_bytes are rejected up
+    front and ImageProcessor.load_upload stops reading at max_bytes + 1 either way.
+    An optional manifest.json in the archive carries per-item metadata.
+    """
+    defaults = defaults or {}
+    by_index, by_name = [], {}
+    if ZIP_MANIFEST_NAME in archive.namelist():
+        with archive.open(ZIP_MANIFEST_NAME) as f:
+            by_index, by_name = _parse_metadata(json.loads(f.read(1024 * 1024)))
+    
+    def items():
+        for index, info in enumerate(members):
+            raw = _lookup_metadata(index, info.filename, by_index, by_name)
+            if raw is None:
+                raw = by_name.get(posixpath.basename(info.filename))
+            item = _new_item(index, info.filename, None, raw, defaults)
+            if item.error is None:
+                if max_bytes is not None and info.file_size > max_bytes:
+                    item.error = f"Image too large. Maximum size is {max_bytes // (1024 * 1024)}MB."
+                else:
+                    item.stream = archive.open(info)
+            yield item
+    return items()
+
+def spool_stream(stream, max_memory=1024 * 1024, chunk_size=64 * 1024):
+    """
+    Copy a raw request body into a seekable spooled temporary file (zip needs to seek
+    to its central directory) without holding more than max_memory in RAM
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=max_memory, mode='w+b')
+    shutil.copyfileobj(stream, spooled, chunk_size)
+    spooled.seek(0)
+    return spooled
+
+class BatchPredictionRunner:
+    """
+    Streams batch items through preprocessing into a preallocated float32 buffer
+    of chunk_size rows and runs one model call per full chunk.
+    
+    Peak memory is one encoded image plus the (chunk_size, H, W, 3) buffer,
+    independent of the number of items in the upload.
+    
+    Chunks are scheduled as background work. If the scheduler sheds one, its
+    items and all later ones fail with a retryable error (retry_after is set)
+    instead of queueing more work behind an overloaded model. The same happens
+    from the first item `admit` (e.g. RateLimiter.admission) refuses.
+    """
+    def __init__(self, image_processor, predictor, chunk_size=32, cache=None, admit=None):
+        self.image_processor = image_processor
+        self.predictor = predictor
+        self.chunk_size = max(1, int(chunk_size))
+        self.cache = cache
+        self.admit = admit  # () -> (allowed, retry after in seconds), called once per item
+        self.retry_after = None
+        self._shed_message = None
+    
+    def run(self, items):
+        """
+        Predict every item; returns (results, timings) where results are per-item
+        dicts in upload order: either a prediction or an error
+        """
+        self.predictor.load()
+        model_version = self.predictor.model_version
+        buffer = self.image_processor.new_batch_buffer(self.chunk_size)
+        pending = []
+        results = []
+        timings = {'preprocess': 0.0, 'inference': 0.0, 'batches': 0}
+        
+        for item in items:
+            if item.error is None and self.retry_after is None and self.admit is not None:
+                allowed, wait = self.admit()
+                if not allowed:
+                    self.retry_after = max(1, math.ceil(wait))
+                    self._shed_message = f'Rate limit exceeded, retry in {self.retry_after} s'
+            if item.error is not None or self.retry_after is not None:
+                results.append(self._error(item, item.error or self._shed_message))
+                item.close()
+                continue
+            
+            start = time.perf_counter()
+            try:
+                upload = self.image_processor.load_upload(item)
+                cache_key = None
+                if self.cache is not None:
+                    # Re-synced scans (retries after a dropped connection) skip inference
+                    cache_key = self.cache.make_key(upload.data, item.plant_type, model_version)
+                    prediction = self.cache.get(cache_key)
+                    if prediction is not None:
+                        results.append(self._result(item, prediction, cached=True))
+                        continue
+                self.image_processor.preprocess(upload, out=buffer[len(pending)])
+            except ImageValidationError as e:
+                results.append(self._error(item, str(e)))
+                continue
+            except Exception as e:
+                logger.exception('Batch item %s failed', item.index)
+                results.append(self._error(item, f'Image processing failed: {str(e)}'))
+                continue
+            finally:
+                item.close()
+                timings['preprocess'] += (time.perf_counter() - start) * 1000
+            
+            pending.append((item, cache_key))
+            if len(pending) == self.chunk_size:
+                results.extend(self._flush(buffer, pending, timings))
+                pending = []
+        
+        if pending:
+            results.extend(self._flush(buffer, pending, timings))
+        
+        results.sort(key=lambda result: result['index'])
+        return results, timings
+    
+    def _flush(self, buffer, pending, timings):
+        """Run one forward pass over the filled rows of the buffer"""
+        start = time.perf_counter()
+        try:
+            predictions = self.predictor.predict_batch(
+                buffer[:len(pending)], [item.plant_type for item, _ in pending]
+            )
+        except InferenceShedError as e:
+            self.retry_after = e.retry_after
+            self._shed_message = f'{e}, retry in {e.retry_after} s'
+            return [self._error(item, self._shed_message) for item, _ in pending]
+        timings['inference'] += (time.perf_counter() - start) * 1000
+        timings['batches'] += 1
+        
+        results = []
+        for (item, cache_key), prediction in zip(pending, predictions):
+            if self.cache is not None and cache_key is not None:
+                self.cache.set(cache_key, prediction)
+            results.append(self._result(item, prediction, cached=False))
+        return results
+    
+    @staticmethod
+    def _result(item, prediction, cached):
+        return {
+            'index': item.index,
+            'filename': item.filename,
+            'success': True,
+            'disease': prediction['disease_name'],
+            'confidence': float(prediction['confidence']),
+            'severity': prediction['severity'],
+            'treatment': prediction['treatments'],
+            'prevention': prediction['preventions'],
+            'plant_type': item.plant_type,
+            'location': item.location,
+            'client_timestamp': item.client_timestamp.isoformat() if item.client_timestamp else None,
+            'timestamp': prediction['timestamp'],
+            'cached': cached
+        }
+    
+    @staticmethod
+    def _error(item, message):
+        return {
+            'index': item.index,
+            'filename': item.filename,
+            'success': False,
+            'error': message
+        }
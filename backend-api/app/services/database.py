@@ -1,6 +1,14 @@
 # backend-api/app/services/database.py
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from datetime import datetime
+import base64
+import binascii
+import os
+from app.services.detection_stats import detection_stats
+from app.services.auth_cache import user_cache
+from app.services.analytics_rollup import apply_detection_rollups, platform_overview
+from app.utils.geo import geohash_encode, parse_location
 
 # Initialize SQLAlchemy
 db = SQLAlchemy()
@@ -8,14 +16,16 @@ db = SQLAlchemy()
 # Initialize Migrate
 migrate = Migrate()
 
+# backend-api/migrations, wherever the app is started from
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'migrations')
+
 def init_db(app):
-    """Initialize database with the Flask app"""
+    """
+    Initialize database with the Flask app. The schema is managed by the Alembic
+    migrations only: run `flask --app main db upgrade` before starting the app.
+    """
     db.init_app(app)
-    migrate.init_app(app, db)
-    
-    # Create tables
-    with app.app_context():
-        db.create_all()
+    migrate.init_app(app, db, directory=MIGRATIONS_DIR)
     
     return db
 
@@ -42,95 +52,210 @@ class DatabaseService:
             treatments=detection_data.get('treatments', []),
             preventions=detection_data.get('preventions', []),
             is_synced=detection_data.get('is_synced', True),
-            is_local_detection=detection_data.get('is_local_detection', False)
+            is_local_detection=detection_data.get('is_local_detection', False),
+            **DatabaseService.detection_coordinates(detection_data)
         )
         
         db.session.add(detection)
+        db.session.flush()  # assigns detected_at for the rollup
+        apply_detection_rollups(db.session, [{
+            'user_id': user_id,
+            'plant_type': detection.plant_type,
+            'disease_name': detection.disease_name,
+            'severity': detection.severity,
+            'confidence': detection.confidence,
+            'detected_at': detection.detected_at
+        }])
         db.session.commit()
+        detection_stats.invalidate([user_id])
+        user_cache.invalidate([user_id])
         
         return detection
     
     @staticmethod
-    def get_user_detections(user_id, limit=50, offset=0):
-        """Get detections for a user with pagination"""
-        from app.models.disease_model import DiseaseDetection
-        
-        detections = DiseaseDetection.query.filter_by(
-            user_id=user_id
-        ).order_by(
-            DiseaseDetection.detected_at.desc()
-        ).offset(offset).limit(limit).all()
-        
-        total = DiseaseDetection.query.filter_by(user_id=user_id).count()
+    def detection_coordinates(detection_data):
+        """
+        latitude / longitude / geohash columns of a detection: explicit latitude and
+        longitude if given, otherwise parsed from a "lat,lon" location (None for place names)
+        """
+        if detection_data.get('latitude') is not None and detection_data.get('longitude') is not None:
+            coordinates = (float(detection_data['latitude']), float(detection_data['longitude']))
+        else:
+            coordinates = parse_location(detection_data.get('location'))
         
+        if coordinates is None:
+            return {'latitude': None, 'longitude': None, 'geohash': None}
         return {
-            'detections': [detection.to_dict() for detection in detections],
-            'total': total,
-            'limit': limit,
-            'offset': offset,
-            'has_more': offset + limit < total
+            'latitude': coordinates[0],
+            'longitude': coordinates[1],
+            'geohash': geohash_encode(*coordinates)
         }
     
     @staticmethod
-    def get_detection_stats(user_id):
-        """Get detection statistics for a user"""
+    def add_detections_bulk(user_id, detections_data):
+        """
+        Insert many detections for one user in a single executemany and update the
+        user's scan counters in one UPDATE, all in one transaction
+        """
+        rows = [dict(data, user_id=user_id) for data in detections_data]
+        return DatabaseService.insert_detections(rows)
+    
+    @staticmethod
+    def insert_detections(detections_data, skip_existing=False):
+        """
+        Bulk insert detections (any mix of users) with one executemany, plus one
+        executemany UPDATE of the per-user scan counters and one upsert of the daily
+        analytics rollups, in a single commit.
+        With skip_existing, rows whose id is already stored are ignored, which makes
+        replaying a write-behind journal idempotent. Returns the inserted ids.
+        """
         from app.models.disease_model import DiseaseDetection
-        from sqlalchemy import func
+        from app.models.user_model import User
+        from sqlalchemy import bindparam
+        import uuid
         
-        stats = db.session.query(
-            func.count(DiseaseDetection.id).label('total_detections'),
-            func.avg(DiseaseDetection.confidence).label('avg_confidence')
-        ).filter_by(user_id=user_id).first()
+        if not detections_data:
+            return []
         
-        severity_stats = db.session.query(
-            DiseaseDetection.severity,
-            func.count(DiseaseDetection.id).label('count')
-        ).filter_by(user_id=user_id).group_by(DiseaseDetection.severity).all()
+        now = datetime.utcnow()
+        rows = [{
+            'id': data.get('id') or str(uuid.uuid4()),
+            'user_id': data['user_id'],
+            'plant_type': data['plant_type'],
+            'disease_name': data['disease_name'],
+            'confidence': data['confidence'],
+            'severity': data['severity'],
+            'image_path': data.get('image_path'),
+            'location': data.get('location'),
+            'treatments': data.get('treatments', []),
+            'preventions': data.get('preventions', []),
+            'detected_at': data.get('detected_at') or now,
+            'is_synced': data.get('is_synced', True),
+            'is_local_detection': data.get('is_local_detection', False),
+            **DatabaseService.detection_coordinates(data)
+        } for data in detections_data]
         
-        disease_stats = db.session.query(
-            DiseaseDetection.disease_name,
-            func.count(DiseaseDetection.id).label('count')
-        ).filter_by(user_id=user_id).group_by(DiseaseDetection.disease_name).all()
+        if skip_existing:
+            existing = set()
+            ids = [row['id'] for row in rows]
+            for i in range(0, len(ids), 500):
+                existing.update(db.session.scalars(
+                    db.select(DiseaseDetection.id).where(DiseaseDetection.id.in_(ids[i:i + 500]))
+                ))
+            rows = [row for row in rows if row['id'] not in existing]
+            if not rows:
+                return []
         
-        return {
-            'total_detections': stats.total_detections or 0,
-            'average_confidence': float(stats.avg_confidence or 0),
-            'severity_breakdown': {stat.severity: stat.count for stat in severity_stats},
-            'disease_breakdown': {stat.disease_name: stat.count for stat in disease_stats}
-        }
+        scans = {}
+        for row in rows:
+            scans[row['user_id']] = scans.get(row['user_id'], 0) + 1
+        
+        users = User.__table__
+        db.session.execute(db.insert(DiseaseDetection), rows)
+        db.session.execute(
+            users.update().where(users.c.id == bindparam('b_user_id')).values(
+                total_scans=users.c.total_scans + bindparam('b_count'),
+                successful_detections=users.c.successful_detections + bindparam('b_count'),
+                updated_at=now
+            ),
+            [{'b_user_id': user_id, 'b_count': count} for user_id, count in scans.items()]
+        )
+        apply_detection_rollups(db.session, rows)
+        db.session.commit()
+        detection_stats.invalidate(scans)
+        user_cache.invalidate(scans)
+        
+        return [row['id'] for row in rows]
     
     @staticmethod
-    def get_platform_analytics():
-        """Get platform-wide analytics"""
+    def create_user(user_data):
+        """Create a user; raises IntegrityError if the email is already registered"""
+        from app.models.user_model import User
+        
+        user = User(
+            name=user_data['name'],
+            email=user_data['email'],
+            phone=user_data.get('phone', ''),
+            region=user_data['region'],
+            preferred_language=user_data.get('preferred_language', 'sw'),
+            farm_size=user_data.get('farm_size', 0),
+            main_crops=user_data.get('main_crops', ['maize'])
+        )
+        
+        db.session.add(user)
+        db.session.commit()
+        
+        return user
+    
+    @staticmethod
+    def get_user(user_id):
+        """Get a user by primary key, or None"""
         from app.models.user_model import User
+        
+        return db.session.get(User, user_id)
+    
+    @staticmethod
+    def encode_cursor(detected_at, detection_id):
+        """Opaque pagination cursor for the position after (detected_at, id)"""
+        raw = f"{detected_at.isoformat()}|{detection_id}".encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        """Inverse of encode_cursor; raises ValueError for a malformed cursor"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+            detected_at, detection_id = raw.split('|', 1)
+            return datetime.fromisoformat(detected_at), detection_id
+        except (ValueError, UnicodeDecodeError, binascii.Error):
+            raise ValueError('Invalid cursor')
+    
+    @staticmethod
+    def get_user_detections(user_id, limit=50, cursor=None):
+        """
+        Get detections for a user, newest first, with keyset pagination
+        Each page seeks on the (user_id, detected_at, id) index from the previous
+        page's last row, so page 1000 costs the same as page 1 (no OFFSET scan, no COUNT)
+        """
         from app.models.disease_model import DiseaseDetection
-        from sqlalchemy import func
-        
-        total_users = User.query.count()
-        total_detections = DiseaseDetection.query.count()
-        active_today = DiseaseDetection.query.filter(
-            func.date(DiseaseDetection.detected_at) == func.current_date()
-        ).count()
-        
-        # Regional distribution
-        regional_stats = db.session.query(
-            User.region,
-            func.count(DiseaseDetection.id).label('count')
-        ).join(DiseaseDetection).group_by(User.region).all()
-        
-        # Common diseases
-        common_diseases = db.session.query(
-            DiseaseDetection.disease_name,
-            func.count(DiseaseDetection.id).label('count')
-        ).group_by(DiseaseDetection.disease_name).order_by(
-            func.count(DiseaseDetection.id).desc()
-        ).limit(10).all()
+        from sqlalchemy import tuple_
+        
+        query = DiseaseDetection.query.filter(DiseaseDetection.user_id == user_id)
+        if cursor:
+            detected_at, detection_id = DatabaseService.decode_cursor(cursor)
+            query = query.filter(
+                tuple_(DiseaseDetection.detected_at, DiseaseDetection.id) < tuple_(detected_at, detection_id)
+            )
+        
+        detections = query.order_by(
+            DiseaseDetection.detected_at.desc(),
+            DiseaseDetection.id.desc()
+        ).limit(limit + 1).all()
+        
+        has_more = len(detections) > limit
+        detections = detections[:limit]
+        next_cursor = None
+        if has_more:
+            last = detections[-1]
+            next_cursor = DatabaseService.encode_cursor(last.detected_at, last.id)
         
         return {
-            'total_users': total_users,
-            'total_detections': total_detections,
-            'active_today': active_today,
-            'regional_distribution': {stat.region: stat.count for stat in regional_stats},
-            'common_diseases': [{'disease': disease.disease_name, 'count': disease.count} 
-                              for disease in common_diseases]
+            'detections': [detection.to_dict() for detection in detections],
+            'limit': limit,
+            'next_cursor': next_cursor,
+            'has_more': has_more
         }
+    
+    @staticmethod
+    def get_detection_stats(user_id):
+        """
+        Get detection statistics for a user: totals, severity and disease breakdowns
+        and the last detection time, from one grouped query, memoized until the
+        user's next detection write
+        """
+        return detection_stats.get(db.session, user_id)
+    
+    @staticmethod
+    def get_platform_analytics():
+        """Get platform-wide analytics, from the daily rollups rather than the detections"""
+        return platform_overview(db.session)
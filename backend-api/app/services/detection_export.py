@@ -0,0 +1,144 @@
+# backend-api/app/services/detection_export.py
+import numpy as np
+
+# Exported columns and their NumPy dtype; JSON columns (treatments, preventions)
+# are reference data from the knowledge base and are left out of reports
+EXPORT_COLUMNS = (
+    ('id', object),
+    ('user_id', object),
+    ('region', object),
+    ('plant_type', object),
+    ('disease_name', object),
+    ('severity', object),
+    ('confidence', np.float32),
+    ('location', object),
+    ('detected_at', 'datetime64[us]'),
+    ('is_local_detection', np.bool_),
+)
+
+# Low-cardinality string columns, dictionary-encoded in Arrow / Parquet
+DICTIONARY_COLUMNS = ('region', 'plant_type', 'disease_name', 'severity')
+
+EXPORT_FORMATS = ('parquet', 'arrow')
+
+def export_query(since=None, until=None):
+    """Core SELECT of the export columns (detections joined to the user's region), in detected_at order"""
+    from app.models.disease_model import DiseaseDetection
+    from app.models.user_model import User
+    from sqlalchemy import select
+    
+    query = select(
+        DiseaseDetection.id,
+        DiseaseDetection.user_id,
+        User.region,
+        DiseaseDetection.plant_type,
+        DiseaseDetection.disease_name,
+        DiseaseDetection.severity,
+        DiseaseDetection.confidence,
+        DiseaseDetection.location,
+        DiseaseDetection.detected_at,
+        DiseaseDetection.is_local_detection
+    ).select_from(DiseaseDetection).outerjoin(User, User.id == DiseaseDetection.user_id)
+    
+    if since is not None:
+        query = query.where(DiseaseDetection.detected_at >= since)
+    if until is not None:
+        query = query.where(DiseaseDetection.detected_at < until)
+    # detected_at alone, so the rows come straight off its index without a sort
+    return query.order_by(DiseaseDetection.detected_at)
+
+def iter_detection_columns(connection, since=None, until=None, chunk_rows=100000):
+    """
+    Stream detections as column chunks: yields {column: numpy array} with up to
+    chunk_rows rows each. Rows come from a server-side cursor (stream_results) and
+    go straight from DBAPI tuples into arrays, without ORM instances or dicts, so
+    memory is bounded by one chunk whatever the date range.
+    """
+    result = connection.execution_options(stream_results=True, yield_per=chunk_rows).execute(
+        export_query(since, until)
+    )
+    for rows in result.partitions():
+        columns = zip(*rows)
+        chunk = {}
+        for (name, dtype), values in zip(EXPORT_COLUMNS, columns):
+            if dtype is np.bool_:
+                values = [bool(value) for value in values]  # NULL -> False
+            elif dtype is np.float32:
+                values = [np.nan if value is None else value for value in values]
+            chunk[name] = np.array(values, dtype=dtype)
+        yield chunk
+
+def _arrow_schema():
+    import pyarrow as pa
+    
+    types = {
+        'confidence': pa.float32(),
+        'detected_at': pa.timestamp('us'),
+        'is_local_detection': pa.bool_()
+    }
+    return pa.schema([
+        (name, pa.dictionary(pa.int32(), pa.string()) if name in DICTIONARY_COLUMNS
+         else types.get(name, pa.string()))
+        for name, _ in EXPORT_COLUMNS
+    ])
+
+def _dictionary_array(values, index):
+    """
+    Dictionary-encode values against the column's running dictionary (value -> code),
+    appending unseen values, so each batch's dictionary extends the previous one:
+    Arrow IPC files only accept such deltas, never a replaced dictionary
+    """
+    import pyarrow as pa
+    
+    codes = np.fromiter(
+        (0 if value is None else index.setdefault(value, len(index)) for value in values),
+        dtype=np.int32, count=len(values)
+    )
+    return pa.DictionaryArray.from_arrays(
+        pa.array(codes, mask=np.equal(values, None)),
+        pa.array(list(index), type=pa.string())
+    )
+
+def _record_batch(chunk, schema, dictionaries):
+    import pyarrow as pa
+    
+    arrays = []
+    for field in schema:
+        values = chunk[field.name]
+        if pa.types.is_dictionary(field.type):
+            arrays.append(_dictionary_array(values, dictionaries.setdefault(field.name, {})))
+        else:
+            arrays.append(pa.array(values, type=field.type, from_pandas=True))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def write_detection_export(connection, path, file_format='parquet', since=None, until=None, chunk_rows=100000):
+    """
+    Write detections to a Parquet file (one row group per chunk, zstd) or an Arrow
+    IPC file (one record batch per chunk). Requires the optional pyarrow package.
+    Returns the number of rows written.
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f'Unknown export format: {file_format}')
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError('Detection export needs pyarrow (pip install pyarrow)')
+    
+    schema = _arrow_schema()
+    if file_format == 'parquet':
+        writer = pq.ParquetWriter(path, schema, compression='zstd')
+        write = lambda batch: writer.write_batch(batch, row_group_size=chunk_rows)
+    else:
+        writer = pa.ipc.new_file(path, schema, options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+        write = writer.write_batch
+    
+    rows = 0
+    dictionaries = {}
+    try:
+        for chunk in iter_detection_columns(connection, since, until, chunk_rows):
+            write(_record_batch(chunk, schema, dictionaries))
+            rows += len(chunk['id'])
+    finally:
+        writer.close()
+    return rows
@@ -0,0 +1,162 @@
+# backend-api/app/services/detection_stats.py
+import threading
+from app.config import Config
+from app.services.prediction_cache import LRUCacheTier
+
+# Dialects whose GROUP BY accepts GROUPING SETS together with the GROUPING() function
+GROUPING_SETS_DIALECTS = ('postgresql', 'mssql', 'oracle')
+
+def _empty_stats():
+    return {
+        'total_detections': 0,
+        'average_confidence': 0.0,
+        'severity_breakdown': {},
+        'disease_breakdown': {},
+        'last_detection': None
+    }
+
+def _grouping_sets_stats(session, user_id):
+    """
+    One pass over the user's rows: GROUPING SETS ((severity), (disease_name), ())
+    returns the severity groups, the disease groups and the grand total together.
+    GROUPING(severity, disease_name) tells them apart: 1 = per severity,
+    2 = per disease, 3 = grand total.
+    """
+    from app.models.disease_model import DiseaseDetection
+    from sqlalchemy import func, select, tuple_
+    
+    severity, disease_name = DiseaseDetection.severity, DiseaseDetection.disease_name
+    rows = session.execute(
+        select(
+            severity,
+            disease_name,
+            func.grouping(severity, disease_name).label('grouping_id'),
+            func.count(DiseaseDetection.id).label('count'),
+            func.avg(DiseaseDetection.confidence).label('avg_confidence'),
+            func.max(DiseaseDetection.detected_at).label('last_detection')
+        ).where(DiseaseDetection.user_id == user_id).group_by(
+            func.grouping_sets(tuple_(severity), tuple_(disease_name), tuple_())
+        )
+    ).all()
+    
+    stats = _empty_stats()
+    for row in rows:
+        if row.grouping_id == 1:
+            stats['severity_breakdown'][row.severity] = row.count
+        elif row.grouping_id == 2:
+            stats['disease_breakdown'][row.disease_name] = row.count
+        else:
+            stats['total_detections'] = row.count
+            stats['average_confidence'] = float(row.avg_confidence or 0)
+            stats['last_detection'] = row.last_detection
+    return stats
+
+def _grouped_stats(session, user_id):
+    """
+    Portable fallback (SQLite, MySQL): one GROUP BY severity, disease_name query,
+    folded into the breakdowns and the totals in Python. The number of groups is
+    bounded by severities x diseases, not by the user's row count.
+    """
+    from app.models.disease_model import DiseaseDetection
+    from sqlalchemy import func, select
+    
+    rows = session.execute(
+        select(
+            DiseaseDetection.severity,
+            DiseaseDetection.disease_name,
+            func.count(DiseaseDetection.id).label('count'),
+            func.sum(DiseaseDetection.confidence).label('confidence_sum'),
+            func.max(DiseaseDetection.detected_at).label('last_detection')
+        ).where(DiseaseDetection.user_id == user_id).group_by(
+            DiseaseDetection.severity, DiseaseDetection.disease_name
+        )
+    ).all()
+    
+    stats = _empty_stats()
+    confidence_sum = 0.0
+    for row in rows:
+        stats['total_detections'] += row.count
+        confidence_sum += float(row.confidence_sum or 0)
+        severities, diseases = stats['severity_breakdown'], stats['disease_breakdown']
+        severities[row.severity] = severities.get(row.severity, 0) + row.count
+        diseases[row.disease_name] = diseases.get(row.disease_name, 0) + row.count
+        if row.last_detection is not None and (
+            stats['last_detection'] is None or row.last_detection > stats['last_detection']
+        ):
+            stats['last_detection'] = row.last_detection
+    if stats['total_detections']:
+        stats['average_confidence'] = confidence_sum / stats['total_detections']
+    return stats
+
+def compute_detection_stats(session, user_id):
+    """All per-user aggregates in a single query, using GROUPING SETS where supported"""
+    if session.get_bind().dialect.name in GROUPING_SETS_DIALECTS:
+        return _grouping_sets_stats(session, user_id)
+    return _grouped_stats(session, user_id)
+
+class DetectionStatsCache:
+    """
+    Per-user memo of compute_detection_stats, invalidated by that user's writes
+    (DatabaseService.insert_detections / add_detection, which every detection
+    write path goes through).
+    
+    Invalidation is in-process; the TTL bounds how stale another worker's entry
+    can get. A computation that overlaps a write for the same user returns its
+    result but does not memoize it, since it may predate the write.
+    """
+    def __init__(self, max_entries=4096, ttl=300):
+        self.enabled = max_entries > 0 and ttl > 0
+        self.cache = LRUCacheTier(max_entries=max(1, max_entries), ttl=ttl)
+        self._computing = {}  # user id -> computations in flight
+        self._stale = set()  # users written to while a computation was in flight
+        self._lock = threading.Lock()
+    
+    def get(self, session, user_id):
+        if not self.enabled:
+            return compute_detection_stats(session, user_id)
+        
+        stats = self.cache.get(user_id)
+        if stats is None:
+            with self._lock:
+                self._computing[user_id] = self._computing.get(user_id, 0) + 1
+            try:
+                stats = compute_detection_stats(session, user_id)
+            finally:
+                with self._lock:
+                    if user_id not in self._stale and stats is not None:
+                        self.cache.set(user_id, stats)
+                    self._computing[user_id] -= 1
+                    if not self._computing[user_id]:
+                        del self._computing[user_id]
+                        self._stale.discard(user_id)
+        return _copy_stats(stats)
+    
+    def invalidate(self, user_ids):
+        """Forget the memoized stats of the given users"""
+        with self._lock:
+            for user_id in set(user_ids):
+                self.cache.delete(user_id)
+                if user_id in self._computing:
+                    self._stale.add(user_id)
+    
+    def stats(self):
+        return dict(
+            self.cache.stats.snapshot(),
+            enabled=self.enabled,
+            entries=len(self.cache),
+            max_entries=self.cache.max_entries,
+            ttl=self.cache.ttl
+        )
+
+def _copy_stats(stats):
+    """Callers get their own breakdown dicts, never the memoized ones"""
+    return dict(
+        stats,
+        severity_breakdown=dict(stats['severity_breakdown']),
+        disease_breakdown=dict(stats['disease_breakdown'])
+    )
+
+detection_stats = DetectionStatsCache(
+    max_entries=Config.DETECTION_STATS_CACHE_SIZE,
+    ttl=Config.DETECTION_STATS_CACHE_TTL
+)
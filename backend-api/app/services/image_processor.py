@@ -2,60 +2,194 @@
 from PIL import Image
 import numpy as np
 import io
+import time
+from app.config import Config
+
+# Magic bytes of the accepted upload formats (PNG, JPG/JPEG, GIF)
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF')
+)
+
+class ImageValidationError(ValueError):
+    """Raised when an upload is rejected; the message is safe to return to the client"""
+
+class UploadedImage:
+    """
+    An upload that has been read once and header-parsed, but not decoded.
+    Carries the opened PIL image on to preprocessing, plus per-stage timings in ms.
+    """
+    def __init__(self, data, image_format, image):
+        self.data = data
+        self.format = image_format
+        self.image = image
+        self.phash = None  # 64-bit difference hash, set by ImageProcessor.preprocess
+        self.timings = {}
+    
+    @property
+    def size(self):
+        return self.image.size
+
+def hamming_distance(hash_a, hash_b):
+    """Number of differing bits between two perceptual hashes"""
+    return (hash_a ^ hash_b).bit_count()
+
+def sniff_image_format(data):
+    """Detect the image format from magic bytes, ignoring the file extension"""
+    for signature, image_format in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return image_format
+    return None
 
 class ImageProcessor:
-    def __init__(self):
-        self.target_size = (224, 224)  # Standard size for most models
+    def __init__(self, target_size=(224, 224), resample=Image.Resampling.BILINEAR,
+                 max_bytes=None, max_pixels=None, min_dimension=None):
+        self.target_size = target_size  # Standard size for most models
+        self.max_bytes = max_bytes or Config.MAX_IMAGE_BYTES
+        self.max_pixels = max_pixels or Config.MAX_IMAGE_PIXELS
+        self.min_dimension = min_dimension or Config.MIN_IMAGE_DIMENSION
+        # BILINEAR after DCT-domain / reduce() downscaling is visually equivalent to
+        # LANCZOS at 224x224 and several times cheaper
+        self.resample = resample
+        self._scale = np.float32(1.0 / 255.0)
     
-    def preprocess(self, image_file):
+    def new_batch_buffer(self, batch_size):
         """
-        Preprocess uploaded image for AI model
+        Allocate a float32 (batch_size, H, W, 3) buffer that preprocess() can fill in place
+        """
+        width, height = self.target_size
+        return np.empty((batch_size, height, width, 3), dtype=np.float32)
+    
+    def load_upload(self, image_file):
         """
+        Single pass over an upload: read the bytes once, sniff the format from magic
+        bytes, parse only the header for dimensions and reject oversize images or
+        decompression bombs before any pixel data is decoded.
+        Returns an UploadedImage; raises ImageValidationError.
+        """
+        start = time.perf_counter()
+        
+        # Read at most one byte past the limit, so oversize uploads are never fully buffered
+        data = image_file.stream.read(self.max_bytes + 1)
+        read_done = time.perf_counter()
+        
+        if not data:
+            raise ImageValidationError("File is empty.")
+        if len(data) > self.max_bytes:
+            raise ImageValidationError(f"Image too large. Maximum size is {self.max_bytes // (1024 * 1024)}MB.")
+        
+        image_format = sniff_image_format(data)
+        if image_format is None:
+            raise ImageValidationError("Invalid file type. Only PNG, JPG, JPEG, GIF allowed.")
+        sniff_done = time.perf_counter()
+        
         try:
-            # Read image file
-            image = Image.open(image_file.stream)
-            
-            # Convert to RGB if necessary
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Resize image
-            image = image.resize(self.target_size, Image.Resampling.LANCZOS)
-            
-            # Convert to numpy array
-            image_array = np.array(image)
-            
-            # Normalize pixel values to [0, 1]
-            image_array = image_array / 255.0
-            
-            # Add batch dimension
-            image_array = np.expand_dims(image_array, axis=0)
-            
-            return image_array
-            
+            # Image.open is lazy: only the header is parsed, pixels are decoded later
+            image = Image.open(io.BytesIO(data), formats=[image_format])
+        except Image.DecompressionBombError:
+            raise ImageValidationError("Image dimensions too large.")
         except Exception as e:
-            raise Exception(f"Image processing failed: {str(e)}")
+            raise ImageValidationError(f"Invalid image file: {str(e)}")
+        
+        width, height = image.size
+        if width < self.min_dimension or height < self.min_dimension:
+            raise ImageValidationError(
+                f"Image too small. Minimum size is {self.min_dimension}x{self.min_dimension} pixels."
+            )
+        if width * height > self.max_pixels:
+            raise ImageValidationError("Image dimensions too large.")
+        
+        upload = UploadedImage(data, image_format, image)
+        header_done = time.perf_counter()
+        upload.timings.update({
+            'read': (read_done - start) * 1000,
+            'sniff': (sniff_done - read_done) * 1000,
+            'header': (header_done - sniff_done) * 1000
+        })
+        return upload
+    
+    def preprocess(self, upload, out=None):
+        """
+        Preprocess uploaded image for AI model
+        Accepts an UploadedImage from load_upload() or a raw file upload.
+        Returns a float32 (1, H, W, 3) array in [0, 1], or fills `out`
+        (an (H, W, 3) float32 row of a batch buffer) and returns it
+        """
+        if not isinstance(upload, UploadedImage):
+            upload = self.load_upload(upload)
+        
+        try:
+            return self.preprocess_image(upload.image, out, upload.timings, upload)
+        
+        # Truncated or corrupt pixel data only shows up when decoding
+        except (OSError, ValueError, SyntaxError, Image.DecompressionBombError) as e:
+            raise ImageValidationError(f"Image processing failed: {str(e)}") from e
+    
+    def preprocess_image(self, image, out=None, timings=None, upload=None):
+        """
+        Resize and normalize an opened (not yet decoded) PIL image
+        If an UploadedImage is given, its perceptual hash is computed from the resized image
+        """
+        start = time.perf_counter()
+        
+        # For JPEGs, decode straight to the smallest 1/2, 1/4 or 1/8 scale that is
+        # still at least target_size, so a 12 MP photo is never decoded in full
+        image.draft('RGB', self.target_size)
+        image.load()
+        decode_done = time.perf_counter()
+        
+        # Convert to RGB if necessary
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        
+        # Resize image; reducing_gap lets PIL box-reduce large non-JPEG inputs first
+        if image.size != self.target_size:
+            image = image.resize(self.target_size, self.resample, reducing_gap=3.0)
+        
+        if upload is not None:
+            upload.phash = self.perceptual_hash(image)
+        
+        resize_done = time.perf_counter()
+        
+        if out is None:
+            out = self.new_batch_buffer(1)
+            row = out[0]
+        else:
+            row = out
+        
+        # Normalize pixel values to [0, 1] in float32, written directly into the buffer
+        np.multiply(np.asarray(image, dtype=np.uint8), self._scale, out=row, casting='unsafe')
+        
+        if timings is not None:
+            timings['decode'] = (decode_done - start) * 1000
+            timings['resize'] = (resize_done - decode_done) * 1000
+            timings['normalize'] = (time.perf_counter() - resize_done) * 1000
+        
+        return out
+    
+    @staticmethod
+    def perceptual_hash(image, hash_size=8):
+        """
+        Difference hash (dHash) of an already downscaled image: compare horizontally
+        adjacent pixels of a (hash_size + 1) x hash_size grayscale thumbnail.
+        Near-identical photos (small shifts, exposure or JPEG changes) differ in few bits.
+        """
+        thumbnail = image.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+        pixels = np.asarray(thumbnail, dtype=np.int16)
+        bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+        return int.from_bytes(np.packbits(bits).tobytes(), 'big')
     
     def validate_image(self, image_file):
         """
         Validate image file
+        Returns an error message or None; prefer load_upload() to avoid reading twice
         """
         try:
-            image = Image.open(image_file.stream)
-            
-            # Check image dimensions
-            if image.size[0] < 100 or image.size[1] < 100:
-                return "Image too small. Minimum size is 100x100 pixels."
-            
-            # Check file size (approximately)
-            image_file.stream.seek(0, 2)  # Seek to end
-            file_size = image_file.stream.tell()
-            image_file.stream.seek(0)  # Reset stream position
-            
-            if file_size > 10 * 1024 * 1024:  # 10MB
-                return "Image too large. Maximum size is 10MB."
-            
+            self.load_upload(image_file)
             return None
-            
-        except Exception as e:
-            return f"Invalid image file: {str(e)}"
+        except ImageValidationError as e:
+            return str(e)
+        finally:
+            image_file.stream.seek(0)  # Reset stream position
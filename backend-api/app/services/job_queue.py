@@ -0,0 +1,451 @@
+# backend-api/app/services/job_queue.py
+import ipaddress
+import json
+import logging
+import math
+import os
+import socket
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+class QueueFullError(Exception):
+    """Raised by JobQueue.submit when the backlog is at capacity"""
+    def __init__(self, retry_after):
+        super().__init__('Prediction queue is full')
+        self.retry_after = retry_after
+
+class PermanentJobError(Exception):
+    """Raised by a job handler for failures that retrying cannot fix"""
+
+class CallbackURLError(ValueError):
+    """Raised for a callback URL the server must not call"""
+
+def check_callback_url(url, allowed_hosts=()):
+    """
+    Refuse callback URLs that would make the server call itself or the internal
+    network: the URL must be http(s) and every address its host resolves to must
+    be public (not loopback, private, link-local, multicast or reserved). With
+    allowed_hosts, the host must also be one of them. Raises CallbackURLError.
+    """
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise CallbackURLError('callback_url must be an http(s) URL')
+    host = parts.hostname.lower()
+    if allowed_hosts and host not in allowed_hosts:
+        raise CallbackURLError(f'callback_url host {host} is not allowed')
+    
+    try:
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)}
+    except (ValueError, socket.gaierror):
+        raise CallbackURLError(f'callback_url host {host} cannot be resolved')
+    
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%')[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise CallbackURLError(f'callback_url host {host} is not a public address')
+
+class _NoRedirects(urllib.request.HTTPRedirectHandler):
+    """A redirect could point the callback at an internal address; fail it instead"""
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+_callback_opener = urllib.request.build_opener(_NoRedirects)
+
+class JobQueueMetrics:
+    """
+    Counters and recent latency samples for the prediction job queue
+    """
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.callbacks_sent = 0
+        self.callbacks_failed = 0
+        self.queue_latency = deque(maxlen=window)  # seconds from submit to start
+        self.run_time = deque(maxlen=window)  # seconds spent in the handler
+    
+    def incr(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+    
+    def record_start(self, queue_latency):
+        with self._lock:
+            self.queue_latency.append(queue_latency)
+    
+    def record_run(self, run_time):
+        with self._lock:
+            self.run_time.append(run_time)
+    
+    def avg_run_time(self):
+        with self._lock:
+            return sum(self.run_time) / len(self.run_time) if self.run_time else None
+    
+    @staticmethod
+    def _summary(samples):
+        if not samples:
+            return {'avg_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+        ordered = sorted(samples)
+        return {
+            'avg_ms': 1000 * sum(ordered) / len(ordered),
+            'p95_ms': 1000 * ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+            'max_ms': 1000 * ordered[-1]
+        }
+    
+    def snapshot(self):
+        """Return a JSON-serializable view of the counters"""
+        with self._lock:
+            return {
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'completed': self.completed,
+                'failed': self.failed,
+                'retried': self.retried,
+                'callbacks_sent': self.callbacks_sent,
+                'callbacks_failed': self.callbacks_failed,
+                'queue_latency': self._summary(self.queue_latency),
+                'run_time': self._summary(self.run_time)
+            }
+
+class InMemoryJobStore:
+    """
+    In-process stand-in for DatabaseJobStore, for development and tests.
+    Jobs do not survive a restart and are only visible to the process that queued them.
+    """
+    def __init__(self, max_finished=1000):
+        self.max_finished = max_finished
+        self._jobs = OrderedDict()
+        self._finished = deque()
+        self._lock = threading.Lock()
+    
+    def add(self, job):
+        with self._lock:
+            self._jobs[job['id']] = dict(job)
+    
+    def count_pending(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job['status'] in ('queued', 'running'))
+    
+    def claim(self, now, visibility_timeout):
+        stale_before = now - visibility_timeout
+        with self._lock:
+            for job in self._jobs.values():
+                ready = job['status'] == 'queued' and job['next_attempt_at'] <= now
+                stale = job['status'] == 'running' and job['started_at'] < stale_before
+                if ready or stale:
+                    job.update(status='running', started_at=now, attempts=job['attempts'] + 1)
+                    return dict(job)
+        return None
+    
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            if job['status'] in ('succeeded', 'failed'):
+                job['image_data'] = None
+                self._finished.append(job_id)
+                while len(self._finished) > self.max_finished:
+                    self._jobs.pop(self._finished.popleft(), None)
+    
+    def complete(self, job_id, result, now):
+        self._update(job_id, status='succeeded', result=result, error=None, finished_at=now)
+    
+    def retry(self, job_id, error, next_attempt_at):
+        self._update(job_id, status='queued', error=error, next_attempt_at=next_attempt_at)
+    
+    def fail(self, job_id, error, now):
+        self._update(job_id, status='failed', error=error, finished_at=now)
+    
+    def set_callback_status(self, job_id, callback_status):
+        self._update(job_id, callback_status=callback_status)
+    
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return {k: v for k, v in job.items() if k != 'image_data'} if job else None
+
+class DatabaseJobStore:
+    """
+    Job store backed by the prediction_jobs table (SQLite or PostgreSQL), shared
+    by every worker process. Jobs are claimed with a conditional UPDATE on
+    (id, status, attempts), so two workers can never run the same attempt.
+    """
+    CLAIM_CANDIDATES = 8
+    
+    def __init__(self, app):
+        self.app = app
+    
+    def add(self, job):
+        from app.models.job_model import PredictionJob
+        from app.services.database import db
+        
+        with self.app.app_context():
+            db.session.add(PredictionJob(**job))
+            db.session.commit()
+    
+    def count_pending(self):
+        from app.models.job_model import PredictionJob
+        
+        with self.app.app_context():
+            return PredictionJob.query.filter(PredictionJob.status.in_(('queued', 'running'))).count()
+    
+    def claim(self, now, visibility_timeout):
+        from app.models.job_model import PredictionJob
+        from app.services.database import db
+        from sqlalchemy import and_, or_
+        
+        ready = and_(PredictionJob.status == 'queued', PredictionJob.next_attempt_at <= now)
+        stale = and_(PredictionJob.status == 'running', PredictionJob.started_at < now - visibility_timeout)
+        
+        with self.app.app_context():
+            candidates = db.session.query(PredictionJob.id, PredictionJob.attempts).filter(
+                or_(ready, stale)
+            ).order_by(PredictionJob.created_at).limit(self.CLAIM_CANDIDATES).all()
+            
+            for candidate in candidates:
+                claimed = db.session.query(PredictionJob).filter(
+                    PredictionJob.id == candidate.id,
+                    PredictionJob.attempts == candidate.attempts,
+                    or_(ready, stale)
+                ).update({
+                    PredictionJob.status: 'running',
+                    PredictionJob.started_at: now,
+                    PredictionJob.attempts: candidate.attempts + 1
+                }, synchronize_session=False)
+                db.session.commit()
+                if claimed:
+                    return db.session.get(PredictionJob, candidate.id).to_dict(include_image=True)
+        return None
+    
+    def _update(self, job_id, **fields):
+        from app.models.job_model import PredictionJob
+        from app.services.database import db
+        
+        if fields.get('status') in ('succeeded', 'failed'):
+            fields['image_data'] = None
+        with self.app.app_context():
+            db.session.query(PredictionJob).filter_by(id=job_id).update(fields, synchronize_session=False)
+            db.session.commit()
+    
+    def complete(self, job_id, result, now):
+        self._update(job_id, status='succeeded', result=result, error=None, finished_at=now)
+    
+    def retry(self, job_id, error, next_attempt_at):
+        self._update(job_id, status='queued', error=error, next_attempt_at=next_attempt_at)
+    
+    def fail(self, job_id, error, now):
+        self._update(job_id, status='failed', error=error, finished_at=now)
+    
+    def set_callback_status(self, job_id, callback_status):
+        self._update(job_id, callback_status=callback_status)
+    
+    def get(self, job_id):
+        from app.models.job_model import PredictionJob
+        from app.services.database import db
+        
+        with self.app.app_context():
+            job = db.session.get(PredictionJob, job_id)
+            return job.to_dict() if job else None
+
+class JobQueue:
+    """
+    Asynchronous prediction jobs drained by a pool of local worker threads.
+    
+    `handler(job)` does the actual work and returns a JSON-serializable result.
+    Failures are retried with exponential backoff up to max_attempts, except
+    PermanentJobError. A job whose worker died is picked up again after
+    visibility_timeout. submit() applies backpressure: once max_depth jobs are
+    queued or running it raises QueueFullError with a Retry-After estimate.
+    """
+    def __init__(self, handler, workers=2, max_depth=100, max_attempts=3, retry_backoff=2.0,
+                 visibility_timeout=300, poll_interval=0.5, callback_timeout=5.0, callback_allowed_hosts=()):
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.max_depth = max_depth
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.visibility_timeout = timedelta(seconds=visibility_timeout)
+        self.poll_interval = poll_interval
+        self.callback_timeout = callback_timeout
+        self.callback_allowed_hosts = tuple(callback_allowed_hosts)
+        self.store = InMemoryJobStore()
+        self.metrics = JobQueueMetrics()
+        self._reset_state()
+    
+    def _reset_state(self):
+        self._threads = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+        self._pid = os.getpid()
+    
+    def init_app(self, app):
+        """Select the job store from JOB_QUEUE_BACKEND: database (default) or memory"""
+        backend = app.config.get('JOB_QUEUE_BACKEND', 'database')
+        self.store = DatabaseJobStore(app) if backend == 'database' else InMemoryJobStore()
+    
+    def start(self):
+        """
+        Start the worker threads in this process (idempotent).
+        Threads do not survive fork, so a forked child starts its own.
+        """
+        if self._pid != os.getpid():
+            self._reset_state()
+            self.metrics = JobQueueMetrics()
+        if self._threads:
+            return
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'prediction-job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+    
+    def stop(self, timeout=None):
+        """Stop the worker threads after their current job"""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._reset_state()
+    
+    def retry_after(self, depth):
+        """Seconds until roughly `depth` queued jobs have been drained"""
+        avg_run_time = self.metrics.avg_run_time() or 1.0
+        return max(1, min(60, math.ceil(depth * avg_run_time / self.workers)))
+    
+    def submit(self, image_data, plant_type, location=None, user_id=None, callback_url=None, job_id=None):
+        """
+        Queue a prediction job and return its record; raises QueueFullError, or
+        CallbackURLError for a callback_url that must not be called
+        """
+        if callback_url:
+            check_callback_url(callback_url, self.callback_allowed_hosts)
+        
+        depth = self.store.count_pending()
+        if depth >= self.max_depth:
+            self.metrics.incr('rejected')
+            raise QueueFullError(self.retry_after(depth))
+        
+        now = datetime.utcnow()
+        job = {
+            'id': job_id or str(uuid.uuid4()),
+            'status': 'queued',
+            'user_id': user_id,
+            'plant_type': plant_type,
+            'location': location,
+            'image_data': image_data,
+            'callback_url': callback_url,
+            'attempts': 0,
+            'max_attempts': self.max_attempts,
+            'created_at': now,
+            'next_attempt_at': now
+        }
+        self.store.add(job)
+        self.metrics.incr('submitted')
+        
+        self.start()
+        self._wakeup.set()
+        job.pop('image_data')
+        return job
+    
+    def get(self, job_id):
+        return self.store.get(job_id)
+    
+    def stats(self):
+        stats = self.metrics.snapshot()
+        stats.update({
+            'pending': self.store.count_pending(),
+            'max_depth': self.max_depth,
+            'workers': self.workers,
+            'backend': 'database' if isinstance(self.store, DatabaseJobStore) else 'memory'
+        })
+        return stats
+    
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                job = self.store.claim(datetime.utcnow(), self.visibility_timeout)
+            except Exception as e:
+                logger.warning('Prediction job queue unavailable: %s', e)
+                job = None
+            
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            
+            self._process(job)
+    
+    def _process(self, job):
+        started_at = job['started_at']
+        self.metrics.record_start((started_at - job['created_at']).total_seconds())
+        
+        start = time.perf_counter()
+        try:
+            if job['attempts'] > job['max_attempts']:
+                raise PermanentJobError('Job timed out')
+            result = self.handler(job)
+        except Exception as e:
+            self.metrics.record_run(time.perf_counter() - start)
+            if not isinstance(e, PermanentJobError) and job['attempts'] < job['max_attempts']:
+                delay = self.retry_backoff * (2 ** (job['attempts'] - 1))
+                self.store.retry(job['id'], str(e), datetime.utcnow() + timedelta(seconds=delay))
+                self.metrics.incr('retried')
+            else:
+                self._fail(job, str(e))
+            return
+        
+        self.metrics.record_run(time.perf_counter() - start)
+        self.store.complete(job['id'], result, datetime.utcnow())
+        self.metrics.incr('completed')
+        self._deliver(job, {'job_id': job['id'], 'status': 'succeeded', 'result': result})
+    
+    def _fail(self, job, error):
+        self.store.fail(job['id'], error, datetime.utcnow())
+        self.metrics.incr('failed')
+        self._deliver(job, {'job_id': job['id'], 'status': 'failed', 'error': error})
+    
+    def _deliver(self, job, payload):
+        """
+        POST the outcome to the job's callback URL, if any (best effort, not
+        retried, redirects not followed)
+        """
+        if not job.get('callback_url'):
+            return
+        
+        request = urllib.request.Request(
+            job['callback_url'],
+            data=json.dumps(payload).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        try:
+            # Checked again: the host's DNS may have changed since the job was submitted
+            check_callback_url(job['callback_url'], self.callback_allowed_hosts)
+            with _callback_opener.open(request, timeout=self.callback_timeout) as response:
+                callback_status = str(response.status)
+            self.metrics.incr('callbacks_sent')
+        except Exception as e:
+            callback_status = f'error: {str(e)}'[:50]
+            self.metrics.incr('callbacks_failed')
+        
+        try:
+            self.store.set_callback_status(job['id'], callback_status)
+        except Exception as e:
+            logger.warning('Failed to record callback status for job %s: %s', job['id'], e)
@@ -0,0 +1,80 @@
+# backend-api/app/services/near_duplicate.py
+import threading
+import time
+from collections import OrderedDict, deque
+from app.services.image_processor import hamming_distance
+
+class NearDuplicateIndex:
+    """
+    Per-user, time-windowed index of recent perceptual hashes and their predictions.
+    
+    Farmers often shoot several near-identical photos of the same leaf in a burst.
+    A new upload whose hash is within max_distance bits of one of the same user's
+    predictions from the last window_seconds (same plant type and model version)
+    reuses that prediction instead of running the model again.
+    """
+    def __init__(self, window_seconds=120, max_distance=10, max_entries_per_user=16, max_users=10000):
+        self.window_seconds = window_seconds
+        self.max_distance = max_distance
+        self.max_entries_per_user = max_entries_per_user
+        self.max_users = max_users
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+    
+    def find(self, user_key, phash, plant_type, model_version, now=None):
+        """
+        Return (prediction, distance) for the closest recent match, or (None, None)
+        """
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            self.lookups += 1
+            entries = self._users.get(user_key)
+            if not entries:
+                return None, None
+            
+            # Entries are appended in time order, so expired ones are at the left
+            while entries and now - entries[0][0] > self.window_seconds:
+                entries.popleft()
+            
+            best, best_distance = None, None
+            for _, entry_hash, entry_plant, entry_version, prediction in entries:
+                if entry_plant != plant_type or entry_version != model_version:
+                    continue
+                distance = hamming_distance(phash, entry_hash)
+                if distance <= self.max_distance and (best_distance is None or distance < best_distance):
+                    best, best_distance = prediction, distance
+            
+            if best is not None:
+                self.hits += 1
+            return best, best_distance
+    
+    def add(self, user_key, phash, plant_type, model_version, prediction, now=None):
+        """Remember a prediction made by running the model"""
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            entries = self._users.get(user_key)
+            if entries is None:
+                entries = self._users[user_key] = deque(maxlen=self.max_entries_per_user)
+            self._users.move_to_end(user_key)
+            entries.append((now, phash, plant_type, model_version, prediction))
+            
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'inference_calls_saved': self.hits,
+                'hit_rate': self.hits / self.lookups if self.lookups else 0.0,
+                'tracked_users': len(self._users),
+                'window_seconds': self.window_seconds,
+                'max_distance': self.max_distance
+            }
@@ -0,0 +1,232 @@
+# backend-api/app/services/prediction_cache.py
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class CacheStats:
+    """Hit/miss/eviction counters for one cache tier"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+    
+    def incr(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+    
+    def snapshot(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+class LRUCacheTier:
+    """
+    Bounded in-process LRU with per-entry TTL
+    """
+    def __init__(self, max_entries=1024, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.incr('misses')
+                return None
+            
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.stats.incr('expirations')
+                self.stats.incr('misses')
+                return None
+            
+            self._entries.move_to_end(key)
+            self.stats.incr('hits')
+            return value
+    
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (ttl or self.ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.incr('evictions')
+    
+    def delete(self, key):
+        with self._lock:
+            removed = self._entries.pop(key, None) is not None
+        if removed:
+            self.stats.incr('invalidations')
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        self.stats.incr('invalidations')
+    
+    def __len__(self):
+        return len(self._entries)
+
+class LocalSharedStore:
+    """
+    In-process stand-in for the Redis commands used by SharedCacheTier
+    (get, setex, incr), for tests and single-process development
+    """
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+    
+    def setex(self, key, ttl, value):
+        with self._lock:
+            self._data[key] = (value if isinstance(value, bytes) else str(value).encode(), time.monotonic() + ttl)
+    
+    def incr(self, key):
+        with self._lock:
+            value, expires_at = self._data.get(key, (b'0', None))
+            value = int(value) + 1
+            self._data[key] = (str(value).encode(), expires_at)
+            return value
+
+class SharedCacheTier:
+    """
+    Cache tier shared by all workers, backed by Redis (or LocalSharedStore).
+    Invalidation bumps a generation counter that is part of every key, so it is
+    O(1) and old entries simply age out through their TTL.
+    """
+    GENERATION_KEY = 'mkulima:predcache:generation'
+    
+    def __init__(self, store, ttl=3600, prefix='mkulima:predcache'):
+        self.store = store
+        self.ttl = ttl
+        self.prefix = prefix
+        self.stats = CacheStats()
+    
+    def _key(self, key):
+        generation = self.store.get(self.GENERATION_KEY) or b'0'
+        if isinstance(generation, bytes):
+            generation = generation.decode()
+        return f"{self.prefix}:{generation}:{key}"
+    
+    def get(self, key):
+        try:
+            raw = self.store.get(self._key(key))
+        except Exception as e:
+            logger.warning('Shared prediction cache unavailable: %s', e)
+            raw = None
+        
+        if raw is None:
+            self.stats.incr('misses')
+            return None
+        
+        self.stats.incr('hits')
+        return json.loads(raw)
+    
+    def set(self, key, value, ttl=None):
+        try:
+            self.store.setex(self._key(key), int(ttl or self.ttl), json.dumps(value))
+        except Exception as e:
+            logger.warning('Shared prediction cache unavailable: %s', e)
+    
+    def clear(self):
+        try:
+            self.store.incr(self.GENERATION_KEY)
+        except Exception as e:
+            logger.warning('Shared prediction cache unavailable: %s', e)
+        self.stats.incr('invalidations')
+
+class PredictionCache:
+    """
+    Two-tier prediction cache keyed by a content hash of the upload bytes,
+    the plant type and the model version.
+    
+    Lookups go to the in-process LRU first, then to the optional shared tier
+    (which back-fills the LRU on a hit).
+    """
+    def __init__(self, max_entries=1024, ttl=3600, shared_store=None):
+        self.local = LRUCacheTier(max_entries=max_entries, ttl=ttl)
+        self.shared = SharedCacheTier(shared_store, ttl=ttl) if shared_store is not None else None
+    
+    @staticmethod
+    def make_key(data, plant_type, model_version):
+        """BLAKE2b of the image bytes plus plant type and model version"""
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        return f"{digest}:{plant_type}:{model_version or 'mock'}"
+    
+    def get(self, key):
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.set(key, value)
+        return value
+    
+    def set(self, key, value):
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value)
+    
+    def invalidate(self):
+        """Drop every cached prediction, e.g. after a model reload"""
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+    
+    def stats(self):
+        stats = {
+            'local': dict(self.local.stats.snapshot(), entries=len(self.local), max_entries=self.local.max_entries),
+            'ttl': self.local.ttl
+        }
+        if self.shared is not None:
+            stats['shared'] = self.shared.stats.snapshot()
+        return stats
+
+def create_prediction_cache(config):
+    """
+    Build the prediction cache from config; the shared tier uses REDIS_URL when
+    PREDICTION_CACHE_SHARED is enabled and the redis package is available
+    """
+    shared_store = None
+    if config.PREDICTION_CACHE_SHARED:
+        try:
+            import redis
+            shared_store = redis.Redis.from_url(config.REDIS_URL, socket_timeout=0.05)
+            shared_store.ping()
+        except Exception as e:
+            logger.warning('Shared prediction cache disabled: %s', e)
+            shared_store = None
+    
+    return PredictionCache(
+        max_entries=config.PREDICTION_CACHE_SIZE,
+        ttl=config.PREDICTION_CACHE_TTL,
+        shared_store=shared_store
+    )
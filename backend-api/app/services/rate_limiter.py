@@ -0,0 +1,284 @@
+# backend-api/app/services/rate_limiter.py
+import functools
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from flask import request, jsonify
+from app.config import Config
+from app.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_DECISIONS = registry.counter(
+    'mkulima_rate_limit_decisions', 'Rate limiter admission decisions by request kind', ['kind', 'decision']
+)
+
+class LocalBucketStore:
+    """
+    In-process token buckets: key -> (tokens, last refill time). Least recently
+    used buckets beyond max_keys are dropped (a dropped bucket starts full again).
+    """
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def take(self, buckets, cost):
+        """
+        Take `cost` tokens from every (key, rate per second, burst) bucket, or from
+        none of them. Returns (allowed, seconds until all of them could pay)
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels, wait = [], 0.0
+            for key, rate, burst in buckets:
+                tokens, updated_at = self._buckets.get(key, (burst, now))
+                tokens = min(burst, tokens + (now - updated_at) * rate)
+                if tokens < cost:
+                    wait = max(wait, (cost - tokens) / rate)
+                levels.append(tokens)
+            if wait > 0:
+                return False, wait
+            
+            for (key, rate, burst), tokens in zip(buckets, levels):
+                self._buckets[key] = (tokens - cost, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return True, 0.0
+    
+    def __len__(self):
+        return len(self._buckets)
+
+class RedisBucketStore:
+    """
+    Token buckets shared by all workers, one Redis hash per bucket, checked and
+    debited for all of a request's buckets in a single Lua script (one round
+    trip, atomic). Uses the Redis server clock, so workers' clocks do not matter.
+    """
+    SCRIPT = """
+    local cost = tonumber(ARGV[1])
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local levels, wait = {}, 0
+    for i, key in ipairs(KEYS) do
+        local rate, burst = tonumber(ARGV[2 * i]), tonumber(ARGV[2 * i + 1])
+        local bucket = redis.call('HMGET', key, 'tokens', 'updated_at')
+        local tokens = tonumber(bucket[1]) or burst
+        local updated_at = tonumber(bucket[2]) or now
+        tokens = math.min(burst, tokens + math.max(0, now - updated_at) * rate)
+        if tokens < cost then
+            wait = math.max(wait, (cost - tokens) / rate)
+        end
+        levels[i] = tokens
+    end
+    if wait > 0 then
+        return {0, tostring(wait)}
+    end
+    for i, key in ipairs(KEYS) do
+        local rate, burst = tonumber(ARGV[2 * i]), tonumber(ARGV[2 * i + 1])
+        redis.call('HSET', key, 'tokens', tostring(levels[i] - cost), 'updated_at', tostring(now))
+        redis.call('EXPIRE', key, math.ceil(burst / rate) + 1)
+    end
+    return {1, '0'}
+    """
+    
+    def __init__(self, client, prefix='mkulima:ratelimit'):
+        self.prefix = prefix
+        self._script = client.register_script(self.SCRIPT)
+    
+    def take(self, buckets, cost):
+        args = [cost]
+        for _, rate, burst in buckets:
+            args.extend([rate, burst])
+        allowed, wait = self._script(keys=[f'{self.prefix}:{key}' for key, _, _ in buckets], args=args)
+        return bool(allowed), float(wait)
+
+class RateLimiter:
+    """
+    Admission control in front of the API: token buckets per authenticated user,
+    client IP and region (User.region), checked before the view runs, so an
+    over-limit request is answered with 429 and Retry-After without reading its
+    image. The client IP is request.remote_addr, which ProxyFix (PROXY_FIX_HOPS
+    in create_app) takes from X-Forwarded-For behind the proxy.
+    
+    Each request kind has a cost in bucket tokens (an inference costs far more
+    than a cached read). Reads draw from their own buckets, so a client that
+    used up its inference budget can still poll for results. Requests doing
+    several units of work (a batch's images) pay per unit through admission().
+    Premium users get RATE_LIMIT_PREMIUM_MULTIPLIER times the per-user rate and
+    burst; the IP and region buckets are shared by every user behind them. If
+    the shared store fails, requests are let through.
+    """
+    SCOPES = ('user', 'ip', 'region')
+    POOLS = {'inference': 'inference', 'read': 'read'}  # request kind -> buckets
+    
+    def __init__(self, store, limits, costs, premium_multiplier=1.0, enabled=True):
+        # A cost above a bucket's burst could never be paid: every request would get 429
+        for kind, cost in costs.items():
+            for scope, (_, burst) in limits.items():
+                if cost > burst:
+                    raise ValueError(
+                        f'Rate limit cost of {kind} requests ({cost:g}) exceeds the {scope} burst ({burst:g})'
+                    )
+        self.store = store
+        self.limits = limits  # scope -> (tokens per minute, burst)
+        self.costs = costs  # request kind -> tokens
+        self.premium_multiplier = premium_multiplier
+        self.enabled = enabled
+        self._counters = {}
+        self._lock = threading.Lock()
+    
+    def _incr(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+    
+    def _identity(self):
+        """
+        (user id, region, is_premium) of the caller, from a verified bearer token
+        only: a user_id in the URL or form proves nothing, so anonymous callers
+        draw from their IP bucket alone
+        """
+        from app.services.database import db
+        from app.services.auth_cache import user_cache
+        from app.utils.auth import verify_token
+        
+        auth_header = request.headers.get('Authorization', '')
+        if not auth_header.startswith('Bearer '):
+            return None, None, False
+        user_id = verify_token(auth_header[7:])
+        if not user_id or (isinstance(user_id, str) and ('expired' in user_id or 'Invalid' in user_id)):
+            return None, None, False
+        
+        user = user_cache.get(db.session, user_id)
+        if user is None:
+            return None, None, False
+        return user.id, user.region, bool(user.is_premium)
+    
+    def _buckets(self, kind, user_id, region, premium):
+        """(key, tokens per second, burst) of every bucket the request draws from"""
+        values = {'user': user_id, 'ip': request.remote_addr, 'region': region}
+        buckets = []
+        for scope in self.SCOPES:
+            if not values[scope] or scope not in self.limits:
+                continue
+            per_minute, burst = self.limits[scope]
+            if scope == 'user' and premium:
+                per_minute, burst = per_minute * self.premium_multiplier, burst * self.premium_multiplier
+            buckets.append((f'{self.POOLS[kind]}:{scope}:{values[scope]}', per_minute / 60.0, burst))
+        return buckets
+    
+    def check(self, kind):
+        """(allowed, retry after in seconds) for the current request"""
+        user_id, region, premium = self._identity()
+        return self._take(kind, self._buckets(kind, user_id, region, premium), premium)
+    
+    def admission(self, kind, prepaid=0):
+        """
+        Per-unit admission for the current request: returns a function that takes
+        the cost of `kind` from the caller's buckets on every call after the first
+        `prepaid` ones (already paid by limit()) and returns (allowed, retry after)
+        """
+        if not self.enabled:
+            return lambda: (True, 0.0)
+        user_id, region, premium = self._identity()
+        buckets = self._buckets(kind, user_id, region, premium)
+        calls = 0
+        
+        def admit():
+            nonlocal calls
+            calls += 1
+            if calls <= prepaid:
+                return True, 0.0
+            return self._take(kind, buckets, premium)
+        return admit
+    
+    def _take(self, kind, buckets, premium):
+        if not buckets:
+            return True, 0.0
+        
+        try:
+            allowed, wait = self.store.take(buckets, self.costs[kind])
+        except Exception as e:
+            logger.warning('Rate limiter store unavailable: %s', e)
+            self._incr('store_errors')
+            return True, 0.0
+        
+        self._incr(f"{kind}.{'allowed' if allowed else 'limited'}")
+        RATE_LIMIT_DECISIONS.labels(kind, 'allowed' if allowed else 'limited').inc()
+        if premium:
+            self._incr(f"{kind}.premium_{'allowed' if allowed else 'limited'}")
+        return allowed, wait
+    
+    def limit(self, kind):
+        """Decorator: admit the request against the caller's buckets with the cost of `kind`"""
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return view(*args, **kwargs)
+                
+                allowed, wait = self.check(kind)
+                if not allowed:
+                    retry_after = max(1, math.ceil(wait))
+                    return jsonify({
+                        'success': False,
+                        'error': f'Rate limit exceeded, retry in {retry_after} s'
+                    }), 429, {'Retry-After': str(retry_after)}
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
+    
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+        decisions = {}
+        for name, count in counters.items():
+            kind, _, decision = name.rpartition('.')
+            if kind:
+                decisions.setdefault(kind, {})[decision] = count
+        return {
+            'enabled': self.enabled,
+            'store': type(self.store).__name__,
+            'limits': {scope: {'per_minute': per_minute, 'burst': burst}
+                       for scope, (per_minute, burst) in self.limits.items()},
+            'costs': dict(self.costs),
+            'premium_multiplier': self.premium_multiplier,
+            'decisions': decisions,
+            'store_errors': counters.get('store_errors', 0)
+        }
+
+def create_rate_limiter(config):
+    """
+    Build the rate limiter from config; buckets live in Redis (REDIS_URL) when
+    RATE_LIMIT_BACKEND=redis and it is reachable, otherwise in this process
+    """
+    store = None
+    if config.RATE_LIMIT_BACKEND == 'redis':
+        try:
+            import redis
+            client = redis.Redis.from_url(config.REDIS_URL, socket_timeout=0.05)
+            client.ping()
+            store = RedisBucketStore(client)
+        except Exception as e:
+            logger.warning('Shared rate limit store disabled: %s', e)
+            store = None
+    
+    return RateLimiter(
+        store or LocalBucketStore(max_keys=config.RATE_LIMIT_MAX_KEYS),
+        limits={
+            'user': (config.RATE_LIMIT_USER_PER_MINUTE, config.RATE_LIMIT_USER_BURST),
+            'ip': (config.RATE_LIMIT_IP_PER_MINUTE, config.RATE_LIMIT_IP_BURST),
+            'region': (config.RATE_LIMIT_REGION_PER_MINUTE, config.RATE_LIMIT_REGION_BURST)
+        },
+        costs={
+            'inference': config.RATE_LIMIT_INFERENCE_COST,
+            'read': config.RATE_LIMIT_READ_COST
+        },
+        premium_multiplier=config.RATE_LIMIT_PREMIUM_MULTIPLIER,
+        enabled=config.RATE_LIMIT_ENABLED
+    )
+
+rate_limiter = create_rate_limiter(Config)
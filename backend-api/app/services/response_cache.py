@@ -0,0 +1,131 @@
+# backend-api/app/services/response_cache.py
+import functools
+import hashlib
+import json
+import threading
+from flask import request, make_response
+from app.config import Config
+from app.services.prediction_cache import LRUCacheTier
+
+class CachedResponse:
+    """Serialized body of a 200 response plus what is needed to replay it"""
+    __slots__ = ('body', 'etag', 'mimetype', 'headers', 'generations')
+    
+    def __init__(self, body, etag, mimetype, headers, generations):
+        self.body = body
+        self.etag = etag
+        self.mimetype = mimetype
+        self.headers = headers
+        self.generations = generations
+
+def strong_etag(body):
+    """Strong validator: a content hash of the exact response bytes"""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+class ResponseCache:
+    """
+    Cache of fully serialized GET responses for read-mostly endpoints.
+    
+    The first request runs the view and stores its bytes with a strong ETag;
+    later requests get those bytes without running the view or the JSON
+    encoder, and a request whose If-None-Match matches gets an empty 304.
+    Entries carry tags; invalidate(tag) bumps the tag's generation so every
+    entry stored under an older generation is a miss, in O(1). Invalidation is
+    per process, so each entry's TTL bounds staleness across workers.
+    """
+    def __init__(self, max_entries=512, ttl=300):
+        self.enabled = max_entries > 0
+        self.entries = LRUCacheTier(max_entries=max(1, max_entries), ttl=ttl)
+        self.not_modified = 0
+        self._generations = {}
+        self._lock = threading.Lock()
+    
+    def invalidate(self, *tags):
+        """Drop every cached response carrying one of the tags, e.g. after a model reload"""
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+    
+    def _current(self, tags):
+        with self._lock:
+            return tuple(self._generations.get(tag, 0) for tag in tags)
+    
+    @staticmethod
+    def _key():
+        """Path plus query arguments in a canonical order"""
+        args = sorted((name, value) for name in request.args for value in request.args.getlist(name))
+        return f"{request.path}?{json.dumps(args, separators=(',', ':'))}"
+    
+    def _replay(self, entry, cache_control):
+        if request.if_none_match.contains_weak(entry.etag):
+            self.not_modified += 1
+            response = make_response('', 304)
+        else:
+            response = make_response(entry.body, 200)
+            response.mimetype = entry.mimetype
+            response.headers.extend(entry.headers)
+        response.set_etag(entry.etag)
+        response.headers['Cache-Control'] = cache_control
+        return response
+    
+    def cached(self, tags=(), ttl=None, cache_control='public, max-age=60'):
+        """
+        Decorator for GET views. Only 200 responses without Cache-Control: no-store
+        are stored, so a view can keep a response out of the cache (e.g. a job
+        that is still running) by setting that header.
+        """
+        tags = tuple(tags)
+        
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or request.method != 'GET':
+                    return view(*args, **kwargs)
+                
+                key = self._key()
+                generations = self._current(tags)
+                entry = self.entries.get(key)
+                if entry is not None and entry.generations == generations:
+                    return self._replay(entry, cache_control)
+                
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough or \
+                        'no-store' in response.headers.get('Cache-Control', ''):
+                    return response
+                
+                body = response.get_data()
+                entry = CachedResponse(
+                    body, strong_etag(body), response.mimetype,
+                    [(name, value) for name, value in response.headers
+                     if name not in ('Content-Type', 'Content-Length', 'Cache-Control', 'ETag')],
+                    generations
+                )
+                self.entries.set(key, entry, ttl)
+                return self._replay(entry, cache_control)
+            return wrapper
+        return decorator
+    
+    def stats(self):
+        with self._lock:
+            generations = dict(self._generations)
+        return dict(
+            self.entries.stats.snapshot(),
+            enabled=self.enabled,
+            entries=len(self.entries),
+            max_entries=self.entries.max_entries,
+            not_modified=self.not_modified,
+            generations=generations
+        )
+
+def json_with_fragments(payload, fragments):
+    """
+    Serialize payload with pre-serialized JSON fragments ({key: bytes}) spliced
+    in as extra top-level members, so large constant values are not re-encoded
+    """
+    body = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    if not fragments:
+        return body
+    members = b','.join(json.dumps(key).encode('utf-8') + b':' + value for key, value in fragments.items())
+    return body[:-1] + (b',' if len(body) > 2 else b'') + members + b'}'
+
+response_cache = ResponseCache(max_entries=Config.RESPONSE_CACHE_SIZE, ttl=Config.RESPONSE_CACHE_TTL)
@@ -0,0 +1,143 @@
+# backend-api/app/services/spatial_queries.py
+import math
+import numpy as np
+from app.utils.geo import (
+    covering_cells, covering_precision, geohash_bounds, haversine_km, prefix_ranges, radius_bbox
+)
+
+# Cells used to cover a query box: more cells fit the box tighter but mean more index ranges
+MAX_COVERING_CELLS = 32
+MAX_HEATMAP_PRECISION = 7
+# Rows a nearby query reads into Python at most; a denser area is truncated to the nearest ones
+MAX_NEARBY_CANDIDATES = 10000
+
+def _geohash_filter(column, ranges):
+    """OR of half-open prefix ranges, each an index range scan on the geohash column"""
+    from sqlalchemy import and_, or_
+    
+    return or_(*[
+        and_(column >= low, column < high) if high is not None else column >= low
+        for low, high in ranges
+    ])
+
+def nearby_detections(session, latitude, longitude, radius_km, since, disease_name=None, limit=100):
+    """
+    Detections within radius_km of a point since `since`: the circle's bounding box
+    is covered with geohash cells, their prefix ranges are read from the
+    (geohash, detected_at, disease_name) index, rows outside the box itself are
+    dropped in the database, and the candidates are filtered to the exact
+    great-circle distance with NumPy. Returns the total, counts per disease and the
+    `limit` nearest detections.
+    
+    At most MAX_NEARBY_CANDIDATES candidates are fetched, nearest first by a planar
+    approximation of the distance; beyond that `truncated` is set and the total and
+    counts cover only those nearest candidates.
+    """
+    from app.models.disease_model import DiseaseDetection
+    from sqlalchemy import select
+    
+    bbox = radius_bbox(latitude, longitude, radius_km)
+    min_lat, min_lon, max_lat, max_lon = bbox
+    cells = covering_cells(*bbox, covering_precision(*bbox, max_cells=MAX_COVERING_CELLS))
+    # Squared equirectangular distance in degrees of latitude: plain arithmetic, so
+    # it can order candidates in any database
+    lon_scale = max(math.cos(math.radians(latitude)), 1e-6)
+    planar_distance = (
+        (DiseaseDetection.latitude - latitude) * (DiseaseDetection.latitude - latitude)
+        + (DiseaseDetection.longitude - longitude) * (DiseaseDetection.longitude - longitude) * lon_scale * lon_scale
+    )
+    query = select(
+        DiseaseDetection.id,
+        DiseaseDetection.plant_type,
+        DiseaseDetection.disease_name,
+        DiseaseDetection.severity,
+        DiseaseDetection.confidence,
+        DiseaseDetection.latitude,
+        DiseaseDetection.longitude,
+        DiseaseDetection.detected_at
+    ).where(
+        _geohash_filter(DiseaseDetection.geohash, prefix_ranges(cells)),
+        DiseaseDetection.latitude.between(min_lat, max_lat),
+        DiseaseDetection.longitude.between(min_lon, max_lon),
+        DiseaseDetection.detected_at >= since
+    )
+    if disease_name:
+        query = query.where(DiseaseDetection.disease_name == disease_name)
+    rows = session.execute(query.order_by(planar_distance).limit(MAX_NEARBY_CANDIDATES + 1)).all()
+    truncated = len(rows) > MAX_NEARBY_CANDIDATES
+    rows = rows[:MAX_NEARBY_CANDIDATES]
+    
+    if not rows:
+        return {'total': 0, 'by_disease': {}, 'detections': [], 'truncated': False}
+    
+    distances = haversine_km(
+        latitude, longitude,
+        np.fromiter((row.latitude for row in rows), dtype=np.float64, count=len(rows)),
+        np.fromiter((row.longitude for row in rows), dtype=np.float64, count=len(rows))
+    )
+    inside = np.flatnonzero(distances <= radius_km)
+    diseases, counts = np.unique(
+        np.array([rows[i].disease_name for i in inside], dtype=object).astype(str), return_counts=True
+    ) if len(inside) else ([], [])
+    nearest = inside[np.argsort(distances[inside], kind='stable')[:limit]]
+    
+    return {
+        'total': int(len(inside)),
+        'by_disease': {str(name): int(count) for name, count in zip(diseases, counts)},
+        'detections': [{
+            'id': rows[i].id,
+            'plant_type': rows[i].plant_type,
+            'disease_name': rows[i].disease_name,
+            'severity': rows[i].severity,
+            'confidence': rows[i].confidence,
+            'latitude': rows[i].latitude,
+            'longitude': rows[i].longitude,
+            'distance_km': round(float(distances[i]), 3),
+            'detected_at': rows[i].detected_at.isoformat()
+        } for i in nearest],
+        'truncated': truncated
+    }
+
+def detection_heatmap(session, min_lat, min_lon, max_lat, max_lon, since, precision=None, disease_name=None):
+    """
+    Detection counts per geohash cell of `precision` characters for the cells that
+    intersect a bounding box, since `since`, grouped in the database from the
+    geohash index alone. Counts are for whole cells, so edge cells may include
+    detections just outside the box. Without a precision, the finest one giving
+    at most ~MAX_COVERING_CELLS x 32 cells is used.
+    """
+    from app.models.disease_model import DiseaseDetection
+    from sqlalchemy import func, select
+    
+    if precision is None:
+        precision = min(
+            covering_precision(min_lat, min_lon, max_lat, max_lon, max_cells=MAX_COVERING_CELLS) + 1,
+            MAX_HEATMAP_PRECISION
+        )
+    ranges = prefix_ranges(covering_cells(
+        min_lat, min_lon, max_lat, max_lon,
+        min(precision, covering_precision(min_lat, min_lon, max_lat, max_lon, max_cells=MAX_COVERING_CELLS))
+    ))
+    
+    cell = func.substr(DiseaseDetection.geohash, 1, precision)
+    query = select(cell.label('cell'), func.count().label('count')).where(
+        _geohash_filter(DiseaseDetection.geohash, ranges),
+        DiseaseDetection.detected_at >= since
+    )
+    if disease_name:
+        query = query.where(DiseaseDetection.disease_name == disease_name)
+    
+    cells = []
+    for row in session.execute(query.group_by(cell)).all():
+        cell_min_lat, cell_min_lon, cell_max_lat, cell_max_lon = geohash_bounds(row.cell)
+        # The covering cells overhang the box; drop cells entirely outside it
+        if cell_max_lat < min_lat or cell_min_lat > max_lat or cell_max_lon < min_lon or cell_min_lon > max_lon:
+            continue
+        cells.append({
+            'geohash': row.cell,
+            'count': int(row.count),
+            'latitude': (cell_min_lat + cell_max_lat) / 2,
+            'longitude': (cell_min_lon + cell_max_lon) / 2,
+            'bounds': [cell_min_lat, cell_min_lon, cell_max_lat, cell_max_lon]
+        })
+    return {'precision': precision, 'cells': cells}
@@ -0,0 +1,88 @@
+# backend-api/app/services/trend_analysis.py
+import numpy as np
+
+# Days scoring this many standard deviations above their baseline are flagged as outbreaks
+OUTBREAK_Z_THRESHOLD = 3.0
+
+def daily_matrix(rows, start_day, days, groups=()):
+    """
+    Scatter (group, day, count) rows into a dense groups x days count matrix
+    starting at start_day. Returns (group labels, matrix); rows outside the
+    range are ignored. Labels in `groups` are always present, as rows of zeros
+    when they have no counts.
+    """
+    labels, matrix = [], np.zeros((0, days), dtype=np.int64)
+    if rows:
+        row_groups, days_of, counts = zip(*rows)
+        unique, group_index = np.unique(np.array(row_groups, dtype=object).astype(str), return_inverse=True)
+        day_index = (np.array(days_of, dtype='datetime64[D]') - np.datetime64(start_day, 'D')).astype(np.int64)
+        in_range = (day_index >= 0) & (day_index < days)
+        
+        labels, matrix = unique.tolist(), np.zeros((len(unique), days), dtype=np.int64)
+        np.add.at(matrix, (group_index[in_range], day_index[in_range]), np.asarray(counts, dtype=np.int64)[in_range])
+    
+    missing = [group for group in groups if group not in labels]
+    if missing:
+        labels = labels + missing
+        matrix = np.vstack([matrix, np.zeros((len(missing), days), dtype=np.int64)])
+    return labels, matrix
+
+def _padded_cumsum(values):
+    """Cumulative sum along the last axis with a leading zero, so window sums are c[t + 1] - c[t + 1 - w]"""
+    cumulative = np.zeros(values.shape[:-1] + (values.shape[-1] + 1,), dtype=np.float64)
+    np.cumsum(values, axis=-1, out=cumulative[..., 1:])
+    return cumulative
+
+def rolling_mean(counts, window=7):
+    """Trailing `window`-day mean of every day; the first days average the days available"""
+    counts = np.asarray(counts, dtype=np.float64)
+    cumulative = _padded_cumsum(counts)
+    ends = np.arange(1, counts.shape[-1] + 1)
+    starts = np.maximum(ends - window, 0)
+    return (cumulative[..., ends] - cumulative[..., starts]) / (ends - starts)
+
+def week_over_week(counts):
+    """
+    Relative change of the last 7 days against the 7 days before them, per group:
+    0.25 means 25% more detections. NaN when the earlier week had none.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    this_week = counts[..., -7:].sum(axis=-1)
+    last_week = counts[..., -14:-7].sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(last_week > 0, (this_week - last_week) / last_week, np.nan)
+
+def outbreak_zscores(counts, baseline_days=28):
+    """
+    z-score of every day against the mean and standard deviation of the
+    `baseline_days` days before it, from running sums of x and x^2 (no Python
+    loop over days). The deviation is floored at 1 detection so a sparse,
+    flat baseline does not turn one extra detection into a huge score.
+    Days without a full baseline are NaN.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    days = counts.shape[-1]
+    zscores = np.full(counts.shape, np.nan)
+    if days <= baseline_days:
+        return zscores
+    
+    sums = _padded_cumsum(counts)
+    squares = _padded_cumsum(counts * counts)
+    ends = np.arange(baseline_days, days)  # baseline of day t is [t - baseline_days, t)
+    window_sum = sums[..., ends] - sums[..., ends - baseline_days]
+    window_squares = squares[..., ends] - squares[..., ends - baseline_days]
+    
+    mean = window_sum / baseline_days
+    std = np.sqrt(np.maximum(window_squares / baseline_days - mean * mean, 0.0))
+    zscores[..., baseline_days:] = (counts[..., baseline_days:] - mean) / np.maximum(std, 1.0)
+    return zscores
+
+def trend_summary(counts, zscores):
+    """Latest-day z-score, week-over-week change and outbreak flag per group (row)"""
+    changes = week_over_week(counts)
+    latest = zscores[..., -1]
+    return [{
+        'week_over_week': None if np.isnan(change) else round(float(change), 4),
+        'z_score': None if np.isnan(z) else round(float(z), 2),
+        'outbreak': bool(z >= OUTBREAK_Z_THRESHOLD)
+    } for change, z in zip(changes, latest)]
@@ -0,0 +1,274 @@
+# backend-api/app/services/write_buffer.py
+import atexit
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from app.utils.metrics import observe_stage
+
+logger = logging.getLogger(__name__)
+
+class JournalSegment:
+    """
+    One append-only JSONL file of buffered rows, exclusively flock()ed by the
+    process that writes it. The lock is released by the kernel if that process
+    dies, which is how replay() tells orphaned segments from live ones.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.rows = []
+        self._file = open(path, 'ab')
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    
+    def append(self, row, fsync=True):
+        self._file.write(json.dumps(row, separators=(',', ':')).encode('utf-8') + b'\n')
+        self._file.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+        self.rows.append(row)
+    
+    def discard(self):
+        """Delete the segment once its rows are committed to the database"""
+        try:
+            os.unlink(self.path)
+        finally:
+            self._file.close()
+
+def read_segment(path):
+    """Rows of a journal segment; a torn last line (crash mid-write, never acknowledged) is skipped"""
+    rows = []
+    with open(path, 'rb') as f:
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                continue
+    return rows
+
+def _to_db_row(row):
+    row = dict(row)
+    if row.get('detected_at'):
+        row['detected_at'] = datetime.fromisoformat(row['detected_at'])
+    return row
+
+class DetectionWriteBuffer:
+    """
+    Write-behind buffer for DiseaseDetection rows and the matching User scan counters.
+    
+    add() appends the row to an fsync'ed journal segment and returns; the row is
+    durable from then on. A background thread writes buffered rows with
+    DatabaseService.insert_detections (one bulk insert, one counter update and one
+    commit) every max_rows rows or max_delay_ms, whichever comes first, then deletes
+    the segment. Segments left behind by a crashed or killed worker are replayed
+    idempotently by the next process to start.
+    """
+    def __init__(self, journal_dir=None, max_rows=100, max_delay_ms=200, fsync=True):
+        self.journal_dir = journal_dir
+        self.max_rows = max(1, int(max_rows))
+        self.max_delay = max(float(max_delay_ms), 1.0) / 1000.0
+        self.fsync = fsync
+        self.app = None
+        self.enabled = True
+        self.rows_written = 0
+        self.flushes = 0
+        self.flush_failures = 0
+        self.rows_dropped = 0
+        self.rows_replayed = 0
+        self._reset_state()
+    
+    def _reset_state(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._segment = None
+        self._unflushed = []  # sealed segments waiting for (or retrying) their database write
+        self._pending = {}  # detection id -> row, for read-your-writes before the flush
+        self._sequence = 0
+        self._thread = None
+        self._pid = os.getpid()
+    
+    def init_app(self, app):
+        """Bind to the app whose database receives the rows; flushes at interpreter exit"""
+        self.app = app
+        self.enabled = app.config.get('WRITE_BUFFER_ENABLED', True)
+        self.journal_dir = self.journal_dir or app.config.get('WRITE_BUFFER_JOURNAL_DIR')
+        atexit.register(self.close)
+    
+    def start(self):
+        """
+        Replay orphaned journal segments and start the flush thread in this process
+        (idempotent). A forked child starts its own thread and journal.
+        """
+        if self._pid != os.getpid():
+            self._reset_state()
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            os.makedirs(self.journal_dir, exist_ok=True)
+            self.replay()
+            self._thread = threading.Thread(target=self._run, name='detection-write-buffer', daemon=True)
+            self._thread.start()
+    
+    def add(self, row):
+        """
+        Buffer one detection row (a dict with DiseaseDetection column names, id and user_id set).
+        Without a journal (WRITE_BUFFER_ENABLED=false) the row is written synchronously.
+        """
+        row = dict(row)
+        if isinstance(row.get('detected_at'), datetime):
+            row['detected_at'] = row['detected_at'].isoformat()
+        
+        if not self.enabled:
+            self._write([row])
+            return
+        
+        self.start()
+        with self._lock:
+            if self._segment is None:
+                self._sequence += 1
+                self._segment = JournalSegment(os.path.join(
+                    self.journal_dir, f'detections-{os.getpid()}-{int(time.time())}-{self._sequence}.jsonl'
+                ))
+            self._segment.append(row, fsync=self.fsync)
+            self._pending[row['id']] = row
+            full = len(self._segment.rows) >= self.max_rows
+        if full:
+            self._wakeup.set()
+    
+    def get(self, detection_id):
+        """A row that is acknowledged but not yet written to the database, or None"""
+        with self._lock:
+            return self._pending.get(detection_id)
+    
+    def has_pending(self, user_id):
+        """Whether any of user_id's rows are acknowledged by this process but not yet written"""
+        with self._lock:
+            return any(row['user_id'] == user_id for row in self._pending.values())
+    
+    def flush_user(self, user_id):
+        """
+        Flush now if user_id has buffered rows, so that user's own history and stats
+        reads see them; returns whether it flushed. Rows buffered by other workers
+        still lag by up to max_delay_ms.
+        """
+        if not self.has_pending(user_id):
+            return False
+        return self.flush()
+    
+    def flush(self):
+        """Write every buffered row to the database now"""
+        with self._flush_lock:
+            with self._lock:
+                if self._segment is not None:
+                    self._unflushed.append(self._segment)
+                    self._segment = None
+                segments = list(self._unflushed)
+            
+            for segment in segments:
+                try:
+                    self._write(segment.rows)
+                except Exception as e:
+                    self.flush_failures += 1
+                    logger.warning('Detection write buffer flush failed, will retry: %s', e)
+                    return False
+                
+                with self._lock:
+                    self._unflushed.remove(segment)
+                    for row in segment.rows:
+                        self._pending.pop(row['id'], None)
+                segment.discard()
+                self.flushes += 1
+        return True
+    
+    def close(self, timeout=5.0):
+        """Flush and stop the flush thread, e.g. at worker exit"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
+        if self._pid == os.getpid():
+            self.flush()
+    
+    def replay(self):
+        """
+        Write rows from journal segments whose owner process is gone; rows that
+        already reached the database before the crash are skipped by id
+        """
+        for path in sorted(glob.glob(os.path.join(self.journal_dir, 'detections-*.jsonl'))):
+            try:
+                segment = open(path, 'rb')
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(segment.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                segment.close()  # still owned by a live worker
+                continue
+            
+            try:
+                rows = read_segment(path)
+                self.rows_replayed += len(self._write(rows, skip_existing=True))
+                os.unlink(path)
+                logger.info('Replayed %d buffered detections from %s', len(rows), os.path.basename(path))
+            except Exception:
+                logger.exception('Failed to replay %s', path)
+            finally:
+                segment.close()
+    
+    def stats(self):
+        with self._lock:
+            buffered = len(self._pending)
+        return {
+            'enabled': self.enabled,
+            'buffered': buffered,
+            'rows_written': self.rows_written,
+            'rows_replayed': self.rows_replayed,
+            'rows_dropped': self.rows_dropped,
+            'flushes': self.flushes,
+            'flush_failures': self.flush_failures,
+            'max_rows': self.max_rows,
+            'max_delay_ms': self.max_delay * 1000
+        }
+    
+    def _write(self, rows, skip_existing=False):
+        """
+        Bulk insert in one transaction; if the batch is rejected (e.g. a row for an
+        unknown user), retry row by row so one bad row cannot block the others
+        """
+        from app.services.database import db, DatabaseService
+        from sqlalchemy.exc import IntegrityError
+        
+        db_rows = [_to_db_row(row) for row in rows]
+        with self.app.app_context(), observe_stage('db_flush'):
+            try:
+                inserted = DatabaseService.insert_detections(db_rows, skip_existing=skip_existing)
+            except IntegrityError:
+                db.session.rollback()
+                inserted = []
+                for row in db_rows:
+                    try:
+                        inserted += DatabaseService.insert_detections([row], skip_existing=True)
+                    except IntegrityError as e:
+                        db.session.rollback()
+                        self.rows_dropped += 1
+                        logger.error('Dropping buffered detection %s: %s', row['id'], e.orig)
+        self.rows_written += len(inserted)
+        return inserted
+    
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.max_delay)
+            self._wakeup.clear()
+            if self._stopping.is_set():
+                return
+            with self._lock:
+                has_rows = self._segment is not None or self._unflushed
+            if has_rows:
+                self.flush()
@@ -3,7 +3,8 @@ import jwt
 import datetime
 from functools import wraps
 from flask import request, jsonify, current_app
-from app.models.user_model import User
+from app.services.database import db
+from app.services.auth_cache import token_claims, user_cache
 
 def generate_token(user_id):
     """Generate JWT token for user"""
@@ -21,58 +22,71 @@ def generate_token(user_id):
     except Exception as e:
         return e
 
+def _decode_token(token):
+    return jwt.decode(
+        token, 
+        current_app.config.get('SECRET_KEY'),
+        algorithms=['HS256']
+    )
+
 def verify_token(token):
-    """Verify JWT token"""
+    """Verify JWT token (claims of recently verified tokens are cached)"""
     try:
-        payload = jwt.decode(
-            token, 
-            current_app.config.get('SECRET_KEY'),
-            algorithms=['HS256']
-        )
+        payload = token_claims.claims(token, _decode_token)
         return payload['sub']
     except jwt.ExpiredSignatureError:
         return 'Token expired. Please log in again.'
     except jwt.InvalidTokenError:
         return 'Invalid token. Please log in again.'
 
+def _authenticate():
+    """
+    (user, None) for a valid bearer token, or (None, error response)
+    """
+    token = None
+    
+    # Get token from header
+    if 'Authorization' in request.headers:
+        auth_header = request.headers['Authorization']
+        try:
+            token = auth_header.split(" ")[1]  # Bearer <token>
+        except IndexError:
+            return None, (jsonify({
+                'success': False,
+                'error': 'Invalid authorization header format'
+            }), 401)
+    
+    if not token:
+        return None, (jsonify({
+            'success': False,
+            'error': 'Authorization token is missing'
+        }), 401)
+    
+    # Verify token
+    user_id = verify_token(token)
+    if isinstance(user_id, str) and ('expired' in user_id or 'Invalid' in user_id):
+        return None, (jsonify({
+            'success': False,
+            'error': user_id
+        }), 401)
+    
+    # Get user (cached for a short time, see UserCache)
+    user = user_cache.get(db.session, user_id)
+    if not user:
+        return None, (jsonify({
+            'success': False,
+            'error': 'User not found'
+        }), 401)
+    
+    return user, None
+
 def token_required(f):
     """Decorator to require valid JWT token"""
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        
-        # Get token from header
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]  # Bearer <token>
-            except IndexError:
-                return jsonify({
-                    'success': False,
-                    'error': 'Invalid authorization header format'
-                }), 401
-        
-        if not token:
-            return jsonify({
-                'success': False,
-                'error': 'Authorization token is missing'
-            }), 401
-        
-        # Verify token
-        user_id = verify_token(token)
-        if isinstance(user_id, str) and ('expired' in user_id or 'Invalid' in user_id):
-            return jsonify({
-                'success': False,
-                'error': user_id
-            }), 401
-        
-        # Get user from database
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({
-                'success': False,
-                'error': 'User not found'
-            }), 401
+        user, error = _authenticate()
+        if error:
+            return error
         
         # Add user to request context
         request.current_user = user
@@ -84,15 +98,14 @@ def admin_required(f):
     """Decorator to require admin privileges"""
     @wraps(f)
     def decorated(*args, **kwargs):
-        # First check for valid token
-        token_response = token_required(f)(*args, **kwargs)
-        
-        # If token check failed, return the error
-        if isinstance(token_response, tuple) and token_response[1] != 200:
-            return token_response
+        # First check for valid token (without running the view)
+        user, error = _authenticate()
+        if error:
+            return error
+        request.current_user = user
         
-        # Check if user is admin (you might want to add an is_admin field to User model)
-        if not getattr(request.current_user, 'is_admin', False):
+        # Check if user is admin
+        if not getattr(user, 'is_admin', False):
             return jsonify({
                 'success': False,
                 'error': 'Admin privileges required'
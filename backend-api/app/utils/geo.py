@@ -0,0 +1,139 @@
+# backend-api/app/utils/geo.py
+import math
+import re
+import numpy as np
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9  # ~4.8 m x 4.8 m cells, stored per detection
+EARTH_RADIUS_KM = 6371.0088
+
+# "lat,lon", "lat lon", "lat;lon" or "geo:lat,lon" (RFC 5870), in decimal degrees
+_COORDINATES = re.compile(
+    r'^\s*(?:geo:)?\s*([-+]?\d{1,2}(?:\.\d+)?)\s*[,; ]\s*([-+]?\d{1,3}(?:\.\d+)?)\s*(?:;.*)?$',
+    re.IGNORECASE
+)
+
+def parse_location(location):
+    """
+    (latitude, longitude) from a detection's free-text location, or None when it
+    is a place name rather than coordinates
+    """
+    if not location:
+        return None
+    match = _COORDINATES.match(location)
+    if not match:
+        return None
+    latitude, longitude = float(match.group(1)), float(match.group(2))
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Standard base-32 geohash; nearby points share a prefix"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    code, bits, value, even = [], 0, 0, True
+    while len(code) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            code.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return ''.join(code)
+
+def geohash_bounds(code):
+    """(min_lat, min_lon, max_lat, max_lon) of a geohash cell"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in code:
+        value = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            middle = (interval[0] + interval[1]) / 2
+            if value >> shift & 1:
+                interval[0] = middle
+            else:
+                interval[1] = middle
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell of the given precision"""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+def covering_cells(min_lat, min_lon, max_lat, max_lon, precision):
+    """Sorted geohash cells of one precision that together cover a bounding box"""
+    height, width = cell_size(precision)
+    cells = set()
+    lat = min_lat
+    while True:
+        lon = min_lon
+        while True:
+            cells.add(geohash_encode(min(lat, max_lat), min(lon, max_lon), precision))
+            if lon >= max_lon:
+                break
+            lon += width
+        if lat >= max_lat:
+            break
+        lat += height
+    return sorted(cells)
+
+def covering_precision(min_lat, min_lon, max_lat, max_lon, max_cells=32):
+    """Finest geohash precision whose cells cover the box with at most max_cells cells"""
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = math.floor(max_lat / height) - math.floor(min_lat / height) + 1
+        columns = math.floor(max_lon / width) - math.floor(min_lon / width) + 1
+        if rows * columns <= max_cells:
+            return precision
+    return 1
+
+def _prefix_upper_bound(prefix):
+    """
+    Smallest geohash-alphabet string greater than every string starting with
+    prefix ('kzf' -> 'kzg', 'k9z' -> 'kb'), or None for 'zz..z'. Bounds stay
+    alphanumeric so they compare the same under locale collations.
+    """
+    stripped = prefix.rstrip('z')
+    if not stripped:
+        return None
+    return stripped[:-1] + GEOHASH_ALPHABET[GEOHASH_ALPHABET.index(stripped[-1]) + 1]
+
+def prefix_ranges(cells):
+    """
+    Half-open [low, high) string ranges covering every geohash that starts with
+    one of the cells; adjacent cells are merged, so a B-tree index on the geohash
+    column answers the lookup with a few range scans instead of LIKE patterns
+    """
+    ranges = []
+    for cell in sorted(cells):
+        high = _prefix_upper_bound(cell)
+        if ranges and ranges[-1][1] == cell:
+            ranges[-1] = (ranges[-1][0], high)
+        else:
+            ranges.append((cell, high))
+    return ranges
+
+def radius_bbox(latitude, longitude, radius_km):
+    """Bounding box of a circle (clamped at the poles and the antimeridian)"""
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    delta_lon = delta_lat / max(math.cos(math.radians(latitude)), 1e-6)
+    return (
+        max(latitude - delta_lat, -90.0), max(longitude - delta_lon, -180.0),
+        min(latitude + delta_lat, 90.0), min(longitude + delta_lon, 180.0)
+    )
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """Great-circle distances in km from one point to arrays of points"""
+    lat1, lon1 = math.radians(latitude), math.radians(longitude)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
@@ -12,23 +12,12 @@ def allowed_file(filename):
 
 def validate_image(image_file):
     """
-    Validate uploaded image
+    Validate uploaded image (type from magic bytes, size, dimensions, decompression bombs)
+    Shares the header-only checks of ImageProcessor.load_upload, which request
+    handlers should call directly so the upload is read and parsed only once.
     """
-    if not allowed_file(image_file.filename):
-        return "Invalid file type. Only PNG, JPG, JPEG, GIF allowed."
-    
-    # Check file size
-    image_file.stream.seek(0, 2)  # Seek to end
-    file_size = image_file.stream.tell()
-    image_file.stream.seek(0)  # Reset stream position
-    
-    if file_size > 10 * 1024 * 1024:  # 10MB
-        return "File too large. Maximum size is 10MB."
-    
-    if file_size == 0:
-        return "File is empty."
-    
-    return None
+    from app.services.image_processor import ImageProcessor
+    return ImageProcessor().validate_image(image_file)
 
 def save_uploaded_file(file, upload_folder):
     """
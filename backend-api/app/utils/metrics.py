@@ -0,0 +1,535 @@
+# backend-api/app/utils/metrics.py
+"""
+Minimal Prometheus-style metrics: counters, gauges and histograms with labels,
+rendered in the text exposition format (version 0.0.4) at /metrics.
+
+Recording is a dict lookup plus a locked add, so it can sit on the request hot
+path; values that already live elsewhere (queue depths, cache sizes) are read
+by collectors at scrape time instead of being mirrored on every change.
+
+Under gunicorn each worker has its own registry. With a multiprocess directory
+(METRICS_MULTIPROC_DIR, set by gunicorn.conf.py) every worker writes a snapshot
+of its values there every few seconds and /metrics, whichever worker answers it,
+renders the sum over all workers. Counters and histograms of workers that have
+exited are folded into an archive, so totals never go backwards; gauges are
+reported per live worker (pid label) or combined, per gauge.
+"""
+import bisect
+import fcntl
+import glob
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from app.utils.profiling import current_trace
+
+logger = logging.getLogger(__name__)
+
+# Seconds; stages range from microseconds (knowledge-base lookup) to seconds (inference)
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _label_text(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class _Metric:
+    kind = None
+    suffix = ''  # appended to the name in the exposition (counters end in _total)
+    
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+    
+    def labels(self, *values, **kwargs):
+        """The child for one combination of label values"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f'{self.name} takes labels {self.labelnames}')
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+    
+    def _only_child(self):
+        return self.labels()
+    
+    def values(self):
+        """label values -> plain value of every child (what a snapshot stores)"""
+        return {key: child.get() for key, child in list(self._children.items())}
+    
+    def reset(self):
+        """Zero every child, e.g. in a freshly forked worker"""
+        for child in list(self._children.values()):
+            child.reset()
+    
+    @staticmethod
+    def combine(a, b):
+        """Sum of two plain values of this metric (across processes)"""
+        return a + b
+    
+    def samples(self, values=None, labelnames=None):
+        """(suffix, label text, value) lines of this metric, or of the given plain values"""
+        values = self.values() if values is None else values
+        labelnames = self.labelnames if labelnames is None else labelnames
+        for key, value in values.items():
+            yield '', _label_text(labelnames, key), value
+
+class _CounterChild:
+    __slots__ = ('registry', 'value', '_lock')
+    
+    def __init__(self, registry):
+        self.registry = registry
+        self.value = 0.0
+        self._lock = threading.Lock()
+    
+    def inc(self, amount=1):
+        if self.registry.enabled:
+            with self._lock:
+                self.value += amount
+    
+    def get(self):
+        return self.value
+    
+    def reset(self):
+        with self._lock:
+            self.value = 0.0
+
+class Counter(_Metric):
+    kind = 'counter'
+    suffix = '_total'
+    
+    def _new_child(self):
+        return _CounterChild(self.registry)
+    
+    def inc(self, amount=1):
+        self._only_child().inc(amount)
+
+class _GaugeChild:
+    __slots__ = ('value',)
+    
+    def __init__(self):
+        self.value = 0.0
+    
+    def set(self, value):
+        self.value = value
+    
+    def get(self):
+        return self.value
+    
+    def reset(self):
+        self.value = 0.0
+
+class Gauge(_Metric):
+    """
+    multiprocess_mode: how the workers' values are combined, 'all' (one series per
+    live worker, with a pid label), 'sum' or 'max' (of the live workers)
+    """
+    kind = 'gauge'
+    MULTIPROCESS_MODES = ('all', 'sum', 'max')
+    
+    def __init__(self, registry, name, documentation, labelnames=(), multiprocess_mode='all'):
+        if multiprocess_mode not in self.MULTIPROCESS_MODES:
+            raise ValueError(f'multiprocess_mode must be one of {self.MULTIPROCESS_MODES}')
+        super().__init__(registry, name, documentation, labelnames)
+        self.multiprocess_mode = multiprocess_mode
+    
+    def _new_child(self):
+        return _GaugeChild()
+    
+    def set(self, value):
+        self._only_child().set(value)
+
+class _HistogramChild:
+    __slots__ = ('registry', 'buckets', 'counts', 'sum', '_lock')
+    
+    def __init__(self, registry, buckets):
+        self.registry = registry
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, value):
+        if not self.registry.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+    
+    def get(self):
+        """[per-bucket counts, sum]"""
+        with self._lock:
+            return [list(self.counts), self.sum]
+    
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(self.buckets) + 1)
+            self.sum = 0.0
+
+class Histogram(_Metric):
+    kind = 'histogram'
+    
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def _new_child(self):
+        return _HistogramChild(self.registry, self.buckets)
+    
+    def observe(self, value):
+        self._only_child().observe(value)
+    
+    @staticmethod
+    def combine(a, b):
+        return [[x + y for x, y in zip(a[0], b[0])], a[1] + b[1]]
+    
+    def samples(self, values=None, labelnames=None):
+        values = self.values() if values is None else values
+        labelnames = self.labelnames if labelnames is None else labelnames
+        for key, (counts, total) in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield '_bucket', _label_text(labelnames, key, f'le="{_format_value(bound)}"'), cumulative
+            yield '_sum', _label_text(labelnames, key), total
+            yield '_count', _label_text(labelnames, key), cumulative
+
+def _owner_alive(lock_path):
+    """Whether the process that wrote a snapshot still holds its lock file"""
+    try:
+        lock = open(lock_path, 'rb')
+    except FileNotFoundError:
+        return False
+    try:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return True
+    finally:
+        lock.close()
+    return False
+
+def _write_json(path, data):
+    """Replace path atomically, so readers never see a partial file"""
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(path + '.tmp', path)
+
+class MetricsRegistry:
+    """
+    Named metrics plus collectors (callables run before each render to refresh
+    gauges from state owned by other services). With enabled=False recording
+    calls return immediately; used to measure the instrumentation's overhead.
+    
+    With multiprocess_dir set, render() returns the sum over every process
+    writing snapshots to that directory (see the module docstring). Snapshots
+    are written by start()'s thread every snapshot_interval seconds and by the
+    rendering process just before it reads them, so other workers' values are
+    at most that many seconds old. A process owns `<pid>-<id>.json` while it
+    holds an flock on the matching `.lock` file; the kernel drops the lock when
+    the process dies, which is how render() tells exited workers from live ones.
+    """
+    ARCHIVE = 'archive.json'
+    
+    def __init__(self, enabled=True, multiprocess_dir=None, snapshot_interval=5.0):
+        self.enabled = enabled
+        self.multiprocess_dir = multiprocess_dir
+        self.snapshot_interval = snapshot_interval
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._stem = None  # path of this process's snapshot, without extension
+        self._owner_lock = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self._snapshot_lock = threading.Lock()
+    
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f'Metric {name} is already registered differently')
+            return metric
+    
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+    
+    def gauge(self, name, documentation, labelnames=(), multiprocess_mode='all'):
+        return self._get_or_create(Gauge, name, documentation, labelnames, multiprocess_mode=multiprocess_mode)
+    
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+    
+    def add_collector(self, collector):
+        """Register a callable invoked with this registry before every render"""
+        self._collectors.append(collector)
+    
+    def _collect(self):
+        for collector in list(self._collectors):
+            try:
+                collector(self)
+            except Exception:
+                logger.exception('Metrics collector failed')
+    
+    def _sorted_metrics(self):
+        with self._lock:
+            return sorted(self._metrics.values(), key=lambda metric: metric.name)
+    
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        if self.multiprocess_dir:
+            return self._render_multiprocess()
+        
+        self._collect()
+        return self._exposition((metric, metric.values(), metric.labelnames) for metric in self._sorted_metrics())
+    
+    @staticmethod
+    def _exposition(metrics):
+        lines = []
+        for metric, values, labelnames in metrics:
+            name = metric.name + metric.suffix
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for suffix, labels, value in metric.samples(values, labelnames):
+                lines.append(f'{name}{suffix}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+    
+    # Multiprocess mode
+    
+    def start(self):
+        """
+        Start writing snapshots in this process (idempotent; no-op without a
+        multiprocess directory). A forked worker zeroes the values it inherited,
+        which the parent reports itself, and starts its own snapshot thread.
+        """
+        if not self.multiprocess_dir:
+            return
+        if self._pid != os.getpid():
+            self._after_fork()
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='metrics-snapshot', daemon=True)
+            self._thread.start()
+    
+    def _after_fork(self):
+        self._pid = os.getpid()
+        self._stem = self._owner_lock = self._thread = None
+        self._lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._stopping = threading.Event()
+        for metric in self._metrics.values():
+            metric.reset()
+    
+    def _run(self):
+        while not self._stopping.wait(self.snapshot_interval):
+            try:
+                self.write_snapshot()
+            except Exception:
+                logger.exception('Writing the metrics snapshot failed')
+    
+    def close(self):
+        """Write a last snapshot and give it up (it is archived by the next render), e.g. at worker exit"""
+        if not self.multiprocess_dir or self._pid != os.getpid() or self._stopping.is_set():
+            return
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(self.snapshot_interval)
+        self._write_snapshot(collect=False)
+        self._owner_lock.close()
+        self._owner_lock = None
+    
+    def write_snapshot(self, collect=True):
+        """
+        Write this process's values to the multiprocess directory. collect=False
+        skips the collectors, e.g. in the gunicorn master, which must not open
+        database connections its forked workers would inherit.
+        """
+        if not self.multiprocess_dir:
+            return
+        if self._pid != os.getpid():
+            self._after_fork()
+        if self._stopping.is_set():
+            return  # closed: the snapshot has been handed over to the archive
+        self._write_snapshot(collect)
+    
+    def _write_snapshot(self, collect):
+        if collect:
+            self._collect()
+        with self._snapshot_lock:  # the snapshot thread and a scrape may write at once
+            if self._stem is None:
+                self._stem = os.path.join(self.multiprocess_dir, f'{os.getpid()}-{uuid.uuid4().hex[:8]}')
+                # Locked before it gets its final name, so a reader never sees it unlocked
+                lock = open(self._stem + '.lock.tmp', 'wb')
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                os.replace(self._stem + '.lock.tmp', self._stem + '.lock')
+                self._owner_lock = lock
+            _write_json(self._stem + '.json', {
+                'pid': os.getpid(),
+                'metrics': {
+                    metric.name: [[list(key), value] for key, value in metric.values().items()]
+                    for metric in self._sorted_metrics()
+                }
+            })
+    
+    def _read_snapshots(self):
+        """
+        (archived totals, [(pid, metrics) of live processes]); snapshots of exited
+        processes are added to the archive and deleted, under a directory-wide lock
+        """
+        archive_path = os.path.join(self.multiprocess_dir, self.ARCHIVE)
+        live = []
+        with open(os.path.join(self.multiprocess_dir, 'archive.lock'), 'wb') as directory_lock:
+            fcntl.flock(directory_lock.fileno(), fcntl.LOCK_EX)
+            try:
+                with open(archive_path) as f:
+                    archive = json.load(f)
+            except FileNotFoundError:
+                archive = {}
+            
+            exited = []
+            for path in sorted(glob.glob(os.path.join(self.multiprocess_dir, '*-*.json'))):
+                stem = path[:-len('.json')]
+                try:
+                    with open(path) as f:
+                        snapshot = json.load(f)
+                except (FileNotFoundError, ValueError):
+                    continue
+                if _owner_alive(stem + '.lock'):
+                    live.append((snapshot['pid'], snapshot['metrics']))
+                else:
+                    exited.append((stem, snapshot['metrics']))
+            
+            if exited:
+                for _, metrics in exited:
+                    self._add_to_archive(archive, metrics)
+                _write_json(archive_path, archive)
+                for stem, _ in exited:
+                    for suffix in ('.json', '.lock'):
+                        try:
+                            os.unlink(stem + suffix)
+                        except FileNotFoundError:
+                            pass
+        return archive, live
+    
+    def _add_to_archive(self, archive, metrics):
+        """Fold an exited process's counters and histograms (not gauges) into the archive"""
+        for name, entries in metrics.items():
+            metric = self._metrics.get(name)
+            if metric is None or metric.kind == 'gauge':
+                continue
+            totals = {tuple(key): value for key, value in archive.get(name, [])}
+            for key, value in entries:
+                key = tuple(key)
+                totals[key] = metric.combine(totals[key], value) if key in totals else value
+            archive[name] = [[list(key), value] for key, value in totals.items()]
+    
+    def _render_multiprocess(self):
+        self.write_snapshot()
+        archive, live = self._read_snapshots()
+        
+        merged = []
+        for metric in self._sorted_metrics():
+            values, labelnames = {}, metric.labelnames
+            if metric.kind == 'gauge':
+                if metric.multiprocess_mode == 'all':
+                    labelnames = labelnames + ('pid',)
+                for pid, metrics in live:
+                    for key, value in metrics.get(metric.name, []):
+                        key = tuple(key)
+                        if metric.multiprocess_mode == 'all':
+                            values[key + (str(pid),)] = value
+                        elif metric.multiprocess_mode == 'max':
+                            values[key] = max(values.get(key, value), value)
+                        else:
+                            values[key] = values.get(key, 0) + value
+            else:
+                for metrics in [archive] + [metrics for _, metrics in live]:
+                    for key, value in metrics.get(metric.name, []):
+                        key = tuple(key)
+                        values[key] = metric.combine(values[key], value) if key in values else value
+            merged.append((metric, values, labelnames))
+        return self._exposition(merged)
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    'mkulima_stage_seconds',
+    'Time spent in each stage of the prediction pipeline',
+    ['stage']
+)
+
+# Stage timings (ms) recorded by ImageProcessor / _run_prediction -> histogram stage
+TIMING_STAGES = {
+    'read': 'upload_read',
+    'decode': 'decode',
+    'resize': 'resize',
+    'normalize': 'normalize',
+    'inference': 'inference'
+}
+
+def observe_timings(timings):
+    """Record a request's per-stage timings (milliseconds, as in upload.timings)"""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add_timings(timings)
+    if not registry.enabled:
+        return
+    for key, stage in TIMING_STAGES.items():
+        ms = timings.get(key)
+        if ms is not None:
+            STAGE_SECONDS.labels(stage).observe(ms / 1000)
+    if 'sniff' in timings:
+        # Magic-byte sniffing plus header parsing and dimension checks
+        STAGE_SECONDS.labels('validate').observe((timings['sniff'] + timings.get('header', 0.0)) / 1000)
+
+def process_rss_bytes():
+    """Resident set size of this process, or None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+@contextmanager
+def observe_stage(stage):
+    """Time the enclosed block into the stage histogram (and the request's trace, if traced)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if registry.enabled:
+            STAGE_SECONDS.labels(stage).observe(elapsed)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.add(stage, start, elapsed)
@@ -0,0 +1,277 @@
+# backend-api/app/utils/profiling.py
+"""
+Admin-only profiling that needs no external service, enabled with PROFILING_ENABLED:
+
+- GET /api/v1/admin/profile?seconds=N samples the Python stack of every thread
+  in this worker at a fixed interval and returns them in the collapsed format
+  read by flamegraph.pl, speedscope and inferno ("thread;outer;inner count").
+- A request sent with the X-Mkulima-Trace: 1 header and an admin's bearer token
+  records spans for its pipeline stages (observe_stage), upload timings and SQL
+  statements. The response gets a Server-Timing header and an X-Mkulima-Trace-Id;
+  the full trace is at /api/v1/admin/traces/<trace id>.
+"""
+import collections
+import contextvars
+import os
+import sys
+import threading
+import time
+import uuid
+
+TRACE_HEADER = 'X-Mkulima-Trace'
+
+# The trace of the request being handled in this context, if it is traced
+current_trace = contextvars.ContextVar('mkulima_trace', default=None)
+
+# Leaf frames of threads parked waiting for work; left out unless idle=true
+IDLE_FRAMES = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('selectors.py', 'select'),
+    ('socket.py', 'accept'),
+    ('queue.py', 'get')
+}
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile is requested while another one is running"""
+    pass
+
+class SamplingProfiler:
+    """
+    Samples sys._current_frames() from the requesting thread, so nothing runs
+    between profiles and a sample costs one stack walk per thread. Only one
+    profile runs at a time per process.
+    """
+    def __init__(self, max_seconds=60, min_interval_ms=1):
+        self.max_seconds = max_seconds
+        self.min_interval = min_interval_ms / 1000
+        self.profiles = 0
+        self._labels = {}  # code object -> frame label
+        self._lock = threading.Lock()
+    
+    def _label(self, frame):
+        code = frame.f_code
+        label = self._labels.get(code)
+        if label is None:
+            module = frame.f_globals.get('__name__') or os.path.basename(code.co_filename)
+            name = getattr(code, 'co_qualname', code.co_name)
+            label = self._labels[code] = f'{module}:{name}'.replace(';', ':').replace(' ', '_')
+        return label
+    
+    def _stack(self, frame):
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame))
+            frame = frame.f_back
+        labels.reverse()
+        return ';'.join(labels)
+    
+    def profile(self, seconds, interval_ms=10, idle=False):
+        """
+        Sample for `seconds` every `interval_ms`. Returns (Counter of collapsed
+        stacks -> samples, number of sampling passes)
+        """
+        seconds = min(max(float(seconds), 0.0), self.max_seconds)
+        interval = max(interval_ms / 1000, self.min_interval)
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError('A profile is already running in this worker')
+        
+        try:
+            own = threading.get_ident()
+            stacks, passes = collections.Counter(), 0
+            names, names_at = {}, 0.0
+            start = time.perf_counter()
+            deadline, next_sample = start + seconds, start
+            while next_sample < deadline:
+                now = time.perf_counter()
+                if now - names_at > 1.0:
+                    names, names_at = {t.ident: t.name for t in threading.enumerate()}, now
+                for ident, frame in sys._current_frames().items():
+                    if ident == own:
+                        continue
+                    code = frame.f_code
+                    if not idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                        continue
+                    thread = names.get(ident, f'thread-{ident}').replace(';', ':').replace(' ', '_')
+                    stacks[f'{thread};{self._stack(frame)}'] += 1
+                passes += 1
+                next_sample += interval
+                time.sleep(max(0.0, next_sample - time.perf_counter()))
+            self.profiles += 1
+            return stacks, passes
+        finally:
+            self._lock.release()
+
+def collapsed(stacks):
+    """Counter of stacks -> the collapsed-stack text, one 'frames count' line each"""
+    return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+
+class RequestTrace:
+    """
+    Spans recorded while one request is handled. Spans from per-stage timings
+    (upload.timings) carry a duration only.
+    """
+    def __init__(self, method, path):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans = []
+        self.total = None
+        self.status = None
+    
+    def add(self, name, start, duration, detail=None):
+        """Record a span; start is a perf_counter() value (or None), duration in seconds"""
+        span = {
+            'name': name,
+            'start_ms': round((start - self.start) * 1000, 3) if start is not None else None,
+            'duration_ms': round(duration * 1000, 3)
+        }
+        if detail:
+            span['detail'] = detail
+        self.spans.append(span)
+    
+    def add_timings(self, timings):
+        """Record per-stage timings in milliseconds, as in upload.timings"""
+        for name, ms in timings.items():
+            self.add(name, None, ms / 1000)
+    
+    def finish(self, status):
+        self.total = time.perf_counter() - self.start
+        self.status = status
+    
+    def totals(self):
+        """name -> (total ms, span count)"""
+        totals = {}
+        for span in self.spans:
+            total, count = totals.get(span['name'], (0.0, 0))
+            totals[span['name']] = (total + span['duration_ms'], count + 1)
+        return totals
+    
+    def server_timing(self):
+        """Server-Timing header value: time per span name, then the whole request"""
+        entries = [
+            f'{name};dur={total:.3f}' + (f';desc="{count}x"' if count > 1 else '')
+            for name, (total, count) in self.totals().items()
+        ]
+        entries.append(f'total;dur={self.total * 1000:.3f}')
+        return ', '.join(entries)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'method': self.method,
+            'path': self.path,
+            'status': self.status,
+            'started_at': self.started_at,
+            'total_ms': round(self.total * 1000, 3) if self.total is not None else None,
+            'totals_ms': {name: round(total, 3) for name, (total, _) in self.totals().items()},
+            'spans': self.spans
+        }
+
+def _sql_started(conn, cursor, statement, parameters, context, executemany):
+    if current_trace.get() is not None:
+        conn.info.setdefault('mkulima_trace_starts', []).append(time.perf_counter())
+
+def _sql_finished(conn, cursor, statement, parameters, context, executemany):
+    trace = current_trace.get()
+    starts = conn.info.get('mkulima_trace_starts')
+    if trace is not None and starts:
+        start = starts.pop()
+        trace.add('sql', start, time.perf_counter() - start, ' '.join(statement.split())[:200])
+
+def init_profiling(app):
+    """
+    Add the admin profiling endpoints and request tracing to the app
+    (only called when PROFILING_ENABLED is set)
+    """
+    from flask import Response, g, jsonify, request
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from app.services.prediction_cache import LRUCacheTier
+    from app.utils.auth import _authenticate, admin_required
+    
+    profiler = SamplingProfiler(max_seconds=app.config.get('PROFILING_MAX_SECONDS', 60))
+    traces = LRUCacheTier(max_entries=max(1, app.config.get('PROFILING_TRACE_HISTORY', 200)), ttl=3600)
+    
+    if not event.contains(Engine, 'before_cursor_execute', _sql_started):
+        event.listen(Engine, 'before_cursor_execute', _sql_started)
+        event.listen(Engine, 'after_cursor_execute', _sql_finished)
+    
+    @app.before_request
+    def start_trace():
+        if request.headers.get(TRACE_HEADER, '').lower() not in ('1', 'true', 'yes'):
+            return None
+        # Tracing is for admins only; anyone else's request is served untraced
+        user, error = _authenticate()
+        if error or not getattr(user, 'is_admin', False):
+            return None
+        g.trace_token = current_trace.set(RequestTrace(request.method, request.path))
+        return None
+    
+    @app.after_request
+    def finish_trace(response):
+        trace = current_trace.get()
+        if trace is None:
+            return response
+        trace.finish(response.status_code)
+        traces.set(trace.id, trace)
+        response.headers['Server-Timing'] = trace.server_timing()
+        response.headers['X-Mkulima-Trace-Id'] = trace.id
+        return response
+    
+    @app.teardown_request
+    def end_trace(exc):
+        token = g.pop('trace_token', None)
+        if token is not None:
+            current_trace.reset(token)
+    
+    @admin_required
+    def profile():
+        """
+        Sample this worker's threads for ?seconds= (default 10) every ?interval_ms=
+        (default 10); ?idle=true keeps threads parked waiting for work
+        """
+        try:
+            seconds = float(request.args.get('seconds', 10))
+            interval_ms = float(request.args.get('interval_ms', 10))
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'seconds and interval_ms must be numbers'
+            }), 400
+        
+        try:
+            stacks, passes = profiler.profile(
+                seconds, interval_ms, idle=request.args.get('idle', 'false').lower() == 'true'
+            )
+        except ProfilerBusyError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 409
+        
+        filename = f'mkulima-{os.getpid()}-{time.strftime("%Y%m%dT%H%M%S")}.folded'
+        return Response(collapsed(stacks), mimetype='text/plain', headers={
+            'Content-Disposition': f'attachment; filename={filename}',
+            'Cache-Control': 'no-store',
+            'X-Profile-Samples': str(passes)
+        })
+    
+    @admin_required
+    def get_trace(trace_id):
+        """A recent request trace of this worker"""
+        trace = traces.get(trace_id)
+        if trace is None:
+            return jsonify({
+                'success': False,
+                'error': 'Trace not found (expired, or recorded by another worker)'
+            }), 404
+        return jsonify({
+            'success': True,
+            'trace': trace.to_dict()
+        })
+    
+    app.add_url_rule('/api/v1/admin/profile', 'admin_profile', profile)
+    app.add_url_rule('/api/v1/admin/traces/<trace_id>', 'admin_trace', get_trace)
@@ -0,0 +1,83 @@
+# backend-api/app/utils/query_plans.py
+"""
+Query-plan checks for the DatabaseService hot paths: record the SQL a set of
+calls emits, EXPLAIN each SELECT / UPDATE / DELETE and report any full table
+scan of disease_detections or users instead of an index:
+  - SQLite: EXPLAIN QUERY PLAN, a "SCAN <table>" step without an index
+  - PostgreSQL: EXPLAIN (FORMAT JSON) with enable_seqscan off, any Seq Scan
+    node on those tables (the planner only falls back to one when no index
+    can serve the query)
+
+Used by tests/test_query_plans.py and benchmarks/check_query_plans.py.
+"""
+import json
+import re
+from sqlalchemy import event
+
+CHECKED_TABLES = ('disease_detections', 'users')
+
+def sqlite_violations(connection, statement, parameters):
+    plan = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+    details = [row[-1] for row in plan]
+    violations = [
+        detail for detail in details
+        if re.match(r'SCAN (%s)\b(?!.*INDEX)' % '|'.join(CHECKED_TABLES), detail)
+    ]
+    return violations, details
+
+def postgres_violations(connection, statement, parameters):
+    connection.exec_driver_sql('SET enable_seqscan = off')
+    raw = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement, parameters).scalar()
+    plan = raw if isinstance(raw, list) else json.loads(raw)
+    
+    details, violations = [], []
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        detail = f"{node['Node Type']} {node.get('Relation Name', '')} {node.get('Index Name', '')}".strip()
+        details.append(detail)
+        if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') in CHECKED_TABLES:
+            violations.append(detail)
+        nodes.extend(node.get('Plans', []))
+    return violations, details
+
+def plan_violations(connection, statement, parameters):
+    """(full scans of CHECKED_TABLES, all plan steps) of one statement"""
+    explain = sqlite_violations if connection.dialect.name == 'sqlite' else postgres_violations
+    return explain(connection, statement, parameters)
+
+def checked_calls(user_id):
+    """(name, call) of every DatabaseService read / update method whose SQL is checked"""
+    from app.services.database import DatabaseService
+    
+    first_page = DatabaseService.get_user_detections(user_id, limit=50)
+    return [
+        ('get_user', lambda: DatabaseService.get_user(user_id)),
+        ('get_user_detections', lambda: DatabaseService.get_user_detections(user_id, limit=50)),
+        ('get_user_detections(cursor)', lambda: DatabaseService.get_user_detections(
+            user_id, limit=50, cursor=first_page['next_cursor'])),
+        ('get_detection_stats', lambda: DatabaseService.get_detection_stats(user_id)),
+        ('get_platform_analytics', DatabaseService.get_platform_analytics),
+        ('insert_detections', lambda: DatabaseService.insert_detections([{
+            'user_id': user_id, 'plant_type': 'maize', 'disease_name': 'Healthy',
+            'confidence': 0.9, 'severity': 'Low'
+        }], skip_existing=True)),
+    ]
+
+def capture_statements(engine, calls):
+    """Run the calls; (name, statement, parameters) of each SELECT / UPDATE / DELETE they emit"""
+    captured = []
+    label = {'name': None}
+    
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if label['name'] and statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+            captured.append((label['name'], statement, parameters[0] if executemany else parameters))
+    
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        for name, call in calls:
+            label['name'] = name
+            call()
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+    return captured
@@ -0,0 +1,185 @@
+# backend-api/benchmarks/benchmark_backends.py
+"""
+CPU benchmark for the AIPredictor inference backends
+
+Compares a full Keras model, a float16 TFLite model and an int8 TFLite model
+on the same images: single-image latency, batched throughput, resident memory
+and top-1 agreement with the Keras reference.
+
+Each backend is loaded in a fresh process so RSS numbers are not polluted by
+the other backends.
+
+Usage:
+    python benchmarks/benchmark_backends.py \
+        --keras models/plant_disease_model.h5 \
+        --float16 models/plant_disease_model_fp16.tflite \
+        --int8 models/plant_disease_model_int8.tflite \
+        --images path/to/sample_images --runs 200
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+IMAGE_SIZE = (224, 224)
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux /proc, falls back to ru_maxrss)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_images(images_dir, count, seed=123):
+    """Load up to `count` images as a float32 (N, 224, 224, 3) array in [0, 1]"""
+    if not images_dir:
+        rng = np.random.default_rng(seed)
+        return rng.random((count,) + IMAGE_SIZE + (3,), dtype=np.float32)
+
+    from PIL import Image
+
+    paths = []
+    for root, _, files in os.walk(images_dir):
+        for name in sorted(files):
+            if name.lower().endswith(('.jpg', '.jpeg', '.png')):
+                paths.append(os.path.join(root, name))
+    paths = sorted(paths)[:count]
+    if not paths:
+        raise SystemExit(f"No images found in {images_dir}")
+
+    images = np.empty((len(paths),) + IMAGE_SIZE + (3,), dtype=np.float32)
+    for i, path in enumerate(paths):
+        with Image.open(path) as image:
+            image = image.convert('RGB').resize(IMAGE_SIZE, Image.Resampling.BILINEAR)
+            images[i] = np.asarray(image, dtype=np.float32) * (1.0 / 255.0)
+    return images
+
+
+def run_backend(name, model_path, backend, images, runs, batch_size, results):
+    from app.services.ai_predictor import load_backend
+
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    model = load_backend(model_path, backend)
+    load_time = time.perf_counter() - start
+    rss_after = current_rss_mb()
+
+    # Warm up both batch shapes so graph tracing / tensor allocation is excluded
+    model.predict(images[:1])
+    model.predict(images[:batch_size])
+
+    latencies = []
+    for i in range(runs):
+        image = images[i % len(images)][np.newaxis, ...]
+        start = time.perf_counter()
+        model.predict(image)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    batches = max(runs // batch_size, 1)
+    start = time.perf_counter()
+    for i in range(batches):
+        offset = (i * batch_size) % max(len(images) - batch_size + 1, 1)
+        model.predict(images[offset:offset + batch_size])
+    throughput = batches * batch_size / (time.perf_counter() - start)
+
+    top1 = []
+    for offset in range(0, len(images), batch_size):
+        top1.extend(np.argmax(model.predict(images[offset:offset + batch_size]), axis=1).tolist())
+
+    results[name] = {
+        'backend': model.name,
+        'precision': model.precision,
+        'model_size_mb': _path_size(model_path) / (1024 * 1024),
+        'load_time_s': load_time,
+        'rss_mb': current_rss_mb(),
+        'model_rss_mb': rss_after - rss_before,
+        'latency_ms_p50': float(np.percentile(latencies, 50)),
+        'latency_ms_p95': float(np.percentile(latencies, 95)),
+        'throughput_images_per_s': throughput,
+        'top1': top1
+    }
+
+
+def _path_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path) for name in files
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--keras', help='Keras .h5/.keras model or SavedModel directory')
+    parser.add_argument('--float16', help='float16 TFLite model')
+    parser.add_argument('--int8', help='int8-quantized TFLite model')
+    parser.add_argument('--images', help='Directory of sample images (random data if omitted)')
+    parser.add_argument('--num-images', type=int, default=64)
+    parser.add_argument('--runs', type=int, default=100)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--json', help='Write the results to this file')
+    args = parser.parse_args()
+
+    candidates = [
+        ('keras', args.keras, 'keras'),
+        ('float16', args.float16, 'tflite'),
+        ('int8', args.int8, 'tflite')
+    ]
+    candidates = [c for c in candidates if c[1]]
+    if not candidates:
+        parser.error('Pass at least one of --keras, --float16, --int8')
+
+    images = load_images(args.images, args.num_images)
+
+    ctx = multiprocessing.get_context('spawn')
+    manager = ctx.Manager()
+    results = manager.dict()
+    for name, path, backend in candidates:
+        process = ctx.Process(
+            target=run_backend,
+            args=(name, path, backend, images, args.runs, args.batch_size, results)
+        )
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            print(f"{name}: benchmark process failed with exit code {process.exitcode}")
+
+    results = dict(results)
+    reference = results.get('keras') or next(iter(results.values()), None)
+    if reference is None:
+        raise SystemExit('No backend completed')
+
+    header = f"{'backend':<10}{'precision':>10}{'size MB':>10}{'load s':>8}{'RSS MB':>9}" \
+             f"{'p50 ms':>9}{'p95 ms':>9}{'img/s':>9}{'top-1 agree':>13}"
+    print(header)
+    print('-' * len(header))
+    for name, result in results.items():
+        agreement = float(np.mean(np.array(result['top1']) == np.array(reference['top1'])))
+        result['top1_agreement'] = agreement
+        print(f"{name:<10}{result['precision']:>10}{result['model_size_mb']:>10.1f}"
+              f"{result['load_time_s']:>8.2f}{result['rss_mb']:>9.0f}"
+              f"{result['latency_ms_p50']:>9.2f}{result['latency_ms_p95']:>9.2f}"
+              f"{result['throughput_images_per_s']:>9.1f}{agreement:>13.3f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({name: {k: v for k, v in r.items() if k != 'top1'} for name, r in results.items()}, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
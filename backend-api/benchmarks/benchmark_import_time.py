@@ -0,0 +1,101 @@
+# backend-api/benchmarks/benchmark_import_time.py
+"""
+Cold-start regression guard for the API process
+
+Runs `python -X importtime` on a fresh interpreter for the module the web
+process imports, then:
+  - fails if any heavy ML module (tensorflow, keras, tflite_runtime) was
+    imported, since the model stack must only load lazily in AIPredictor
+  - fails if the cumulative import time exceeds the budget
+  - prints the slowest imports so a regression is easy to track down
+
+Also reports the wall time of `create_app()` (excluding model loading).
+
+Usage:
+    python benchmarks/benchmark_import_time.py --budget-ms 1500
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FORBIDDEN_MODULES = ('tensorflow', 'keras', 'tflite_runtime')
+
+
+def import_times(statement):
+    """Return [(cumulative_us, self_us, module)] for every module imported by statement"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+        env=dict(os.environ, MODEL_WARMUP='off')
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Import failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return rows
+
+
+def create_app_time(runs):
+    statement = (
+        'import time; start = time.perf_counter(); '
+        'from app import create_app; create_app(); '
+        'print(time.perf_counter() - start)'
+    )
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-c', statement], cwd=BACKEND_DIR, capture_output=True, text=True,
+            env=dict(os.environ, MODEL_WARMUP='off')
+        )
+        if result.returncode != 0:
+            raise SystemExit(f"create_app failed:\n{result.stderr[-2000:]}")
+        timings.append(float(result.stdout.strip().splitlines()[-1]) * 1000)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='app.routes', help='Module imported by the web process')
+    parser.add_argument('--budget-ms', type=float, default=1500.0,
+                        help='Maximum cumulative import time of --module')
+    parser.add_argument('--top', type=int, default=15, help='Number of slowest imports to print')
+    parser.add_argument('--runs', type=int, default=3, help='create_app() runs (best of)')
+    args = parser.parse_args()
+
+    rows = import_times(f'import {args.module}')
+    total_ms = max((cumulative for cumulative, _, name in rows if name.strip() == args.module), default=0) / 1000
+
+    print(f"Slowest imports (cumulative) for 'import {args.module}':")
+    for cumulative, self_us, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:9.1f} ms  (self {self_us / 1000:7.1f} ms)  {name.strip()}")
+
+    startup_ms = create_app_time(args.runs)
+    print(f"\nimport {args.module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"create_app(): {startup_ms:.1f} ms")
+
+    failures = []
+    heavy = sorted({
+        name.strip() for _, _, name in rows
+        if name.strip().split('.')[0] in FORBIDDEN_MODULES
+    })
+    if heavy:
+        failures.append(f"heavy ML modules imported eagerly: {', '.join(heavy[:5])}")
+    if total_ms > args.budget_ms:
+        failures.append(f"import time {total_ms:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
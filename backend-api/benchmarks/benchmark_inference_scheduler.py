@@ -0,0 +1,136 @@
+# backend-api/benchmarks/benchmark_inference_scheduler.py
+"""
+Interactive scan latency while batch uploads flood the model
+
+Drives MicroBatcher (the scheduler in front of the model) with a simulated model
+that takes --fixed-ms + --per-image-ms per image for each call:
+  --interactive-clients threads send single scans with --think-ms between them
+  --batch-clients threads send --chunk-size image chunks back to back (bulk sync)
+and runs three scenarios for --seconds each:
+  alone      interactive scans only
+  fifo       with the flood, all work in one class (the scheduler without priorities)
+  priority   with the flood as 'background' work behind 'interactive' scans
+reporting interactive p50 / p95 / p99 latency, flood throughput and shed work.
+
+Usage:
+    python benchmarks/benchmark_inference_scheduler.py
+    python benchmarks/benchmark_inference_scheduler.py --batch-clients 16 --max-queued-images 256
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_model(fixed_ms, per_image_ms, classes=10):
+    def infer(batch):
+        time.sleep((fixed_ms + per_image_ms * batch.shape[0]) / 1000)
+        return np.zeros((batch.shape[0], classes), dtype=np.float32)
+    return infer
+
+
+def run_scenario(args, flood_priority):
+    from app.services.ai_predictor import InferenceShedError, MicroBatcher
+
+    batcher = MicroBatcher(
+        make_model(args.fixed_ms, args.per_image_ms),
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        mode='adaptive',
+        deadlines_ms={
+            'interactive': args.interactive_deadline_ms,
+            'background': args.background_deadline_ms if flood_priority == 'background' else args.interactive_deadline_ms
+        },
+        max_queued_images=args.max_queued_images
+    )
+    image = np.zeros((4, 4, 3), dtype=np.float32)
+    chunk = np.zeros((args.chunk_size, 4, 4, 3), dtype=np.float32)
+    stop = threading.Event()
+    latencies, shed, flood_images = [], {'interactive': 0, 'flood': 0}, [0]
+    lock = threading.Lock()
+
+    def interactive(seed):
+        rng = np.random.default_rng(seed)
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                batcher.predict(image, priority='interactive')
+                with lock:
+                    latencies.append((time.perf_counter() - start) * 1000)
+            except InferenceShedError:
+                with lock:
+                    shed['interactive'] += 1
+            time.sleep(rng.exponential(args.think_ms) / 1000)
+
+    def flood():
+        while not stop.is_set():
+            try:
+                batcher.predict_batch(chunk, priority=flood_priority)
+                with lock:
+                    flood_images[0] += args.chunk_size
+            except InferenceShedError:
+                with lock:
+                    shed['flood'] += 1
+                time.sleep(0.01)
+
+    threads = [threading.Thread(target=interactive, args=(i,), daemon=True) for i in range(args.interactive_clients)]
+    if flood_priority is not None:
+        threads += [threading.Thread(target=flood, daemon=True) for _ in range(args.batch_clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    batcher.stop()
+
+    latencies = np.array(latencies)
+    return {
+        'scans': len(latencies),
+        'p50': float(np.percentile(latencies, 50)),
+        'p95': float(np.percentile(latencies, 95)),
+        'p99': float(np.percentile(latencies, 99)),
+        'flood_images_per_s': flood_images[0] / args.seconds,
+        'shed': shed,
+        'classes': batcher.metrics.snapshot()['classes']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--interactive-clients', type=int, default=8)
+    parser.add_argument('--think-ms', type=float, default=50)
+    parser.add_argument('--batch-clients', type=int, default=8)
+    parser.add_argument('--chunk-size', type=int, default=32)
+    parser.add_argument('--fixed-ms', type=float, default=5, help='Simulated model call overhead')
+    parser.add_argument('--per-image-ms', type=float, default=1, help='Simulated model time per image')
+    parser.add_argument('--max-batch-size', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=5)
+    parser.add_argument('--max-queued-images', type=int, default=512)
+    parser.add_argument('--interactive-deadline-ms', type=float, default=2000)
+    parser.add_argument('--background-deadline-ms', type=float, default=30000)
+    args = parser.parse_args()
+
+    print(f"{args.interactive_clients} interactive clients, {args.batch_clients} x {args.chunk_size}-image flood, "
+          f"model {args.fixed_ms:g} ms + {args.per_image_ms:g} ms/image, {args.seconds:g} s per scenario")
+    print(f"{'scenario':<10}{'scans':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'flood img/s':>13}"
+          f"{'shed scans':>12}{'shed chunks':>13}")
+    for scenario, flood_priority in (('alone', None), ('fifo', 'interactive'), ('priority', 'background')):
+        result = run_scenario(args, flood_priority)
+        print(f"{scenario:<10}{result['scans']:>8}{result['p50']:>10.1f}{result['p95']:>10.1f}{result['p99']:>10.1f}"
+              f"{result['flood_images_per_s']:>13.0f}{result['shed']['interactive']:>12}{result['shed']['flood']:>13}")
+        for priority, counters in result['classes'].items():
+            print(f"    {priority:<12} queue wait {counters['avg_queue_wait_ms']:.1f} ms, "
+                  f"service {counters['avg_service_ms']:.1f} ms, shed {counters['shed_expired']} expired / "
+                  f"{counters['shed_overload']} overload")
+
+
+if __name__ == '__main__':
+    main()
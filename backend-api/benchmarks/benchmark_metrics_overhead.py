@@ -0,0 +1,140 @@
+# backend-api/benchmarks/benchmark_metrics_overhead.py
+"""
+Cost of the Prometheus instrumentation on the /predict hot path
+
+Posts --requests distinct JPEG uploads to /api/v1/predict through the Flask test
+client (no prediction cache hits, rate limiting off), switching the metrics
+registry on and off between consecutive requests so drift affects both settings
+alike, and reports request latency of each. End-to-end differences of well under 1% are within run-to-run noise, so
+the recording work itself is also timed in isolation: one request's worth of
+observations (stage timings, stage context managers, counters) is replayed
+--observations times and compared with the mean request latency.
+
+Exits non-zero if the instrumentation costs more than --max-overhead percent of
+a request. Without a model file the predictor serves mock predictions, which
+makes requests cheaper and the measured share pessimistic.
+
+Usage:
+    python benchmarks/benchmark_metrics_overhead.py
+    python benchmarks/benchmark_metrics_overhead.py --requests 5000 --image-size 1280
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_app(database_url):
+    from flask_migrate import upgrade
+    from app import create_app
+    from app.config import Config
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        MODEL_WARMUP = 'off'
+        JOB_QUEUE_BACKEND = 'memory'
+        WRITE_BUFFER_ENABLED = False
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        upgrade()
+    return app
+
+
+def make_uploads(count, size, seed=0):
+    rng = np.random.default_rng(seed)
+    uploads = []
+    for _ in range(count):
+        pixels = rng.integers(0, 256, size=(size, size, 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, 'JPEG', quality=85)
+        uploads.append(buffer.getvalue())
+    return uploads
+
+
+def post(client, data):
+    """Milliseconds for one /predict request"""
+    start = time.perf_counter()
+    response = client.post(
+        '/api/v1/predict',
+        data={'image': (io.BytesIO(data), 'leaf.jpg'), 'plant_type': 'maize'},
+        content_type='multipart/form-data'
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    assert response.status_code == 200, response.get_json()
+    return elapsed
+
+
+def recording_cost_us(observations):
+    """Microseconds to record one request's metrics (what /predict records per scan)"""
+    from app.utils.metrics import observe_stage, observe_timings
+    from app.routes.prediction import PREDICTIONS
+    from app.services.rate_limiter import RATE_LIMIT_DECISIONS
+
+    timings = {'read': 0.02, 'sniff': 0.01, 'header': 0.2, 'decode': 0.8, 'resize': 2.0,
+               'normalize': 0.6, 'inference': 20.0}
+    start = time.perf_counter()
+    for _ in range(observations):
+        RATE_LIMIT_DECISIONS.labels('inference', 'allowed').inc()
+        observe_timings(timings)
+        for stage in ('knowledge_base', 'db_write', 'serialize'):
+            with observe_stage(stage):
+                pass
+        PREDICTIONS.labels('maize', 'Maize Lethal Necrosis', 'model').inc()
+    return (time.perf_counter() - start) / observations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--image-size', type=int, default=640)
+    parser.add_argument('--observations', type=int, default=100000)
+    parser.add_argument('--max-overhead', type=float, default=1.0, help='Allowed overhead, percent')
+    args = parser.parse_args()
+
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='mkulima-metrics-'), 'bench.db')}"
+    app = make_app(database_url)
+
+    from app.services.rate_limiter import rate_limiter
+    from app.utils.metrics import registry
+
+    rate_limiter.enabled = False
+    client = app.test_client()
+    uploads = make_uploads(args.requests, args.image_size)
+    for data in make_uploads(20, args.image_size, seed=1):
+        post(client, data)  # warm up imports and code paths
+
+    timings = {True: [], False: []}
+    for i, data in enumerate(uploads):
+        registry.enabled = i % 2 == 0
+        timings[registry.enabled].append(post(client, data))
+    registry.enabled = True
+
+    mean = {enabled: float(np.mean(values)) for enabled, values in timings.items()}
+    p50 = {enabled: float(np.median(values)) for enabled, values in timings.items()}
+    cost_us = recording_cost_us(args.observations)
+    share = cost_us / (mean[False] * 1000) * 100
+
+    print(f"{args.requests} requests, {args.image_size}px JPEG uploads")
+    print(f"{'metrics':<10}{'p50 ms':>10}{'mean ms':>10}")
+    for enabled in (False, True):
+        print(f"{'on' if enabled else 'off':<10}{p50[enabled]:>10.3f}{mean[enabled]:>10.3f}")
+    print(f"end to end: {(mean[True] / mean[False] - 1) * 100:+.2f}% (includes run-to-run noise)")
+    print(f"recording per request: {cost_us:.1f} us = {share:.3f}% of a request "
+          f"(limit {args.max_overhead:g}%)")
+    if share > args.max_overhead:
+        print("FAIL: instrumentation overhead above limit")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+# backend-api/benchmarks/benchmark_near_duplicate.py
+"""
+Near-duplicate detection benchmark on a synthetic burst dataset
+
+Generates `--leaves` distinct synthetic leaf photos. Each is shot as a burst of
+3-5 near-identical frames: small shift, slight rotation, exposure change, and
+JPEG re-encoding at a different quality. Bursts from several users are
+interleaved in time. Every frame goes through ImageProcessor (which computes
+the dHash) and NearDuplicateIndex, the same way predict_disease does.
+
+Reports:
+  - inference calls saved (frames answered from the index)
+  - false matches: frames answered with a prediction made for a different leaf,
+    an upper bound on the accuracy impact
+  - with --model, top-1 agreement between the reused and the fresh prediction
+
+Usage:
+    python benchmarks/benchmark_near_duplicate.py --leaves 200 --max-distance 10
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Upload:
+    """Minimal stand-in for werkzeug's FileStorage: only .stream is used"""
+    def __init__(self, data):
+        self.stream = io.BytesIO(data)
+
+
+def make_leaf(rng, size=640):
+    """A random leaf-like texture: green base, veins and lesion spots"""
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32)
+    angle = rng.uniform(0, np.pi)
+    veins = np.sin((x * np.cos(angle) + y * np.sin(angle)) / rng.uniform(8, 30))
+    image = np.stack([
+        60 + 30 * veins,
+        120 + 50 * veins + rng.uniform(-20, 20),
+        40 + 20 * veins
+    ], axis=-1)
+    for _ in range(rng.integers(3, 15)):
+        cy, cx, r = rng.uniform(0, size), rng.uniform(0, size), rng.uniform(10, 60)
+        spot = ((x - cx) ** 2 + (y - cy) ** 2) < r ** 2
+        image[spot] = rng.uniform(60, 160, 3)
+    return np.clip(image + rng.normal(0, 6, image.shape), 0, 255).astype(np.uint8)
+
+
+def burst_frame(rng, leaf):
+    """One frame of a burst: jittered copy of the leaf, re-encoded as JPEG"""
+    from PIL import Image, ImageEnhance
+    image = Image.fromarray(leaf)
+    dx, dy = rng.integers(-12, 13, 2)
+    image = image.rotate(rng.uniform(-3, 3), translate=(int(dx), int(dy)), resample=Image.Resampling.BILINEAR)
+    image = ImageEnhance.Brightness(image).enhance(rng.uniform(0.92, 1.08))
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=int(rng.integers(75, 95)))
+    return buffer.getvalue()
+
+
+def build_dataset(num_leaves, num_users, seed):
+    """Return [(timestamp, user, leaf_id, jpeg bytes)] with bursts interleaved across users"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    clock = {user: 0.0 for user in range(num_users)}
+    for leaf_id in range(num_leaves):
+        user = int(rng.integers(num_users))
+        leaf = make_leaf(rng)
+        clock[user] += rng.uniform(30, 600)  # time to walk to the next plant
+        for _ in range(rng.integers(3, 6)):
+            clock[user] += rng.uniform(0.5, 4)  # seconds between burst shots
+            frames.append((clock[user], f'user-{user}', leaf_id, burst_frame(rng, leaf)))
+    frames.sort(key=lambda frame: frame[0])
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--leaves', type=int, default=200)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--max-distance', type=int, default=10)
+    parser.add_argument('--window', type=int, default=120)
+    parser.add_argument('--model', help='MODEL_PATH to also measure top-1 agreement')
+    parser.add_argument('--seed', type=int, default=123)
+    args = parser.parse_args()
+
+    from app.services.image_processor import ImageProcessor
+    from app.services.near_duplicate import NearDuplicateIndex
+
+    processor = ImageProcessor()
+    index = NearDuplicateIndex(window_seconds=args.window, max_distance=args.max_distance)
+    predictor = None
+    if args.model:
+        from app.services.ai_predictor import AIPredictor
+        predictor = AIPredictor(model_path=args.model, batching_mode='off')
+        predictor.load()
+
+    frames = build_dataset(args.leaves, args.users, args.seed)
+    saved = false_matches = agreements = 0
+    hash_ms = []
+
+    for timestamp, user, leaf_id, data in frames:
+        upload = processor.load_upload(Upload(data))
+        start = time.perf_counter()
+        batch = processor.preprocess(upload)
+        hash_ms.append((time.perf_counter() - start) * 1000)
+
+        match, _ = index.find(user, upload.phash, 'maize', 'v1', now=timestamp)
+        if match is not None:
+            saved += 1
+            false_matches += match['leaf_id'] != leaf_id
+            if predictor is not None:
+                fresh = predictor.predict(batch, 'maize')
+                agreements += fresh['disease_name'] == match['disease_name']
+            continue
+
+        prediction = {'leaf_id': leaf_id}
+        if predictor is not None:
+            prediction.update(predictor.predict(batch, 'maize'))
+        index.add(user, upload.phash, 'maize', 'v1', prediction, now=timestamp)
+
+    total = len(frames)
+    print(f"{total} frames from {args.leaves} bursts, {args.users} users, "
+          f"max distance {args.max_distance}, window {args.window}s")
+    print(f"inference calls: {total - saved} of {total} ({saved / total:.1%} saved, "
+          f"ideal {(total - args.leaves) / total:.1%})")
+    print(f"false matches (reused a different leaf's prediction): {false_matches} "
+          f"({false_matches / max(saved, 1):.2%} of reused)")
+    if predictor is not None:
+        print(f"top-1 agreement of reused vs fresh prediction: {agreements / max(saved, 1):.2%}")
+    print(f"preprocess incl. dHash: {np.mean(hash_ms):.2f} ms/frame")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+# backend-api/benchmarks/benchmark_preprocessing.py
+"""
+Benchmark of ImageProcessor.preprocess against the previous implementation
+
+The previous path decoded the full-resolution upload, resized with LANCZOS,
+divided by 255.0 (float64) and added a batch axis with np.expand_dims. The
+current path decodes JPEGs at reduced size (Image.draft), resizes with
+BILINEAR and normalizes in float32 straight into a batch buffer.
+
+Each path runs in its own process so peak RSS is measured separately. Peak
+RSS comes from VmHWM (Linux only) and, unlike tracemalloc, includes PIL's
+decode buffers. Also reports the mean absolute difference between the outputs.
+
+Usage:
+    python benchmarks/benchmark_preprocessing.py --width 4000 --height 3000 --runs 20
+"""
+
+import argparse
+import io
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process (VmHWM) in kB"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1])
+    return 0
+
+
+def reset_peak_rss():
+    """Reset VmHWM to the current RSS (Linux >= 4.0)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+class Upload:
+    """Minimal stand-in for werkzeug's FileStorage: only .stream is used"""
+    def __init__(self, data):
+        self.stream = io.BytesIO(data)
+
+
+def legacy_preprocess(image_file, target_size=(224, 224)):
+    """ImageProcessor.preprocess before the fast path"""
+    from PIL import Image
+    image = Image.open(image_file.stream)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    image = image.resize(target_size, Image.Resampling.LANCZOS)
+    image_array = np.array(image)
+    image_array = image_array / 255.0
+    return np.expand_dims(image_array, axis=0)
+
+
+def make_photo(width, height, image_format, seed=123):
+    """Synthetic phone-photo-like image: smooth gradients plus sensor noise"""
+    from PIL import Image
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([
+        120 + 80 * np.sin(x / 97.0) * np.cos(y / 131.0),
+        140 + 60 * np.cos(x / 53.0 + y / 211.0),
+        70 + 50 * np.sin((x + y) / 173.0)
+    ], axis=-1)
+    pixels = np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, image_format, quality=90)
+    return buffer.getvalue()
+
+
+def measure(name, data, runs, results):
+    if name == 'legacy':
+        run = lambda: legacy_preprocess(Upload(data))
+    else:
+        from app.services.image_processor import ImageProcessor
+        processor = ImageProcessor()
+        batch = processor.new_batch_buffer(1)
+        run = lambda: processor.preprocess(Upload(data), out=batch[0])
+
+    output = run()
+    del output
+    reset_peak_rss()
+    baseline_kb = peak_rss_kb()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = run()
+        timings.append((time.perf_counter() - start) * 1000)
+    peak_kb = peak_rss_kb()
+
+    results[name] = {
+        'ms_mean': float(np.mean(timings)),
+        'ms_p95': float(np.percentile(timings, 95)),
+        'peak_rss_delta_mb': (peak_kb - baseline_kb) / 1024,
+        'output_dtype': str(output.dtype),
+        'output_mb': output.nbytes / (1024 * 1024),
+        'output': np.asarray(output, dtype=np.float32).reshape(224, 224, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--format', default='JPEG', choices=['JPEG', 'PNG'])
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    data = make_photo(args.width, args.height, args.format)
+    print(f"{args.width}x{args.height} {args.format}, {len(data) / (1024 * 1024):.1f} MB encoded, {args.runs} runs")
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Manager().dict()
+    for name in ('legacy', 'fast'):
+        process = ctx.Process(target=measure, args=(name, data, args.runs, results))
+        process.start()
+        process.join()
+
+    print(f"{'path':<8}{'ms/image':>10}{'p95 ms':>10}{'peak RSS +MB':>14}{'output':>18}")
+    for name in ('legacy', 'fast'):
+        r = results[name]
+        print(f"{name:<8}{r['ms_mean']:>10.1f}{r['ms_p95']:>10.1f}{r['peak_rss_delta_mb']:>14.1f}"
+              f"{r['output_dtype'] + ' ' + format(r['output_mb'], '.2f') + ' MB':>18}")
+
+    speedup = results['legacy']['ms_mean'] / results['fast']['ms_mean']
+    difference = float(np.mean(np.abs(results['legacy']['output'] - results['fast']['output'])))
+    print(f"\nspeedup {speedup:.1f}x, mean |legacy - fast| = {difference:.4f} (pixel scale 0-1)")
+
+
+if __name__ == '__main__':
+    main()
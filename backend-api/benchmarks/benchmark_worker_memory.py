@@ -0,0 +1,144 @@
+# backend-api/benchmarks/benchmark_worker_memory.py
+"""
+Memory benchmark for gunicorn workers, with and without a preloaded model
+
+Starts gunicorn with gunicorn.conf.py twice (GUNICORN_PRELOAD=false, then true),
+sends enough /api/v1/predict requests that every worker has run the model, and
+reports RSS, PSS (proportional share, counts shared pages once across processes)
+and private memory for the master and each worker from /proc/<pid>/smaps_rollup.
+
+Linux only. Usage:
+    MODEL_PATH=models/plant_disease_bundle \
+        python benchmarks/benchmark_worker_memory.py --workers 4 --requests 200
+"""
+
+import argparse
+import io
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+import uuid
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def smaps_rollup(pid):
+    """Return {'rss': MB, 'pss': MB, 'private': MB} for a process"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':'):
+                values[parts[0][:-1]] = int(parts[1]) / 1024
+    return {
+        'rss': values.get('Rss', 0.0),
+        'pss': values.get('Pss', 0.0),
+        'private': values.get('Private_Clean', 0.0) + values.get('Private_Dirty', 0.0)
+    }
+
+
+def child_pids(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # Field 4 is the parent pid; the command name (field 2) may contain spaces
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def sample_image():
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new('RGB', (640, 480), (60, 140, 60)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def post_image(url, image_bytes):
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="plant_type"\r\n\r\nmaize\r\n'
+        f'--{boundary}\r\nContent-Disposition: form-data; name="image"; filename="leaf.jpg"\r\n'
+        f'Content-Type: image/jpeg\r\n\r\n'
+    ).encode() + image_bytes + f'\r\n--{boundary}--\r\n'.encode()
+    request = urllib.request.Request(
+        url, data=body, headers={'Content-Type': f'multipart/form-data; boundary={boundary}'}
+    )
+    with urllib.request.urlopen(request, timeout=60) as response:
+        response.read()
+
+
+def wait_until_up(url, timeout=300):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=5):
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f"Server did not come up at {url}")
+
+
+def run(preload, args):
+    env = dict(os.environ, GUNICORN_PRELOAD='true' if preload else 'false',
+               WEB_CONCURRENCY=str(args.workers), PORT=str(args.port),
+               GUNICORN_MAX_REQUESTS='0')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'main:app'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f'http://127.0.0.1:{args.port}'
+    try:
+        wait_until_up(f'{base_url}/api/v1/health')
+        image_bytes = sample_image()
+        for _ in range(args.requests):
+            post_image(f'{base_url}/api/v1/predict', image_bytes)
+        time.sleep(1)
+
+        master = smaps_rollup(process.pid)
+        workers = [smaps_rollup(pid) for pid in child_pids(process.pid)]
+        return master, workers
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=60)
+
+
+def summarize(label, master, workers):
+    n = max(len(workers), 1)
+    total_pss = master['pss'] + sum(w['pss'] for w in workers)
+    print(f"{label:<12}{len(workers):>8}{master['rss']:>12.1f}"
+          f"{sum(w['rss'] for w in workers) / n:>16.1f}"
+          f"{sum(w['pss'] for w in workers) / n:>16.1f}"
+          f"{sum(w['private'] for w in workers) / n:>20.1f}{total_pss:>14.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=100,
+                        help='Predict requests sent so every worker has run the model')
+    parser.add_argument('--port', type=int, default=18000)
+    args = parser.parse_args()
+
+    results = {
+        'no preload': run(False, args),
+        'preload': run(True, args)
+    }
+
+    print(f"{'mode':<12}{'workers':>8}{'master RSS':>12}{'worker RSS avg':>16}"
+          f"{'worker PSS avg':>16}{'worker private avg':>20}{'total PSS':>14}   (MB)")
+    for label, (master, workers) in results.items():
+        summarize(label, master, workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# backend-api/gunicorn.conf.py
+"""
+Gunicorn settings for CPU inference
+
+The app (and, for TFLite models, the model) is loaded once in the master with
+preload_app and shared copy-on-write with the forked workers. TFLite model files
+are memory-mapped, so all workers read the same page-cache pages.
+
+Sizing: inference is CPU-bound, so workers * TFLITE_NUM_THREADS is kept at about
+the number of cores. Each worker runs a few gthread threads so concurrent requests
+can be fused by the micro-batcher in AIPredictor while one thread runs the model.
+
+All values can be overridden with environment variables.
+"""
+import multiprocessing
+import os
+import tempfile
+
+cpu_count = multiprocessing.cpu_count()
+
+# Threads used by one TFLite interpreter; exported so app.config picks it up
+inference_threads = int(os.environ.get('TFLITE_NUM_THREADS') or max(1, min(4, cpu_count // 2)))
+os.environ.setdefault('TFLITE_NUM_THREADS', str(inference_threads))
+
+# Workers write metric snapshots here so /metrics reports all of them, not just the
+# one that answers the scrape; a fresh directory per server start
+os.environ.setdefault('METRICS_MULTIPROC_DIR', tempfile.mkdtemp(prefix='mkulima-prometheus-'))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY') or max(1, cpu_count // inference_threads))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS') or 4)
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 60)
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers to bound heap growth; re-forking from a preloaded master is cheap
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS') or 1000)
+max_requests_jitter = max_requests // 10
+
+def when_ready(server):
+    """Load the model in the master, after the app is imported and before workers fork"""
+    if not preload_app:
+        return
+    from app.routes.prediction import ai_predictor
+    from app.utils.metrics import registry
+    if ai_predictor.preload():
+        server.log.info("Model preloaded in master: %s", ai_predictor.model_version)
+    # The preload's metrics (model load count and time) are reported once, by the master
+    registry.write_snapshot(collect=False)
+
+def post_fork(server, worker):
+    """
+    Start the metrics snapshots, the async prediction job workers and the
+    detection write buffer (both pick up work left over from before a restart),
+    then the background model warm-up (or per-worker load for non fork-safe backends)
+    """
+    from app.routes.prediction import ai_predictor, job_queue, detection_writer
+    from app.utils.metrics import registry
+    registry.start()
+    job_queue.start()
+    if detection_writer.enabled:
+        detection_writer.start()
+    if os.environ.get('MODEL_WARMUP', 'background') == 'off':
+        return
+    ai_predictor.warm_up(background=True)
+
+def worker_exit(server, worker):
+    """
+    Flush buffered detections before the worker goes away (restart, max_requests,
+    shutdown) and hand its final metrics over to the archive
+    """
+    from app.routes.prediction import detection_writer
+    from app.utils.metrics import registry
+    detection_writer.close()
+    registry.close()
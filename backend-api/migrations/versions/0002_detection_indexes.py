@@ -0,0 +1,53 @@
+"""detection indexes
+
+Composite and covering indexes for the DatabaseService queries:
+  - (user_id, detected_at, id): per-user history with keyset pagination
+  - (user_id, severity, disease_name, confidence): per-user stats, index-only
+  - (detected_at): time-range filters such as "active today"
+  - (disease_name): most common diseases
+  - users (region): regional distribution
+
+On PostgreSQL the indexes are built CONCURRENTLY, outside the migration
+transaction, so disease_detections stays writable while they are created.
+IF NOT EXISTS makes the upgrade safe on databases where db.create_all()
+already created some of them.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 09:40:05.552871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = (
+    ('disease_detections', 'ix_disease_detections_user_detected_at_id', ['user_id', 'detected_at', 'id']),
+    ('disease_detections', 'ix_disease_detections_user_severity_disease',
+     ['user_id', 'severity', 'disease_name', 'confidence']),
+    ('disease_detections', 'ix_disease_detections_detected_at', ['detected_at']),
+    ('disease_detections', 'ix_disease_detections_disease_name', ['disease_name']),
+    ('users', 'ix_users_region', ['region']),
+)
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for table, name, columns in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False, if_not_exists=True,
+                postgresql_concurrently=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table, name, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,42 @@
+"""detection daily rollups
+
+Daily detection counts per region, plant type, disease and severity, read by
+the analytics endpoints. New detections are added as they are written; fill
+in the existing history after upgrading with:
+    flask analytics backfill-rollups --since <first detection day>
+IF NOT EXISTS makes the upgrade safe on databases where db.create_all()
+already created the table.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 10:12:41.208316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('detection_daily_rollups',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('region', sa.String(length=50), nullable=False),
+    sa.Column('plant_type', sa.String(length=50), nullable=False),
+    sa.Column('disease_name', sa.String(length=100), nullable=False),
+    sa.Column('severity', sa.String(length=20), nullable=False),
+    sa.Column('detection_count', sa.Integer(), nullable=False),
+    sa.Column('confidence_sum', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('day', 'region', 'plant_type', 'disease_name', 'severity'),
+    if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_table('detection_daily_rollups', if_exists=True)
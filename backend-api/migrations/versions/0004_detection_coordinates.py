@@ -0,0 +1,56 @@
+"""detection coordinates
+
+latitude / longitude / geohash columns on disease_detections, parsed from
+"lat,lon" locations on write, and the (geohash, detected_at, disease_name)
+index behind the nearby and heatmap analytics. Existing rows are filled in
+after upgrading with:
+    flask analytics backfill-coordinates
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 14:03:27.719845
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Columns db.create_all() may already have added are skipped
+    existing = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('disease_detections')}
+    columns = [
+        sa.Column('latitude', sa.Float(), nullable=True),
+        sa.Column('longitude', sa.Float(), nullable=True),
+        sa.Column('geohash', sa.String(length=12), nullable=True)
+    ]
+    with op.batch_alter_table('disease_detections') as batch_op:
+        for column in columns:
+            if column.name not in existing:
+                batch_op.add_column(column)
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_disease_detections_geohash_detected_at', 'disease_detections',
+            ['geohash', 'detected_at', 'disease_name'], unique=False, if_not_exists=True,
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_disease_detections_geohash_detected_at', table_name='disease_detections',
+            if_exists=True, postgresql_concurrently=True
+        )
+
+    with op.batch_alter_table('disease_detections') as batch_op:
+        batch_op.drop_column('geohash')
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
@@ -0,0 +1,33 @@
+"""user is_admin
+
+Admin flag on users, checked by admin_required (the profiling endpoints).
+Grant it with:
+    flask users set-admin <user id>
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 16:47:09.382165
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Skipped where db.create_all() already added the column
+    if 'is_admin' in {column['name'] for column in sa.inspect(op.get_bind()).get_columns('users')}:
+        return
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('is_admin', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('is_admin')
@@ -0,0 +1,49 @@
+"""prediction jobs
+
+Queue table for the async prediction jobs (POST /predict/async), used when
+JOB_QUEUE_BACKEND is database (the default). IF NOT EXISTS makes the upgrade
+safe on databases where db.create_all() already created it.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 18:21:54.604117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('prediction_jobs',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=True),
+    sa.Column('plant_type', sa.String(length=50), nullable=False),
+    sa.Column('location', sa.String(length=100), nullable=True),
+    sa.Column('image_data', sa.LargeBinary(), nullable=True),
+    sa.Column('callback_url', sa.String(length=500), nullable=True),
+    sa.Column('callback_status', sa.String(length=50), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=True),
+    sa.Column('max_attempts', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_index('ix_prediction_jobs_status', 'prediction_jobs', ['status'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_prediction_jobs_status', table_name='prediction_jobs', if_exists=True)
+    op.drop_table('prediction_jobs')
@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import numpy as np
+import tensorflow as tf
+from sklearn.metrics import classification_report
+
+# Import utility functions from data_preprocessing.py (same directory, see train_model.py)
+from data_preprocessing import load_image_dataset, get_rescaling_layer, apply_preprocessing
+
+BASE_PATH = '/content/drive/My Drive/backend'
+DATASET_EXTRACT_PATH = '/content/dataset'
+MODEL_SAVE_PATH = os.path.join(BASE_PATH, 'ml_models', 'trained_models', 'plant_disease_model.h5')
+METRICS_SAVE_PATH = os.path.join(BASE_PATH, 'ml_models', 'trained_models', 'training_metrics.json')
+
+def predict_batched(model, dataset, num_classes):
+    """
+    Run the model over an already-preprocessed, batched dataset one full batch at a time.
+    Scores and labels are streamed into preallocated arrays sized from the dataset
+    cardinality, so there is one graph call per batch instead of one per image.
+    Returns (scores, labels, seconds spent in the model loop).
+    """
+    num_batches = int(tf.data.experimental.cardinality(dataset).numpy())
+    batch_size = int(dataset.element_spec[0].shape[0] or 0)
+    if num_batches < 0 or batch_size <= 0:
+        # Unknown size: fall back to growing in chunks
+        num_batches, batch_size = 0, 0
+
+    capacity = max(num_batches * batch_size, 1)
+    scores = np.empty((capacity, num_classes), dtype=np.float32)
+    labels = np.empty((capacity,), dtype=np.int64)
+
+    @tf.function(reduce_retracing=True)
+    def forward(images):
+        return model(images, training=False)
+
+    count = 0
+    start = time.perf_counter()
+    for images, batch_labels in dataset:
+        batch_scores = forward(images).numpy()
+        n = batch_scores.shape[0]
+        if count + n > capacity:
+            capacity = max(capacity * 2, count + n)
+            scores = np.resize(scores, (capacity, num_classes))
+            labels = np.resize(labels, (capacity,))
+        scores[count:count + n] = batch_scores
+        labels[count:count + n] = batch_labels.numpy()
+        count += n
+    elapsed = time.perf_counter() - start
+
+    return scores[:count], labels[:count], elapsed
+
+def confusion_matrix(true_labels, predicted_labels, num_classes):
+    """Confusion matrix with true classes as rows, via a single bincount"""
+    flat = true_labels * num_classes + predicted_labels
+    return np.bincount(flat, minlength=num_classes * num_classes).reshape(num_classes, num_classes)
+
+def top_k_accuracy(scores, true_labels, k):
+    """Fraction of samples whose true class is among the k highest scores"""
+    k = min(k, scores.shape[1])
+    top_k = np.argpartition(scores, -k, axis=1)[:, -k:]
+    return float(np.mean(np.any(top_k == true_labels[:, np.newaxis], axis=1)))
+
+def expected_calibration_error(scores, true_labels, num_bins=15):
+    """
+    Expected calibration error: confidence-vs-accuracy gap averaged over
+    equal-width confidence bins, weighted by the number of samples per bin
+    """
+    confidences = scores.max(axis=1)
+    correct = (scores.argmax(axis=1) == true_labels).astype(np.float64)
+
+    bins = np.minimum((confidences * num_bins).astype(np.int64), num_bins - 1)
+    counts = np.bincount(bins, minlength=num_bins)
+    confidence_sums = np.bincount(bins, weights=confidences, minlength=num_bins)
+    correct_sums = np.bincount(bins, weights=correct, minlength=num_bins)
+
+    occupied = counts > 0
+    gaps = np.abs(confidence_sums[occupied] - correct_sums[occupied])
+    return float(gaps.sum() / max(len(true_labels), 1))
+
+def evaluate_model(model, dataset, class_names, top_k=(1, 3, 5), num_bins=15):
+    """
+    Batched evaluation of a classifier on a preprocessed (already rescaled) dataset.
+    Returns a JSON-serializable dict with the classification report, confusion matrix,
+    top-k accuracy, expected calibration error and evaluation throughput.
+    """
+    num_classes = len(class_names)
+    scores, true_labels, elapsed = predict_batched(model, dataset, num_classes)
+    predicted_labels = scores.argmax(axis=1)
+
+    report = classification_report(
+        true_labels,
+        predicted_labels,
+        labels=list(range(num_classes)),
+        target_names=class_names,
+        output_dict=True,
+        zero_division=0
+    )
+
+    return {
+        'classification_report': report,
+        'confusion_matrix': confusion_matrix(true_labels, predicted_labels, num_classes).tolist(),
+        'top_k_accuracy': {f'top_{k}': top_k_accuracy(scores, true_labels, k) for k in top_k},
+        'expected_calibration_error': expected_calibration_error(scores, true_labels, num_bins),
+        'num_images': int(len(true_labels)),
+        'eval_seconds': elapsed,
+        'images_per_second': len(true_labels) / elapsed if elapsed > 0 else 0.0
+    }
+
+if __name__ == '__main__':
+    # Standalone evaluation of a saved checkpoint on the same test split as train_model.py
+    SEED = 123
+    IMAGE_SIZE = (224, 224)
+    BATCH_SIZE = 32
+
+    full_dataset = load_image_dataset(
+        DATASET_EXTRACT_PATH,
+        image_size=IMAGE_SIZE,
+        batch_size=BATCH_SIZE,
+        shuffle=True,
+        seed=SEED
+    )
+    class_names = full_dataset.class_names
+
+    DATASET_SIZE = tf.data.experimental.cardinality(full_dataset).numpy()
+    train_size = int(0.8 * DATASET_SIZE)
+    val_size = int(0.1 * DATASET_SIZE)
+    test_dataset = apply_preprocessing(full_dataset.skip(train_size + val_size), get_rescaling_layer())
+
+    model = tf.keras.models.load_model(MODEL_SAVE_PATH, compile=False)
+    evaluation = evaluate_model(model, test_dataset, class_names)
+
+    print(f"Evaluated {evaluation['num_images']} images in {evaluation['eval_seconds']:.2f}s "
+          f"({evaluation['images_per_second']:.1f} images/sec)")
+    print(f"Top-k accuracy: {evaluation['top_k_accuracy']}")
+    print(f"Expected calibration error: {evaluation['expected_calibration_error']:.4f}")
+
+    with open(METRICS_SAVE_PATH, 'w') as f:
+        json.dump(evaluation, f, indent=4)
@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import hashlib
+from datetime import datetime
+import numpy as np
+import tensorflow as tf
+
+# Import utility functions from data_preprocessing.py (same directory, see train_model.py)
+from data_preprocessing import load_image_dataset, get_rescaling_layer, apply_preprocessing
+
+BASE_PATH = '/content/drive/My Drive/backend'
+DATASET_EXTRACT_PATH = '/content/dataset'
+MODEL_SAVE_PATH = os.path.join(BASE_PATH, 'ml_models', 'trained_models', 'plant_disease_model.h5')
+METRICS_SAVE_PATH = os.path.join(BASE_PATH, 'ml_models', 'trained_models', 'training_metrics.json')
+BUNDLE_ROOT = os.path.join(BASE_PATH, 'ml_models', 'bundles')
+
+IMAGE_SIZE = (224, 224)
+# Matches get_rescaling_layer(): model input = pixel * scale + offset
+NORMALIZATION = {'scale': 1.0 / 255, 'offset': 0.0}
+DEFAULT_ARTIFACT = 'tflite_int8'
+
+def build_inference_model(model):
+    """
+    Drop the data augmentation block, which is a no-op at inference time
+    and contains random ops the TFLite converter cannot lower
+    """
+    layers = [layer for layer in model.layers if layer.name != 'data_augmentation']
+    inference_model = tf.keras.Sequential(layers, name=model.name)
+    inference_model.build((None,) + IMAGE_SIZE + (3,))
+    return inference_model
+
+def representative_dataset(dataset, num_samples=200):
+    """
+    Calibration generator for int8 quantization, yields single rescaled images
+    """
+    def generator():
+        count = 0
+        for images, _ in dataset:
+            for image in images:
+                yield [tf.cast(tf.expand_dims(image, 0), tf.float32)]
+                count += 1
+                if count >= num_samples:
+                    return
+    return generator
+
+def convert_float16(saved_model_dir):
+    """Convert a SavedModel to a float16-weight TFLite flatbuffer"""
+    converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+    return converter.convert()
+
+def convert_int8(saved_model_dir, calibration_data):
+    """
+    Convert a SavedModel to a fully int8-quantized TFLite flatbuffer
+    Input is int8 (quantized by the serving backend), output stays float32 probabilities
+    """
+    converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = calibration_data
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    return converter.convert()
+
+def measure_cpu_latency(tflite_path, runs=50, num_threads=None):
+    """
+    Median single-image CPU latency of a TFLite model in milliseconds
+    """
+    interpreter = tf.lite.Interpreter(model_path=tflite_path, num_threads=num_threads)
+    interpreter.allocate_tensors()
+    input_details = interpreter.get_input_details()[0]
+    output_details = interpreter.get_output_details()[0]
+    sample = np.zeros(input_details['shape'], dtype=input_details['dtype'])
+
+    interpreter.set_tensor(input_details['index'], sample)
+    interpreter.invoke()
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        interpreter.set_tensor(input_details['index'], sample)
+        interpreter.invoke()
+        interpreter.get_tensor(output_details['index'])
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+def measure_keras_latency(model, runs=20):
+    """Median single-image CPU latency of a Keras model in milliseconds"""
+    sample = np.zeros((1,) + IMAGE_SIZE + (3,), dtype=np.float32)
+    model(sample, training=False)
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        model(sample, training=False)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+def _file_info(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha256.update(chunk)
+    return {'size_bytes': os.path.getsize(path), 'sha256': sha256.hexdigest()}
+
+def export_bundle(model_path, class_names, calibration_dataset, bundle_root=BUNDLE_ROOT,
+                  metrics=None, version=None, num_calibration_samples=200):
+    """
+    Export the best checkpoint as a versioned model bundle:
+
+        <bundle_root>/<version>/
+            saved_model/           full-precision SavedModel
+            model_float16.tflite   float16-weight TFLite model
+            model_int8.tflite      int8 TFLite model calibrated on calibration_dataset
+            labels.txt             class names, one per line in output order
+            manifest.json          input size, normalization, metrics, latency, checksums
+        <bundle_root>/LATEST       name of the newest version
+
+    Returns the bundle directory.
+    """
+    version = version or datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+    bundle_dir = os.path.join(bundle_root, version)
+    if os.path.exists(bundle_dir):
+        raise FileExistsError(f"Bundle version already exists: {bundle_dir}")
+    os.makedirs(bundle_dir)
+
+    print(f"Exporting model bundle {version} to {bundle_dir}...")
+    model = build_inference_model(tf.keras.models.load_model(model_path, compile=False))
+
+    saved_model_dir = os.path.join(bundle_dir, 'saved_model')
+    tf.saved_model.save(model, saved_model_dir)
+
+    float16_path = os.path.join(bundle_dir, 'model_float16.tflite')
+    with open(float16_path, 'wb') as f:
+        f.write(convert_float16(saved_model_dir))
+
+    int8_path = os.path.join(bundle_dir, 'model_int8.tflite')
+    with open(int8_path, 'wb') as f:
+        f.write(convert_int8(saved_model_dir, representative_dataset(calibration_dataset, num_calibration_samples)))
+
+    labels_path = os.path.join(bundle_dir, 'labels.txt')
+    with open(labels_path, 'w') as f:
+        for class_name in class_names:
+            f.write(f"{class_name}\n")
+
+    print("Measuring CPU latency...")
+    manifest = {
+        'version': version,
+        'created_at': datetime.utcnow().isoformat(),
+        'architecture': 'MobileNetV2',
+        'input_size': list(IMAGE_SIZE) + [3],
+        'normalization': NORMALIZATION,
+        'labels_file': 'labels.txt',
+        'class_names': list(class_names),
+        'default_artifact': DEFAULT_ARTIFACT,
+        'artifacts': {
+            'saved_model': {
+                'path': 'saved_model',
+                'backend': 'keras',
+                'cpu_latency_ms': measure_keras_latency(model)
+            },
+            'tflite_float16': dict(
+                path='model_float16.tflite',
+                backend='tflite',
+                cpu_latency_ms=measure_cpu_latency(float16_path),
+                **_file_info(float16_path)
+            ),
+            'tflite_int8': dict(
+                path='model_int8.tflite',
+                backend='tflite',
+                calibration_samples=num_calibration_samples,
+                cpu_latency_ms=measure_cpu_latency(int8_path),
+                **_file_info(int8_path)
+            )
+        },
+        'metrics': metrics or {}
+    }
+
+    with open(os.path.join(bundle_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=4)
+
+    # Point LATEST at the new version only once the bundle is complete
+    latest_tmp = os.path.join(bundle_root, 'LATEST.tmp')
+    with open(latest_tmp, 'w') as f:
+        f.write(version)
+    os.replace(latest_tmp, os.path.join(bundle_root, 'LATEST'))
+
+    for name, artifact in manifest['artifacts'].items():
+        print(f"  {name}: {artifact['cpu_latency_ms']:.2f} ms/image")
+    print("Model bundle exported.")
+    return bundle_dir
+
+if __name__ == '__main__':
+    # Standalone export of an existing checkpoint, calibrated on the training images
+    SEED = 123
+    BATCH_SIZE = 32
+
+    dataset = load_image_dataset(
+        DATASET_EXTRACT_PATH,
+        image_size=IMAGE_SIZE,
+        batch_size=BATCH_SIZE,
+        shuffle=True,
+        seed=SEED
+    )
+    class_names = dataset.class_names
+    calibration_dataset = apply_preprocessing(dataset, get_rescaling_layer())
+
+    metrics = None
+    if os.path.exists(METRICS_SAVE_PATH):
+        with open(METRICS_SAVE_PATH) as f:
+            metrics = json.load(f)
+
+    export_bundle(MODEL_SAVE_PATH, class_names, calibration_dataset, metrics=metrics)
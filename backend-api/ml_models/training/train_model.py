@@ -4,12 +4,13 @@ import zipfile
 import json
 import numpy as np
 import tensorflow as tf
-from sklearn.metrics import classification_report
 
 # Import utility functions from data_preprocessing.py
 # When train_model.py is executed, its directory is automatically added to sys.path,
 # so a direct import of data_preprocessing will work.
 from data_preprocessing import unzip_dataset, load_image_dataset, get_rescaling_layer, apply_preprocessing
+from evaluate_model import evaluate_model
+from export_model import export_bundle
 
 # 3. Define the base path for your project and the dataset path
 BASE_PATH = '/content/drive/My Drive/backend'
@@ -18,6 +19,7 @@ DATASET_EXTRACT_PATH = '/content/dataset'
 MODEL_SAVE_PATH = os.path.join(BASE_PATH, 'ml_models', 'trained_models', 'plant_disease_model.h5')
 LABELS_SAVE_PATH = os.path.join(BASE_PATH, 'knowledge_base', 'disease_labels.txt')
 METRICS_SAVE_PATH = os.path.join(BASE_PATH, 'ml_models', 'trained_models', 'training_metrics.json')
+BUNDLE_ROOT = os.path.join(BASE_PATH, 'ml_models', 'bundles')
 
 if __name__ == '__main__':
     # 4. Set a reproducible random seed
@@ -155,32 +157,31 @@ if __name__ == '__main__':
     print(f"Saving class labels to {LABELS_SAVE_PATH}...")
     with open(LABELS_SAVE_PATH, 'w') as f:
         for class_name in class_names:
-            f.write(f"{class_name}
-")
+            f.write(f"{class_name}\n")
     print("Class labels saved.")
 
     # 19. Calculate and save per-class metrics
+    # Batched evaluation over the (already rescaled) test split: one model call per batch
     print("Calculating per-class metrics...")
-    # To get predictions and true labels for classification report
-    all_test_labels = []
-    all_test_predictions = []
+    evaluation = evaluate_model(model, test_dataset, class_names)
+    print(f"Evaluated {evaluation['num_images']} test images at "
+          f"{evaluation['images_per_second']:.1f} images/sec")
+    print(f"Top-k accuracy: {evaluation['top_k_accuracy']}, "
+          f"ECE: {evaluation['expected_calibration_error']:.4f}")
 
-    for images, labels in test_dataset.unbatch():
-        all_test_labels.append(labels.numpy())
-        # Expand dimensions to mimic batch size 1 for prediction
-        # Ensure the image is preprocessed before prediction, similar to model input
-        preprocessed_image = rescale_layer(tf.expand_dims(images, 0))
-        pred = model.predict(preprocessed_image, verbose=0)
-        all_test_predictions.append(np.argmax(pred, axis=1)[0])
-
-    true_labels = np.array(all_test_labels)
-    predicted_labels = np.array(all_test_predictions)
-
-    report = classification_report(true_labels, predicted_labels, target_names=class_names, output_dict=True)
-
-    print(f"Saving training metrics to {METRICS_SAVE_SAVE_PATH}...")
+    print(f"Saving training metrics to {METRICS_SAVE_PATH}...")
     with open(METRICS_SAVE_PATH, 'w') as f:
-        json.dump(report, f, indent=4)
+        json.dump(evaluation, f, indent=4)
     print("Training metrics saved.")
 
+    # 20. Export the best checkpoint as a versioned serving bundle
+    # (SavedModel + float16/int8 TFLite + labels + manifest), calibrated on training images
+    export_bundle(
+        MODEL_SAVE_PATH,
+        class_names,
+        train_dataset,
+        bundle_root=BUNDLE_ROOT,
+        metrics=evaluation
+    )
+
     print("Model training and evaluation complete.")
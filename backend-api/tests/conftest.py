@@ -0,0 +1,119 @@
+# backend-api/tests/conftest.py
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, BACKEND_DIR)
+
+
+@contextmanager
+def migrated_app(database_url):
+    """An app context on a database migrated to head with flask db upgrade"""
+    import flask_migrate
+    from flask import Flask
+    from app.services.database import MIGRATIONS_DIR, db, migrate
+
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=database_url, SQLALCHEMY_TRACK_MODIFICATIONS=False)
+    db.init_app(app)
+    migrate.init_app(app, db, directory=MIGRATIONS_DIR)
+    with app.app_context():
+        flask_migrate.upgrade()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def sqlite_app(tmp_path):
+    with migrated_app(f"sqlite:///{tmp_path / 'test.db'}") as app:
+        yield app
+
+
+@pytest.fixture
+def app(tmp_path):
+    """The full application (mock predictions, in-memory job queue) on a migrated SQLite database"""
+    import flask_migrate
+    from app import create_app
+    from app.config import Config
+    from app.routes.prediction import near_duplicates, prediction_cache
+    from app.services.database import db
+    from app.services.rate_limiter import LocalBucketStore, rate_limiter
+    from app.services.response_cache import response_cache
+
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'app.db'}"
+        MODEL_WARMUP = 'off'
+        JOB_QUEUE_BACKEND = 'memory'
+        WRITE_BUFFER_ENABLED = False
+        WRITE_BUFFER_JOURNAL_DIR = str(tmp_path / 'journal')
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        flask_migrate.upgrade()
+
+    # Process-wide caches and buckets outlive a test's database
+    prediction_cache.invalidate()
+    near_duplicates.clear()
+    response_cache.entries.clear()
+    rate_limiter.store = LocalBucketStore()
+    yield app
+    with app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def jpeg(seed=0, size=256, quality=90):
+    """JPEG bytes of a random image; the same seed at another quality is a near duplicate"""
+    import io
+    import numpy as np
+    from PIL import Image
+
+    pixels = np.random.default_rng(seed).integers(0, 256, size=(size // 16, size // 16, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).resize((size, size), Image.BILINEAR).save(buffer, 'JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def create_user(app, region='Central', **fields):
+    """A committed user; returns (user id, bearer token headers)"""
+    import uuid
+    from app.models.user_model import User
+    from app.services.database import db
+    from app.utils.auth import generate_token
+
+    user_id = str(uuid.uuid4())
+    with app.app_context():
+        db.session.add(User(id=user_id, name='Test Farmer', email=f'{user_id}@example.com', region=region, **fields))
+        db.session.commit()
+        token = generate_token(user_id)
+    return user_id, {'Authorization': f'Bearer {token}'}
+
+
+def add_user(user_id, region='Central'):
+    """A committed user with a chosen id, in the current app context"""
+    from app.services.database import db
+    from app.models.user_model import User
+
+    db.session.add(User(id=user_id, name=user_id, email=f'{user_id}@example.com', region=region))
+    db.session.commit()
+
+
+def detection(user_id, disease_name='Common Rust', detected_at=None, **fields):
+    """A row for DatabaseService.insert_detections"""
+    return dict({
+        'user_id': user_id,
+        'plant_type': 'maize',
+        'disease_name': disease_name,
+        'confidence': 0.8,
+        'severity': 'Medium',
+        'detected_at': detected_at or datetime.utcnow()
+    }, **fields)
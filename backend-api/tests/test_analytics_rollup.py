@@ -0,0 +1,102 @@
+# backend-api/tests/test_analytics_rollup.py
+"""Daily rollups kept by the detection writes, and the trends read from them"""
+from datetime import datetime, timedelta
+
+from app.services.analytics_rollup import TREND_PLANT_TYPES
+from conftest import add_user, detection
+
+
+def test_trends_include_every_plant_type(sqlite_app):
+    from app.services.analytics_rollup import disease_trends
+    from app.services.database import db, DatabaseService
+
+    add_user('trend-user')
+    DatabaseService.insert_detections([detection('trend-user'), detection('trend-user')])
+
+    trends, summary, start_day, end_day = disease_trends(db.session, 7)
+    assert len(trends) == 7 and trends[-1]['date'] == end_day.isoformat()
+    assert set(summary) == set(TREND_PLANT_TYPES)
+    for point in trends:
+        for plant in TREND_PLANT_TYPES:
+            assert {f'{plant}_diseases', f'{plant}_diseases_avg', f'{plant}_diseases_z'} <= set(point)
+    assert trends[-1]['maize_diseases'] == 2
+    assert trends[-1]['coffee_diseases'] == 0
+
+
+def test_trends_on_empty_database(sqlite_app):
+    from app.services.analytics_rollup import disease_trends
+    from app.services.database import db
+
+    trends, summary, _, _ = disease_trends(db.session, 3)
+    assert set(summary) == set(TREND_PLANT_TYPES)
+    assert all(point[f'{plant}_diseases'] == 0 for point in trends for plant in TREND_PLANT_TYPES)
+
+
+def rollup_rows():
+    from app.models.analytics_model import DetectionDailyRollup
+    from app.services.analytics_rollup import ROLLUP_KEY
+    from app.services.database import db
+
+    table = DetectionDailyRollup.__table__
+    return {
+        tuple(row[:len(ROLLUP_KEY)]): (row.detection_count, round(row.confidence_sum, 6))
+        for row in db.session.execute(db.select(
+            *[table.c[column] for column in ROLLUP_KEY], table.c.detection_count, table.c.confidence_sum
+        )).all()
+    }
+
+
+def test_writes_increment_existing_rollup_rows(sqlite_app):
+    from app.services.database import DatabaseService
+
+    add_user('rollup-user', region='Western')
+    day = datetime(2026, 5, 4, 9)
+    DatabaseService.insert_detections([detection('rollup-user', detected_at=day, confidence=0.5)])
+    DatabaseService.insert_detections([
+        detection('rollup-user', detected_at=day + timedelta(hours=3), confidence=0.7),
+        detection('rollup-user', 'Healthy', detected_at=day, severity='Low', confidence=0.9)
+    ])
+
+    assert rollup_rows() == {
+        (day.date(), 'Western', 'maize', 'Common Rust', 'Medium'): (2, 1.2),
+        (day.date(), 'Western', 'maize', 'Healthy', 'Low'): (1, 0.9)
+    }
+
+
+def test_backfill_matches_incremental_rollups(sqlite_app):
+    from app.services.analytics_rollup import backfill_rollups
+    from app.services.database import db, DatabaseService
+
+    add_user('backfill-user', region='Coast')
+    start = datetime(2026, 5, 1, 12)
+    DatabaseService.insert_detections([
+        detection('backfill-user', ['Common Rust', 'Healthy'][i % 2], start + timedelta(hours=7 * i))
+        for i in range(20)
+    ])
+    incremental = rollup_rows()
+
+    written = backfill_rollups(db.session, start.date(), (start + timedelta(days=7)).date(), chunk_days=2)
+    assert written == len(incremental)
+    assert rollup_rows() == incremental
+
+
+def test_upsert_without_on_conflict_support(sqlite_app):
+    """Dialects without INSERT .. ON CONFLICT update, then insert the missing keys"""
+    from types import SimpleNamespace
+    from app.services.analytics_rollup import upsert_rollups
+    from app.services.database import db
+
+    class OtherDialectSession:
+        def get_bind(self):
+            return SimpleNamespace(dialect=SimpleNamespace(name='mssql'))
+
+        def execute(self, *args, **kwargs):
+            return db.session.execute(*args, **kwargs)
+
+    key = (datetime(2026, 5, 4).date(), 'Central', 'maize', 'Common Rust', 'High')
+    other_key = (datetime(2026, 5, 5).date(), 'Central', 'maize', 'Common Rust', 'High')
+    upsert_rollups(OtherDialectSession(), {key: (1, 0.5)})
+    upsert_rollups(OtherDialectSession(), {key: (2, 1.0), other_key: (1, 0.25)})
+    db.session.commit()
+
+    assert rollup_rows() == {key: (3, 1.5), other_key: (1, 0.25)}
@@ -0,0 +1,110 @@
+# backend-api/tests/test_detection_export.py
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+
+def seed_detections(count=250):
+    from app.services.database import db, DatabaseService
+    from app.models.user_model import User
+
+    db.session.add_all([
+        User(id='export-a', name='a', email='a@example.com', region='Central'),
+        User(id='export-b', name='b', email='b@example.com', region='Rift Valley')
+    ])
+    db.session.commit()
+    start = datetime(2026, 1, 1)
+    DatabaseService.insert_detections([{
+        'user_id': 'export-a' if i % 2 else 'export-b',
+        'plant_type': 'maize',
+        'disease_name': ['Common Rust', 'Gray Leaf Spot', 'Healthy'][i % 3],
+        'confidence': 0.5 + (i % 50) / 100,
+        'severity': ['Low', 'Medium', 'High'][i % 3],
+        'location': '-1.29,36.82' if i % 5 == 0 else None,
+        'detected_at': start + timedelta(hours=i)
+    } for i in range(count)])
+    return start
+
+
+@pytest.mark.parametrize('file_format', ['parquet', 'arrow'])
+def test_export_round_trip(sqlite_app, tmp_path, file_format):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+    from app.services.database import db
+    from app.services.detection_export import EXPORT_COLUMNS, write_detection_export
+
+    start = seed_detections(250)
+    path = tmp_path / f'detections.{file_format}'
+    with db.engine.connect() as connection:
+        rows = write_detection_export(connection, str(path), file_format=file_format, chunk_rows=100)
+    assert rows == 250
+
+    if file_format == 'parquet':
+        parquet = pq.ParquetFile(str(path))
+        assert parquet.metadata.num_row_groups == 3
+        table = parquet.read()
+    else:
+        table = pa.ipc.open_file(str(path)).read_all()
+
+    assert table.column_names == [name for name, _ in EXPORT_COLUMNS]
+    assert table.num_rows == 250
+    assert pa.types.is_dictionary(table.schema.field('disease_name').type)
+    assert set(table.column('region').to_pylist()) == {'Central', 'Rift Valley'}
+    detected_at = table.column('detected_at').to_pylist()
+    assert detected_at == sorted(detected_at) and detected_at[0] == start
+
+
+def test_arrow_export_with_dictionary_deltas(sqlite_app, tmp_path):
+    """Values first seen in a later batch extend the dictionary with a delta batch"""
+    pa = pytest.importorskip('pyarrow')
+    from app.services.database import db, DatabaseService
+    from app.services.detection_export import write_detection_export
+
+    start = seed_detections(0)
+    diseases = ['Healthy'] * 3 + ['Common Rust', 'Healthy', 'Gray Leaf Spot'] + ['Maize Lethal Necrosis'] * 2
+    DatabaseService.insert_detections([{
+        'user_id': 'export-a' if i < 3 else 'export-b',
+        'plant_type': 'maize',
+        'disease_name': disease,
+        'confidence': 0.9,
+        'severity': 'Low',
+        'detected_at': start + timedelta(hours=i)
+    } for i, disease in enumerate(diseases)])
+
+    path = tmp_path / 'deltas.arrow'
+    with db.engine.connect() as connection:
+        assert write_detection_export(connection, str(path), file_format='arrow', chunk_rows=3) == len(diseases)
+
+    reader = pa.ipc.open_file(str(path))
+    assert reader.num_record_batches == 3
+    batches = [reader.get_batch(i).column('disease_name').to_pylist() for i in range(reader.num_record_batches)]
+    assert batches == [diseases[0:3], diseases[3:6], diseases[6:]]
+    assert reader.read_all().column('disease_name').to_pylist() == diseases
+    assert reader.read_all().column('region').to_pylist() == ['Central'] * 3 + ['Rift Valley'] * 5
+
+
+def test_export_date_range(sqlite_app, tmp_path):
+    pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+    from app.services.database import db
+    from app.services.detection_export import write_detection_export
+
+    start = seed_detections(250)
+    path = tmp_path / 'range.parquet'
+    with db.engine.connect() as connection:
+        rows = write_detection_export(
+            connection, str(path), since=start + timedelta(hours=10), until=start + timedelta(hours=20)
+        )
+    assert rows == 10
+    assert pq.read_table(str(path)).num_rows == 10
+
+
+def test_export_without_pyarrow(sqlite_app, tmp_path, monkeypatch):
+    from app.services.database import db
+    from app.services.detection_export import write_detection_export
+
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    with db.engine.connect() as connection:
+        with pytest.raises(RuntimeError, match='pyarrow'):
+            write_detection_export(connection, str(tmp_path / 'detections.parquet'))
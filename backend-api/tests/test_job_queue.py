@@ -0,0 +1,53 @@
+# backend-api/tests/test_job_queue.py
+"""Async prediction jobs refuse callback URLs that point at the server or its network"""
+import io
+
+import pytest
+
+from app.services.job_queue import CallbackURLError, check_callback_url
+from conftest import jpeg
+
+
+@pytest.mark.parametrize('url', [
+    'http://127.0.0.1:5000/api/v1/admin',
+    'http://localhost/',
+    'http://10.0.0.5/hook',
+    'http://192.168.1.1/',
+    'http://169.254.169.254/latest/meta-data/',
+    'http://[::1]/',
+    'http://[::ffff:10.0.0.1]/',
+    'http://0.0.0.0/',
+    'ftp://93.184.216.34/',
+    'file:///etc/passwd',
+    'http:///no-host'
+])
+def test_internal_callback_urls_are_refused(url):
+    with pytest.raises(CallbackURLError):
+        check_callback_url(url)
+
+
+def test_public_callback_url_is_accepted():
+    check_callback_url('https://93.184.216.34/hooks/detections')
+
+
+def test_allowed_hosts_restrict_callbacks():
+    with pytest.raises(CallbackURLError, match='not allowed'):
+        check_callback_url('https://93.184.216.34/', allowed_hosts=('hooks.example.com',))
+
+
+def test_async_predict_rejects_internal_callback(client):
+    from app.routes.prediction import job_queue
+
+    submitted = job_queue.metrics.snapshot()['submitted']
+    response = client.post(
+        '/api/v1/predict?async=true',
+        data={
+            'image': (io.BytesIO(jpeg(seed=21)), 'leaf.jpg'),
+            'plant_type': 'maize',
+            'callback_url': 'http://169.254.169.254/latest/meta-data/'
+        },
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 400
+    assert 'callback_url' in response.get_json()['error']
+    assert job_queue.metrics.snapshot()['submitted'] == submitted
@@ -0,0 +1,104 @@
+# backend-api/tests/test_metrics.py
+"""/metrics rendering, per process and summed over worker processes"""
+import multiprocessing
+
+import pytest
+
+from app.utils.metrics import MetricsRegistry
+
+
+def worker_registry(directory):
+    """A registry with the same metric definitions in every (simulated) worker"""
+    registry = MetricsRegistry(multiprocess_dir=str(directory), snapshot_interval=60)
+    requests = registry.counter('requests', 'Requests', ['route'])
+    latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    queued = registry.gauge('queued', 'Queued', multiprocess_mode='sum')
+    version = registry.gauge('version', 'Version', multiprocess_mode='max')
+    return registry, requests, latency, queued, version
+
+
+def sample(text, line_start):
+    """Value of the exposition line starting with line_start"""
+    for line in text.splitlines():
+        if line.startswith(line_start + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    raise AssertionError(f'{line_start} not in:\n{text}')
+
+
+def test_single_process_render():
+    registry = MetricsRegistry()
+    registry.counter('hits', 'Hits', ['kind']).labels('a').inc(2)
+    registry.histogram('seconds', 'Seconds', buckets=(0.1, 1.0)).observe(0.5)
+    text = registry.render()
+    assert sample(text, 'hits_total{kind="a"}') == 2
+    assert sample(text, 'seconds_bucket{le="0.1"}') == 0
+    assert sample(text, 'seconds_bucket{le="1.0"}') == 1
+    assert sample(text, 'seconds_count') == 1
+
+
+def test_workers_are_summed(tmp_path):
+    a, a_requests, a_latency, a_queued, a_version = worker_registry(tmp_path)
+    b, b_requests, b_latency, b_queued, b_version = worker_registry(tmp_path)
+    a_requests.labels('/predict').inc(3)
+    b_requests.labels('/predict').inc(4)
+    a_latency.observe(0.05)
+    b_latency.observe(0.5)
+    a_queued.set(2)
+    b_queued.set(5)
+    a_version.set(7)
+    b_version.set(9)
+    b.write_snapshot()
+
+    text = a.render()
+    assert sample(text, 'requests_total{route="/predict"}') == 7
+    assert sample(text, 'latency_seconds_bucket{le="0.1"}') == 1
+    assert sample(text, 'latency_seconds_count') == 2
+    assert sample(text, 'queued') == 7
+    assert sample(text, 'version') == 9
+
+
+def test_exited_workers_keep_counting_but_drop_their_gauges(tmp_path):
+    a, a_requests, _, a_queued, _ = worker_registry(tmp_path)
+    b, b_requests, _, b_queued, _ = worker_registry(tmp_path)
+    a_requests.labels('/predict').inc(1)
+    b_requests.labels('/predict').inc(10)
+    a_queued.set(1)
+    b_queued.set(100)
+    b.write_snapshot()
+    b.close()
+
+    for _ in range(2):  # archived once, not again on the next scrape
+        text = a.render()
+        assert sample(text, 'requests_total{route="/predict"}') == 11
+        assert sample(text, 'queued') == 1
+
+
+def _forked_worker():
+    registry, requests, _, _, _ = _parent[0]
+    registry.start()  # zeroes the values inherited from the parent
+    requests.labels('/predict').inc(5)
+    registry.close()
+
+
+_parent = []  # the parent's registry, inherited by the forked worker
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='needs fork')
+def test_forked_worker_does_not_repeat_the_parents_values(tmp_path):
+    parent = worker_registry(tmp_path)
+    _parent[:] = [parent]
+    registry, requests = parent[0], parent[1]
+    requests.labels('/predict').inc(2)
+    registry.write_snapshot(collect=False)
+
+    process = multiprocessing.get_context('fork').Process(target=_forked_worker)
+    process.start()
+    process.join(30)
+    assert process.exitcode == 0
+    assert sample(registry.render(), 'requests_total{route="/predict"}') == 7
+
+
+def test_metrics_endpoint(client):
+    text = client.get('/metrics').get_data(as_text=True)
+    assert '# TYPE mkulima_stage_seconds histogram' in text
+    assert '# TYPE mkulima_inference_inflight gauge' in text
@@ -0,0 +1,90 @@
+# backend-api/tests/test_micro_batcher.py
+"""MicroBatcher: fused batches, per-class deadlines and load shedding by priority"""
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.services.ai_predictor import InferenceShedError, MicroBatcher
+
+
+class GatedModel:
+    """Model whose calls block until released; output row i is the mean of image i"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.batch_sizes = []
+
+    def __call__(self, batch):
+        self.batch_sizes.append(len(batch))
+        self.started.set()
+        assert self.release.wait(5)
+        return batch.reshape(len(batch), -1).mean(axis=1, keepdims=True)
+
+
+def image(value):
+    return np.full((2, 2, 3), value, dtype=np.float32)
+
+
+@pytest.fixture
+def model():
+    model = GatedModel()
+    yield model
+    model.release.set()
+
+
+def busy_batcher(model, **options):
+    """An 'always' batcher whose worker is stuck in a model call, so new work queues"""
+    batcher = MicroBatcher(model, max_batch_size=8, max_wait_ms=0, mode='always', **options)
+    first = batcher.submit(image(0))
+    assert model.started.wait(5)
+    return batcher, first
+
+
+def test_queued_requests_run_as_one_batch(model):
+    batcher, first = busy_batcher(model)
+    futures = [batcher.submit(image(value)) for value in (1, 2, 3)]
+    model.release.set()
+
+    assert first.result(5)[0] == 0
+    assert [future.result(5)[0] for future in futures] == [1, 2, 3]
+    assert model.batch_sizes == [1, 3]
+    batcher.stop(5)
+
+
+def test_work_past_its_deadline_is_shed(model):
+    batcher, _ = busy_batcher(model, deadlines_ms={'background': 20})
+    late = batcher.submit(image(1), priority='background')
+    on_time = batcher.submit(image(2), priority='interactive')
+    time.sleep(0.05)
+    model.release.set()
+
+    with pytest.raises(InferenceShedError) as shed:
+        late.result(5)
+    assert shed.value.reason == 'expired'
+    assert on_time.result(5)[0] == 2
+    assert batcher.metrics.snapshot()['classes']['background']['shed_expired'] == 1
+    batcher.stop(5)
+
+
+def test_full_queue_sheds_the_newest_lower_priority_work(model):
+    batcher, _ = busy_batcher(model, max_queued_images=2)
+    older = batcher.submit(image(1), priority='background')
+    newer = batcher.submit(image(2), priority='background')
+    premium = batcher.submit(image(3), priority='premium')
+
+    with pytest.raises(InferenceShedError) as shed:
+        newer.result(5)
+    assert shed.value.reason == 'overload' and shed.value.retry_after >= 1
+
+    # Nothing queued ranks below background, so the new work is refused itself
+    refused = batcher.submit(image(4), priority='background')
+    with pytest.raises(InferenceShedError):
+        refused.result(5)
+
+    model.release.set()
+    assert premium.result(5)[0] == 3 and older.result(5)[0] == 1
+    assert batcher.queue_depths() == ({'premium': 0, 'interactive': 0, 'background': 0}, 0)
+    batcher.stop(5)
@@ -0,0 +1,67 @@
+# backend-api/tests/test_migrations.py
+"""
+The schema comes from the Alembic migrations only: create_app() creates no
+tables, 0001 is the pre-migration schema and head matches the models.
+"""
+import flask_migrate
+import sqlalchemy as sa
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+
+from conftest import migrated_app
+
+
+def test_create_app_creates_no_tables(tmp_path):
+    from app import create_app
+    from app.config import Config
+    from app.services.database import db
+
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'empty.db'}"
+        MODEL_WARMUP = 'off'
+        JOB_QUEUE_BACKEND = 'memory'
+        WRITE_BUFFER_ENABLED = False
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        assert sa.inspect(db.engine).get_table_names() == []
+
+
+def test_head_schema_matches_models(sqlite_app):
+    from app.services.database import db
+
+    with db.engine.connect() as connection:
+        diff = compare_metadata(MigrationContext.configure(connection), db.metadata)
+    assert diff == []
+
+
+def test_initial_revision_is_pre_migration_schema(sqlite_app):
+    from app.services.database import db
+
+    flask_migrate.downgrade(revision='0001')
+    inspector = sa.inspect(db.engine)
+    assert set(inspector.get_table_names()) == {'alembic_version', 'plants', 'users', 'disease_detections'}
+    assert 'is_admin' not in {column['name'] for column in inspector.get_columns('users')}
+    assert inspector.get_indexes('disease_detections') == []
+
+    flask_migrate.upgrade()
+    assert 'prediction_jobs' in sa.inspect(db.engine).get_table_names()
+
+
+def test_upgrade_over_tables_created_by_create_all(tmp_path):
+    """Databases whose head tables were built by db.create_all() before it was removed"""
+    from flask import Flask
+    from app.services.database import MIGRATIONS_DIR, db, migrate
+
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'legacy.db'}", SQLALCHEMY_TRACK_MODIFICATIONS=False)
+    db.init_app(app)
+    migrate.init_app(app, db, directory=MIGRATIONS_DIR)
+    with app.app_context():
+        db.create_all()
+        flask_migrate.stamp(revision='0002')
+        flask_migrate.upgrade()
+        with db.engine.connect() as connection:
+            assert compare_metadata(MigrationContext.configure(connection), db.metadata) == []
+            assert connection.exec_driver_sql('SELECT version_num FROM alembic_version').scalar() == '0006'
+        db.session.remove()
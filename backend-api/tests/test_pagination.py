@@ -0,0 +1,60 @@
+# backend-api/tests/test_pagination.py
+"""Keyset pagination of /users/<id>/detections: stable cursors, ties broken by id"""
+from datetime import datetime, timedelta
+
+from conftest import create_user, detection
+
+
+def seed(app, user_id, count=10):
+    """Detections in pairs sharing a detected_at, so the id tie-break is exercised"""
+    from app.services.database import DatabaseService
+
+    start = datetime(2026, 3, 1)
+    with app.app_context():
+        DatabaseService.insert_detections([
+            detection(user_id, detected_at=start + timedelta(hours=i // 2), id=f'{user_id}-{i:02d}')
+            for i in range(count)
+        ])
+
+
+def page(client, user_id, cursor=None, limit=3):
+    query = {'limit': limit, **({'cursor': cursor} if cursor else {})}
+    return client.get(f'/api/v1/users/{user_id}/detections', query_string=query)
+
+
+def test_pages_cover_every_detection_once_in_order(app, client):
+    user_id, _ = create_user(app)
+    seed(app, user_id)
+
+    ids, cursor, pages = [], None, 0
+    while True:
+        body = page(client, user_id, cursor).get_json()
+        ids += [detection['id'] for detection in body['detections']]
+        pages += 1
+        cursor = body['pagination']['next_cursor']
+        if not body['pagination']['has_more']:
+            assert cursor is None
+            break
+
+    assert pages == 4
+    assert ids == [f'{user_id}-{i:02d}' for i in reversed(range(10))]
+
+
+def test_cursor_is_unaffected_by_newer_writes(app, client):
+    from app.services.database import DatabaseService
+
+    user_id, _ = create_user(app)
+    seed(app, user_id)
+    first = page(client, user_id).get_json()
+    with app.app_context():
+        DatabaseService.insert_detections([detection(user_id, detected_at=datetime(2026, 4, 1), id=f'{user_id}-new')])
+
+    second = page(client, user_id, first['pagination']['next_cursor']).get_json()
+    assert [detection['id'] for detection in second['detections']] == [f'{user_id}-{i:02d}' for i in (6, 5, 4)]
+
+
+def test_malformed_cursor_is_a_client_error(app, client):
+    user_id, _ = create_user(app)
+    response = page(client, user_id, cursor='not-a-cursor')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid cursor'
@@ -0,0 +1,60 @@
+# backend-api/tests/test_prediction_cache.py
+"""Exact-content prediction cache and the per-user near-duplicate index on /predict"""
+import io
+
+from conftest import create_user, jpeg
+
+
+def predict(client, data, headers=None, plant_type='maize'):
+    response = client.post(
+        '/api/v1/predict',
+        data={'image': (io.BytesIO(data), 'leaf.jpg'), 'plant_type': plant_type},
+        content_type='multipart/form-data',
+        headers=headers or {}
+    )
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def test_exact_resubmission_is_served_from_cache(client):
+    first = predict(client, jpeg(seed=1))
+    again = predict(client, jpeg(seed=1))
+    assert (first['cached'], again['cached']) == (False, True)
+    assert again['disease'] == first['disease']
+    assert again['detection_id'] != first['detection_id']
+
+
+def test_cache_is_keyed_on_plant_type(client):
+    predict(client, jpeg(seed=2), plant_type='maize')
+    assert predict(client, jpeg(seed=2), plant_type='coffee')['cached'] is False
+
+
+def test_near_duplicate_reuses_the_users_prediction(app, client):
+    _, headers = create_user(app)
+    first = predict(client, jpeg(seed=3, quality=90), headers)
+    burst = predict(client, jpeg(seed=3, quality=70), headers)
+    assert first['near_duplicate'] is False
+    assert burst['near_duplicate'] is True and burst['cached'] is False
+    assert burst['disease'] == first['disease']
+
+
+def test_near_duplicate_result_is_not_cached_under_the_new_image(app, client):
+    _, headers = create_user(app)
+    predict(client, jpeg(seed=4, quality=90), headers)
+    assert predict(client, jpeg(seed=4, quality=70), headers)['near_duplicate'] is True
+
+    # The same bytes from anyone else are run through the model, not handed the match
+    other = predict(client, jpeg(seed=4, quality=70))
+    assert (other['cached'], other['near_duplicate']) == (False, False)
+
+
+def test_near_duplicates_are_per_user(app, client):
+    _, alice = create_user(app)
+    _, bob = create_user(app)
+    predict(client, jpeg(seed=5, quality=90), alice)
+    assert predict(client, jpeg(seed=5, quality=70), bob)['near_duplicate'] is False
+
+
+def test_anonymous_uploads_skip_near_duplicates(client):
+    predict(client, jpeg(seed=6, quality=90))
+    assert predict(client, jpeg(seed=6, quality=70))['near_duplicate'] is False
@@ -0,0 +1,36 @@
+# backend-api/tests/test_prediction_errors.py
+"""Corrupt images are client errors on /predict and per-item errors on /predict/batch"""
+import io
+
+from conftest import jpeg
+
+
+def truncated_jpeg():
+    """Valid header and dimensions, but the scan data stops halfway"""
+    data = jpeg(seed=7)
+    return data[:len(data) // 2]
+
+
+def test_predict_rejects_corrupt_pixel_data(client):
+    response = client.post(
+        '/api/v1/predict',
+        data={'image': (io.BytesIO(truncated_jpeg()), 'leaf.jpg'), 'plant_type': 'maize'},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Image processing failed')
+
+
+def test_batch_fails_only_the_corrupt_item(client):
+    response = client.post(
+        '/api/v1/predict/batch',
+        data={
+            'images': [(io.BytesIO(jpeg(seed=8)), 'a.jpg'), (io.BytesIO(truncated_jpeg()), 'b.jpg')],
+            'plant_type': 'maize'
+        },
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 200
+    first, second = response.get_json()['results']
+    assert first['success'] is True
+    assert second['success'] is False and second['error'].startswith('Image processing failed')
@@ -0,0 +1,86 @@
+# backend-api/tests/test_rate_limiter.py
+"""Token-bucket admission: 429 with Retry-After, per-image charging of batches"""
+import io
+
+import pytest
+
+from conftest import create_user, jpeg
+
+
+@pytest.fixture
+def limiter(app, monkeypatch):
+    """The app's rate limiter with a 3-token IP burst and no refill to speak of"""
+    from app.services.rate_limiter import rate_limiter
+
+    monkeypatch.setattr(rate_limiter, 'enabled', True)
+    monkeypatch.setattr(rate_limiter, 'limits', {'ip': (0.6, 3), 'user': (0.6, 3)})
+    monkeypatch.setattr(rate_limiter, 'costs', {'inference': 1, 'read': 0.1})
+    return rate_limiter
+
+
+def predict(client, data, headers=None):
+    return client.post(
+        '/api/v1/predict',
+        data={'image': (io.BytesIO(data), 'leaf.jpg')},
+        content_type='multipart/form-data',
+        headers=headers or {}
+    )
+
+
+def test_predict_is_limited_with_retry_after(client, limiter):
+    statuses = [predict(client, jpeg(seed=i)).status_code for i in range(4)]
+    assert statuses == [200, 200, 200, 429]
+
+    response = predict(client, jpeg(seed=9))
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert response.get_json()['success'] is False
+
+
+def test_reads_have_their_own_buckets(client, limiter):
+    for i in range(3):
+        predict(client, jpeg(seed=i))
+    assert predict(client, jpeg(seed=3)).status_code == 429
+    assert client.get('/api/v1/plants').status_code == 200
+
+
+def test_forwarded_client_addresses_get_their_own_buckets(client, limiter):
+    for i in range(3):
+        predict(client, jpeg(seed=i), {'X-Forwarded-For': '203.0.113.1'})
+    assert predict(client, jpeg(seed=3), {'X-Forwarded-For': '203.0.113.1'}).status_code == 429
+    assert predict(client, jpeg(seed=4), {'X-Forwarded-For': '203.0.113.2'}).status_code == 200
+
+
+def test_user_buckets_come_from_the_bearer_token(app, client, limiter, monkeypatch):
+    monkeypatch.setattr(limiter, 'limits', {'user': (0.6, 2)})
+    _, alice = create_user(app)
+    _, bob = create_user(app)
+    assert [predict(client, jpeg(seed=i), alice).status_code for i in range(3)] == [200, 200, 429]
+    assert predict(client, jpeg(seed=5), bob).status_code == 200
+
+
+def test_batch_pays_per_image(client, limiter):
+    response = client.post(
+        '/api/v1/predict/batch',
+        data={'images': [(io.BytesIO(jpeg(seed=i)), f'leaf{i}.jpg') for i in range(5)]},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [result['success'] for result in results] == [True, True, True, False, False]
+    assert results[3]['error'].startswith('Rate limit exceeded')
+    assert int(response.headers['Retry-After']) >= 1
+
+    # The budget is spent, so the next batch is refused before its images are read
+    assert client.post(
+        '/api/v1/predict/batch',
+        data={'images': [(io.BytesIO(jpeg(seed=7)), 'leaf.jpg')]},
+        content_type='multipart/form-data'
+    ).status_code == 429
+
+
+def test_cost_above_burst_is_rejected():
+    from app.services.rate_limiter import LocalBucketStore, RateLimiter
+
+    with pytest.raises(ValueError, match='exceeds the ip burst'):
+        RateLimiter(LocalBucketStore(), limits={'ip': (60, 5)}, costs={'inference': 10})
@@ -0,0 +1,34 @@
+# backend-api/tests/test_response_cache.py
+"""Cached GET responses carry a strong ETag; a matching If-None-Match gets an empty 304"""
+
+
+def test_matching_etag_gets_not_modified(client):
+    first = client.get('/api/v1/plants')
+    assert first.status_code == 200 and first.headers['Cache-Control'] == 'public, max-age=3600'
+    etag = first.headers['ETag']
+
+    again = client.get('/api/v1/plants', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.get_data() == b''
+    assert again.headers['ETag'] == etag
+    assert again.headers['Cache-Control'] == 'public, max-age=3600'
+
+    weak = client.get('/api/v1/plants', headers={'If-None-Match': f'W/{etag}'})
+    assert weak.status_code == 304
+
+
+def test_stale_etag_gets_the_body(client):
+    first = client.get('/api/v1/plants')
+    stale = client.get('/api/v1/plants', headers={'If-None-Match': '"0123456789abcdef"'})
+    assert stale.status_code == 200
+    assert stale.get_data() == first.get_data()
+    assert stale.headers['ETag'] == first.headers['ETag']
+
+
+def test_etag_is_a_content_hash_across_invalidation(client):
+    from app.services.response_cache import response_cache
+
+    etag = client.get('/api/v1/plants').headers['ETag']
+    response_cache.invalidate('model')
+    # The view runs again, but identical bytes keep the validator, so clients still get a 304
+    assert client.get('/api/v1/plants', headers={'If-None-Match': etag}).status_code == 304
@@ -0,0 +1,47 @@
+# backend-api/tests/test_spatial_queries.py
+"""Nearby detections: exact great-circle radius, nearest first, bounded candidate fetch"""
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from conftest import add_user, detection
+
+CENTER = (-0.30, 36.07)
+
+
+def seed_ring(user_id, count=40):
+    """Detections at 1..count km due east of CENTER, plus one far away"""
+    from app.services.database import DatabaseService
+
+    km_per_degree = 111.195 * np.cos(np.radians(CENTER[0]))
+    DatabaseService.insert_detections([
+        detection(user_id, latitude=CENTER[0], longitude=CENTER[1] + km / km_per_degree)
+        for km in range(1, count + 1)
+    ] + [detection(user_id, 'Healthy', latitude=1.5, longitude=37.0)])
+
+
+def test_nearby_is_exact_and_nearest_first(sqlite_app):
+    from app.services.database import db
+    from app.services.spatial_queries import nearby_detections
+
+    add_user('nearby-user')
+    seed_ring('nearby-user')
+    since = datetime.utcnow() - timedelta(days=1)
+
+    nearby = nearby_detections(db.session, *CENTER, 10.5, since, limit=3)
+    assert nearby['total'] == 10 and nearby['by_disease'] == {'Common Rust': 10}
+    assert [round(row['distance_km']) for row in nearby['detections']] == [1, 2, 3]
+    assert nearby['truncated'] is False
+
+
+def test_candidate_fetch_is_capped(sqlite_app, monkeypatch):
+    from app.services import spatial_queries
+    from app.services.database import db
+
+    add_user('dense-user')
+    seed_ring('dense-user')
+    monkeypatch.setattr(spatial_queries, 'MAX_NEARBY_CANDIDATES', 5)
+
+    nearby = spatial_queries.nearby_detections(db.session, *CENTER, 50, datetime.utcnow() - timedelta(days=1))
+    assert nearby['truncated'] is True and nearby['total'] == 5
+    assert [round(row['distance_km']) for row in nearby['detections']] == [1, 2, 3, 4, 5]
@@ -0,0 +1,82 @@
+# backend-api/tests/test_tflite_backend.py
+"""
+TFLiteBackend pads batches to power-of-two sizes so each interpreter allocates
+its tensors once; the interpreter is faked since tflite is not a test dependency.
+"""
+import numpy as np
+import pytest
+
+from app.services import ai_predictor
+
+
+class FakeInterpreter:
+    """Float32 model whose output row i is the mean of input image i"""
+    instances = []
+
+    def __init__(self, model_path, num_threads=None, **options):
+        self.shape = np.array([1, 4, 4, 3])
+        self.allocations = 0
+        self.resizes = 0
+        FakeInterpreter.instances.append(self)
+
+    def get_input_details(self):
+        return [{'index': 0, 'shape': self.shape, 'dtype': np.float32, 'quantization': (0.0, 0)}]
+
+    def get_output_details(self):
+        return [{'index': 1, 'shape': np.array([self.shape[0], 2]), 'dtype': np.float32, 'quantization': (0.0, 0)}]
+
+    def get_tensor_details(self):
+        return [{'dtype': np.float32}]
+
+    def resize_tensor_input(self, index, shape):
+        self.shape = np.array(shape)
+        self.resizes += 1
+
+    def allocate_tensors(self):
+        self.allocations += 1
+
+    def set_tensor(self, index, value):
+        assert value.shape == tuple(self.shape)
+        self.input = value
+
+    def invoke(self):
+        means = self.input.reshape(len(self.input), -1).mean(axis=1)
+        self.output = np.stack([means, -means], axis=1)
+
+    def get_tensor(self, index):
+        return self.output
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    FakeInterpreter.instances = []
+    monkeypatch.setattr(ai_predictor, '_tflite_interpreter_class', lambda: (FakeInterpreter, None))
+    return ai_predictor.TFLiteBackend('model.tflite', max_batch_size=8)
+
+
+def images(rows):
+    return np.arange(rows, dtype=np.float32)[:, None, None, None] * np.ones((rows, 4, 4, 3), dtype=np.float32)
+
+
+def test_padded_sizes_are_powers_of_two_up_to_max(backend):
+    assert [backend.padded_size(rows) for rows in (1, 2, 3, 5, 8)] == [1, 2, 4, 8, 8]
+
+
+def test_padding_is_sliced_off_the_output(backend):
+    for rows in (1, 3, 6, 8):
+        output = backend.predict(images(rows))
+        np.testing.assert_array_equal(output[:, 0], np.arange(rows))
+
+
+def test_each_padded_size_allocates_tensors_once(backend):
+    for rows in (3, 4, 3, 2, 4, 1, 3):
+        backend.predict(images(rows))
+    assert sorted(backend._interpreters) == [1, 2, 4]
+    assert all(interpreter.allocations == 1 for interpreter in FakeInterpreter.instances)
+    assert all(interpreter.resizes <= 1 for interpreter in FakeInterpreter.instances)
+
+
+def test_batches_over_max_are_split(backend):
+    output = backend.predict(images(19))
+    np.testing.assert_array_equal(output[:, 0], np.arange(19))
+    assert sorted(backend._interpreters) == [1, 4, 8]